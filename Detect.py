@@ -1,352 +1,510 @@
-import cv2
-import os
-import numpy as np
-import mediapipe as mp
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from matplotlib.backends.backend_pdf import PdfPages
 import threading
 import time
-import csv
-import pandas as pd
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, storage
-
-# Set the files, output csv and output pdf
-name = datetime.now().strftime("%Y%m%d_%H%M%S")
-outcsv = f"{name}.csv"
-outpdf = f"{name}_FocusReport.pdf"
-
-with open(outcsv, mode='x', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow([
-        "Timestamp", "Left Eye X", "Left Eye Y", "Right Eye X", "Right Eye Y", "Left Speed", "Right Speed", "Average EAR", "Blink Count"
-    ])
-
-# Initialize Mediapipe
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-# EAR calculation
-def Ear(eye):
-    A = np.linalg.norm(eye[1] - eye[5])  # Vertical distance 1
-    B = np.linalg.norm(eye[2] - eye[4])  # Vertical distance 2
-    C = np.linalg.norm(eye[0] - eye[3])  # Horizontal distance
-    return (A + B) / (2.0 * C)
-
-# Calculate eye center
-def Eyecentre(eye):
-    x_coords = [point[0] for point in eye]
-    y_coords = [point[1] for point in eye]
-    xcentre = int(sum(x_coords) / len(x_coords))
-    ycentre = int(sum(y_coords) / len(y_coords))
-    return xcentre, ycentre
-
-# Define left and right eye landmarks
-LEFT_EYE = [362, 385, 387, 263, 373, 380]
-RIGHT_EYE = [33, 160, 158, 133, 153, 144]
-
-# Attention data, set as the initial value
-attention = { "ear": 0.0, "speed": 0.0, "focus_score": 0.5, "prev_ear": 0.5, "prev_speed": 0.5, "prev_focus_score": 0.5 }
-
-# Initialize the dashboard
-fig, ax = plt.subplots(3, 1, figsize=(6, 8))
-fig.suptitle("Attention Monitoring Dashboard")
-p_ear = ax[0].barh(0, 0, color="green", align="center")
-p_speed = ax[1].barh(0, 0, color="green", align="center")
-p_focus = ax[2].barh(0, 0, color="blue", align="center")
-for i, a in enumerate(ax):
-    a.set_xlim(0, 1)
-    a.set_ylim(-0.5, 0.5)
-    if i == 0:
-        a.axvline(x=0.25 / 0.30, color="red", linestyle="--", label="Fatigue Threshold")
-        a.set_title("EAR")
-    elif i == 1:
-        a.axvline(x=150 / 300, color="red", linestyle="--", label="Fatigue Threshold")
-        a.set_title("Speed")
-    else:
-        a.axvline(x=0.5, color="yellow", linestyle="--", label="Threshold")
-        a.set_title("Focus Score")
-    a.legend(loc="upper right")
-    a.axis("off")
-
-# Function to limit change, avoide error and the dashboard changes too quickly
-def smoothchange(current, target, change):
-    if abs(current - target) > change:
-        return current + change if target > current else current - change
-    return target
-
-# Update dashboard
-def updatedashboard(frame):
-    global attention
-    ear_value = max(0, min(attention["ear"] / 0.30, 1))
-    ear_value = smoothchange(attention["prev_ear"], ear_value, 0.05)
-    attention["prev_ear"] = ear_value
-    p_ear[0].set_width(ear_value)
-    p_ear[0].set_color("red" if attention["ear"] < 0.25 else "green")
-
-    speed_value = max(0, min(attention["speed"] / 300, 1))
-    attention["prev_speed"] = speed_value
-    p_speed[0].set_width(speed_value)
-    p_speed[0].set_color("red" if attention["speed"] > 150 else "green")
-
-    focus_score = 1 - abs(attention["ear"] - 0.25) / 0.30 - attention["speed"] / 300
-    focus_score = max(0, min(focus_score, 1))
-    attention["prev_focus_score"] = focus_score
-    p_focus[0].set_width(focus_score)
-    p_focus[0].set_color("blue" if focus_score > 0.5 else "red")
-
-    return p_ear, p_speed, p_focus
-
-# Animation setup
-ani = FuncAnimation(fig, updatedashboard, interval=500, cache_frame_data=False)
-
-# Eye detection thread
-def detectionthread():
-    global attention
-
-    # Camera initialization
-    cap = cv2.VideoCapture(1)  # Adjust camera index
-    cap.set(cv2.CAP_PROP_FPS, 60)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-
-    blinkcounter = 0
-    blinking = False
-    pre_leyecentre = pre_reyecentre = None
-    pretime = lastime = time.time()
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_frame)
-
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                height, width, _ = frame.shape
-                landmarks = np.array([(int(point.x * width), int(point.y * height))
-                                       for point in face_landmarks.landmark])
-
-                leye = landmarks[LEFT_EYE]
-                reye = landmarks[RIGHT_EYE]
-
-                lear = Ear(leye)
-                rear = Ear(reye)
-                averagear = (lear + rear) / 2.0
-
-                if lear < 0.21 or rear < 0.21:
-                    blinking = True
-                elif lear > 0.23 and rear > 0.23 and blinking:
-                    blinkcounter += 1
-                    blinking = False
-
-                leyecentre = Eyecentre(leye)
-                reyecentre = Eyecentre(reye)
-
-                currentime = time.time()
-                if pre_leyecentre and pre_reyecentre and pretime:
-                    time_delta = currentime - pretime
-                    lspeed = np.linalg.norm(np.array(leyecentre) - np.array(pre_leyecentre)) / time_delta
-                    rspeed = np.linalg.norm(np.array(reyecentre) - np.array(pre_reyecentre)) / time_delta
-                else:
-                    lspeed = rspeed = 0
-
-                averagespeed = (lspeed + rspeed) / 2.0
-                attention["ear"] = averagear
-                attention["speed"] = averagespeed
-
-                pre_leyecentre, pre_reyecentre = leyecentre, reyecentre
-                pretime = currentime
-
-                if currentime - lastime >= 1:
-                    with open(outcsv, mode='a', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow([
-                            time.strftime("%Y-%m-%d %H:%M:%S"),
-                            leyecentre[0], leyecentre[1],
-                            reyecentre[0], reyecentre[1],
-                            lspeed, rspeed, averagear, blinkcounter
-                        ])
-                    lastime = currentime
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
 
-    cap.release()
-    cv2.destroyAllWindows()
+import numpy as np
 
-# Start the eye detection thread
-thread = threading.Thread(target=detectionthread, daemon=True)
-thread.start()
-
-# Display the dashboard
-plt.show()
-
-# Load combined data
-def readata(file):
-    try:
-        data = pd.read_csv(file)
-        data["Timestamp"] = pd.to_datetime(data["Timestamp"], format="%Y-%m-%d %H:%M:%S")
-        print("Combined data loaded successfully!")
-        return data
-    except FileNotFoundError:
-        print(f"File {file} not found.")
-        exit()
-
-# Generate plots and save to PDF
-def createpdf(file, pdf_file):
-    data = readata(file)
-    leyecoords = data[["Left Eye X", "Left Eye Y"]].values
-    reyecoords = data[["Right Eye X", "Right Eye Y"]].values
-    allcoords = np.vstack((leyecoords, reyecoords))
-
-    with PdfPages(pdf_file) as pdf:
-        # Calculate attention score (based on the EAR and speed formula)
-        data["Attention Score"] = 1 - abs(data["Average EAR"] - 0.25) / 0.30 - (data["Left Speed"] + data["Right Speed"]) / (2 * 300)
-        data["Attention Score"] = data["Attention Score"].clip(lower=0, upper=1)  # Restrict values to the range [0, 1]
-        # Calculate 3-minute rolling average line
-        data.set_index("Timestamp", inplace=True)
-        rolling_fit_curve = data["Attention Score"].resample("3min").mean()
-        data.reset_index(inplace=True)
-
-        # Plot the attention curve
-        plt.figure(figsize=(12, 6))
-        plt.plot(data["Timestamp"], data["Attention Score"], marker='o', linestyle='-', label="Attention Score", alpha=0.7)
-        plt.plot(
-            rolling_fit_curve.index, rolling_fit_curve.values, linestyle='--', color="orange", label="3-Minute Fit Curve"
+# Only light modules are imported here; OpenCV and Mediapipe are loaded by the detection
+# thread, pandas and matplotlib by the report, so importing this module is cheap
+from pipeline import Pipeline, DROP_OLDEST
+from eyemetrics import EyeKernel, BlinkDetector, MultiEyeKernel, MultiBlinkDetector
+from landmarktrace import TraceRecorder
+from quantiles import ThresholdCalibrator, DEFAULT_THRESHOLDS
+from recorder import SessionRecorder
+from sessionfile import RecordWriter
+from snapshot import SnapshotChannel
+from subjects import FaceMatcher, FACE_ANCHOR
+from aggregates import SessionAggregator
+from blinklog import BlinkLog
+from pyramid import Pyramid, sessionpyramid
+from instrument import FrameInstrument, REPORT_INTERVAL
+from uploader import UploadQueue, FirebaseBucket
+
+# Also keep every processed frame in a binary record file (see sessionfile.py)
+FULL_RATE_RECORDING = False
+
+# Also keep the eye landmarks of every frame in a trace file for replaying the session
+# (see replay.py and benchmark.py), and with TRACE_FRAMES the camera frames as video
+TRACE_RECORDING = False
+TRACE_FRAMES = False
+
+# "blit" shows the matplotlib dashboard, "headless" serves the attention values on localhost,
+# "worker" streams them as status lines to a parent process (see sessionworker.py)
+DASHBOARD_MODE = "blit"
+DASHBOARD_REFRESH_HZ = 2
+DASHBOARD_PORT = 8765
+
+# Frame source (see framesource.py): a camera index, a video file, a directory of
+# images or "synthetic". FOURCC "MJPG" lets many USB cameras reach 60 fps at 1080p.
+FRAME_SOURCE = 1  # Adjust camera index
+CAMERA_WIDTH = 1920
+CAMERA_HEIGHT = 1080
+CAMERA_FPS = 60
+CAMERA_FOURCC = None
+
+# Queue between the capture, inference and metrics stages
+QUEUE_SIZE = 2
+QUEUE_POLICY = DROP_OLDEST  # Or BACKPRESSURE to process every captured frame
+
+# Landmark backend (see landmarkers.py): "facemesh" runs the legacy FaceMesh in the
+# inference stage, "livestream" the FaceLandmarker task asynchronously, its results going
+# straight to the metrics stage. ROI tracking is only used with "facemesh".
+INFERENCE_BACKEND = "facemesh"
+
+# Run FaceMesh on the tracked face region instead of the full frame
+ROI_TRACKING = True
+ROI_MARGIN = 0.25     # Border around the face, as a fraction of its size
+INFERENCE_SCALE = 1.0  # Downscale factor for the image given to FaceMesh
+
+# Faces FaceMesh looks for. With more than one, every subject is matched across frames by
+# position and gets its own metrics and <name>_subject<n>.csv; the session CSV, dashboard
+# and report follow the earliest subject still in view. ROI tracking needs a single face.
+MAX_FACES = 1
+
+# Frames of per-user EAR/speed quantiles before the calibrated thresholds replace the defaults
+CALIBRATION_FRAMES = 1800
+
+# Per-stage timings of the detection loop, printed every REPORT_INTERVAL seconds and saved
+# next to the session CSV as <name>_timing.json (see instrument.py)
+INSTRUMENTATION = True
+
+# Seconds to wait for the uploads at the end of a session, the rest resumes on the next start
+UPLOAD_WAIT = 30
+
+# Everything one focus session shares between the detection thread, the dashboard and
+# the report: output files, stop flag, attention channel and aggregates
+class FocusSession:
+    def __init__(self, name=None, full_rate=FULL_RATE_RECORDING, trace=TRACE_RECORDING, trace_frames=TRACE_FRAMES,
+                 instrument=INSTRUMENTATION, max_faces=MAX_FACES, backend=INFERENCE_BACKEND, source=FRAME_SOURCE):
+        # Set the files, output csv and output pdf
+        name = name or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.name = name
+        self.max_faces = max_faces
+        self.backend = backend
+        self.source = source
+        self.outcsv = f"{name}.csv"
+        self.outpdf = f"{name}_FocusReport.pdf"
+        self.outrec = f"{name}.rec" if full_rate else None
+        self.outtrace = f"{name}.trace" if trace else None
+        self.outtiming = f"{name}_timing.json" if instrument else None
+        self.outblinks = f"{name}.blinks"
+        self.outpyramid = f"{name}.pyramid.npz"
+
+        # Stage timings and frame counters, also of the CSV writes
+        self.instrument = FrameInstrument() if instrument else None
+
+        # Session CSV, written in batches by a background thread
+        open(self.outcsv, mode='x').close()
+        self.recorder = SessionRecorder(self.outcsv, timing=self.instrument.stage("csv") if instrument else None)
+        self.framefile = RecordWriter(self.outrec) if full_rate else None
+        self.blinklog = BlinkLog(self.outblinks)  # Onset, offset and lowest EAR of every blink
+        self.trace = TraceRecorder(self.outtrace, video=f"{name}_trace.avi" if trace_frames else None, fps=CAMERA_FPS) if trace else None
+        self.stopdetect = threading.Event()
+
+        # Per-subject CSVs and blink logs of a multi-subject session, by subject id
+        self.subjects = {}
+        self.subjectblinks = {}
+
+        # Attention data, one consistent sample per frame for the dashboard and other readers
+        self.attention = SnapshotChannel(initial={
+            "ear_fatigue": DEFAULT_THRESHOLDS.ear_fatigue,
+            "speed_fatigue": DEFAULT_THRESHOLDS.speed_fatigue,
+            "speed_scale": DEFAULT_THRESHOLDS.speed_scale,
+        })
+
+        # Report aggregates, updated with every recorded row
+        self.aggregates = SessionAggregator()
+
+    # CSV of one subject of a multi-subject session, opened on first use
+    def subjectrecorder(self, subject):
+        recorder = self.subjects.get(subject)
+        if recorder is None:
+            path = f"{self.name}_subject{subject}.csv"
+            open(path, mode='x').close()
+            recorder = self.subjects[subject] = SessionRecorder(path)
+        return recorder
+
+    def subjectblinklog(self, subject):
+        blinklog = self.subjectblinks.get(subject)
+        if blinklog is None:
+            blinklog = self.subjectblinks[subject] = BlinkLog(f"{self.name}_subject{subject}.blinks")
+        return blinklog
+
+    # Min/max/mean summaries at 1 s to 10 min of the finished session, from the frame
+    # records when they were kept, else from the per-second aggregates
+    def buildpyramid(self):
+        if self.outrec:
+            return sessionpyramid(self.outrec, rebuild=True)
+        pyramid = Pyramid.fromaggregates(self.aggregates)
+        pyramid.save(self.outpyramid)
+        return pyramid
+
+    # Write out the rest of the session files
+    def close(self):
+        self.recorder.close()
+        for recorder in self.subjects.values():
+            recorder.close()
+        self.blinklog.close()
+        for blinklog in self.subjectblinks.values():
+            blinklog.close()
+        if self.framefile is not None:
+            self.framefile.close()
+        if self.trace is not None:
+            self.trace.close()
+        if self.instrument is not None:
+            self.instrument.save(self.outtiming)
+
+
+# Per-frame metrics of a session: EAR, speed, blinks, threshold calibration, the attention
+# channel and the session files. `kernel` holds the frame's landmarks when process() is
+# called. Shared by the detection thread and the replay harness (replay.py).
+class SessionMetrics:
+    def __init__(self, session):
+        self.session = session
+        self.kernel = EyeKernel()
+        self.blinks = BlinkDetector()
+        self.calibrator = ThresholdCalibrator(warmup=CALIBRATION_FRAMES)
+        self.lastime = None
+
+    # `frame` is kept with the landmarks when the session traces video frames
+    def process(self, currentime, frame=None):
+        session, kernel, blinks, calibrator = self.session, self.kernel, self.blinks, self.calibrator
+        if session.trace is not None:
+            session.trace.add(currentime, kernel.flat, frame)
+        ear, centre, speed = kernel.update(currentime)
+        averagear = (ear[0] + ear[1]) / 2.0
+        averagespeed = (speed[0] + speed[1]) / 2.0
+
+        # Per-user thresholds from streaming quantiles, defaults until warmed up
+        if calibrator.update(averagear, averagespeed):
+            print(f"Thresholds calibrated: {calibrator.thresholds}")
+        thresholds = calibrator.thresholds
+        blinks.low, blinks.high = thresholds.blink_low, thresholds.blink_high
+        ended = blinks.update(ear)
+        session.blinklog.update(currentime, ear, blinks.blinking, ended)
+
+        session.attention.publish(
+            currentime, averagear, averagespeed, ear[0], ear[1], speed[0], speed[1], blinks.count,
+            thresholds.ear_fatigue, thresholds.speed_fatigue, thresholds.speed_scale
         )
-        plt.axhline(y=0.5, color="red", linestyle="--", label="Threshold")  # Add threshold line
-        plt.title("Attention Curve Over Time", fontsize=16)
-        plt.xlabel("Time", fontsize=12)
-        plt.ylabel("Attention Score", fontsize=12)
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-
-        # Plot Eye Movement Hotspot Map
-        heatmap, xedges, yedges = np.histogram2d(
-            allcoords[:, 0], allcoords[:, 1], bins=(100, 100)
-        )
-        plt.figure(figsize=(12, 6))
-        plt.imshow(heatmap.T, origin="lower", cmap="hot", extent=[0, 1920, 0, 1080])
-        plt.colorbar(label="Frequency")
-        plt.title("Eye Movement Hotspot Map")
-        plt.xlabel("Horizontal Position (pixels)")
-        plt.ylabel("Vertical Position (pixels)")
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-        # Plot Speed Over Time
-        timestamps = data["Timestamp"]
-        lspeeds = data["Left Speed"]
-        rspeeds = data["Right Speed"]
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, lspeeds, label="Left Eye Speed", linewidth=2)
-        plt.plot(timestamps, rspeeds, label="Right Eye Speed", linewidth=2)
-        plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
-        plt.gca().xaxis.set_major_locator(plt.matplotlib.dates.AutoDateLocator())
-        plt.title("Eye Movement Speed Over Time")
-        plt.xlabel("Time (HH:MM:SS)")
-        plt.ylabel("Speed (pixels/second)")
-        plt.legend()
-        plt.grid()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-        # Plot EAR Over Time with Averages
-        avg_ears = data["Average EAR"]
-
-        # Calculate 3-minute averages
-        data.set_index("Timestamp", inplace=True)
-        rolling_3min_avg = data["Average EAR"].resample("3min").mean()
-        overall_avg_ear = avg_ears.mean()
-        data.reset_index(inplace=True)
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, avg_ears, label="Average EAR", color="blue", linewidth=2)
-        plt.plot(
-            rolling_3min_avg.index, rolling_3min_avg.values, label="3-Minute Average EAR", color="orange", linewidth=2
+
+        if session.framefile is not None:
+            session.framefile.append((
+                int(currentime * 1e9),
+                centre[0, 0], centre[0, 1], centre[1, 0], centre[1, 1],
+                speed[0], speed[1], ear[0], ear[1], blinks.blinking, blinks.count
+            ))
+
+        # One session row per second
+        if self.lastime is None:
+            self.lastime = currentime
+        elif currentime - self.lastime >= 1:
+            row = (
+                centre[0, 0], centre[0, 1],
+                centre[1, 0], centre[1, 1],
+                speed[0], speed[1], averagear, blinks.count
+            )
+            session.recorder.record(currentime, *row)
+            session.aggregates.add(currentime, *row)
+            self.lastime = currentime
+
+
+# Per-frame metrics of every face in view. Faces are matched to subjects by position
+# (see subjects.py); EAR, speeds and blinks of all subjects are computed together in
+# MultiEyeKernel/MultiBlinkDetector, thresholds are calibrated per subject. Each subject
+# gets one row per second in its own CSV; the earliest subject still in view (the primary
+# subject) also feeds the session CSV, aggregates, attention channel, blink log, frame
+# records and trace, as SessionMetrics does.
+class MultiSubjectMetrics:
+    def __init__(self, session, faces):
+        self.session = session
+        self.matcher = FaceMatcher(faces)
+        self.kernel = MultiEyeKernel(faces)
+        self.blinks = MultiBlinkDetector(faces)
+        self.calibrators = [None] * faces
+        self.active = np.zeros(faces, dtype=bool)
+        self.lastime = None
+        self.primary = None  # Subject id the session files follow
+
+    # Assign the frame's faces, given by their (N, 2) pixel positions, to subject slots.
+    # Returns the slot of every face, -1 for faces beyond the number of slots.
+    def assign(self, positions):
+        slots, started, ended = self.matcher.match(positions)
+        for slot in started:
+            self.kernel.reset(slot)
+            self.blinks.reset(slot)
+            self.calibrators[slot] = ThresholdCalibrator(warmup=CALIBRATION_FRAMES)
+            print(f"Subject {self.matcher.ids[slot]} appeared")
+        for slot, subject in ended:
+            self.session.subjectrecorder(subject).close()
+            self.session.subjectblinklog(subject).close()
+            print(f"Subject {subject} left")
+        self.active.fill(False)
+        self.active[slots[slots >= 0]] = True
+        return slots
+
+    # Metrics of the assigned slots, whose landmarks are loaded in `kernel`; `frame` goes
+    # to the trace video with the primary subject's landmarks
+    def process(self, currentime, frame=None):
+        session, kernel, blinks, active = self.session, self.kernel, self.blinks, self.active
+        if not active.any():
+            return
+        ear, centre, speed = kernel.update(currentime, active)
+        averagear = ear.mean(axis=1)
+        averagespeed = speed.mean(axis=1)
+
+        slots = np.flatnonzero(active)
+        for slot in slots:
+            thresholds = self.calibrators[slot].thresholds
+            if self.calibrators[slot].update(averagear[slot], averagespeed[slot]):
+                thresholds = self.calibrators[slot].thresholds
+                print(f"Subject {self.matcher.ids[slot]} thresholds calibrated: {thresholds}")
+            blinks.low[slot], blinks.high[slot] = thresholds.blink_low, thresholds.blink_high
+        ended = blinks.update(ear, active)
+        for slot in slots:
+            session.subjectblinklog(self.matcher.ids[slot]).update(currentime, ear[slot], blinks.blinking[slot], ended[slot])
+
+        primary = slots[np.argmin(self.matcher.ids[slots])]
+        if self.matcher.ids[primary] != self.primary:
+            # A blink in progress belongs to the previous primary subject
+            self.primary = self.matcher.ids[primary]
+            session.blinklog.reset()
+        if session.trace is not None:
+            session.trace.add(currentime, kernel.flat[primary], frame)
+        session.blinklog.update(currentime, ear[primary], blinks.blinking[primary], ended[primary])
+        thresholds = self.calibrators[primary].thresholds
+        session.attention.publish(
+            currentime, averagear[primary], averagespeed[primary], ear[primary, 0], ear[primary, 1],
+            speed[primary, 0], speed[primary, 1], blinks.count[primary],
+            thresholds.ear_fatigue, thresholds.speed_fatigue, thresholds.speed_scale
         )
-        plt.axhline(overall_avg_ear, color="red", linestyle="--", linewidth=2, label="Overall Average EAR")
-        plt.title("EAR (Eye Aspect Ratio) Over Time")
-        plt.xlabel("Time (HH:MM:SS)")
-        plt.ylabel("EAR")
-        plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
-        plt.xticks(rotation=45)
-        plt.grid()
-        plt.legend()
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-        # Plot Cumulative Blink Count Over Time
-        blink_counts = data["Blink Count"]
-        cumulative_blinks = blink_counts.cumsum()
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, cumulative_blinks, label="Cumulative Blink Count", color="green", linewidth=2)
-        plt.title("Cumulative Blink Count Over Time")
-        plt.xlabel("Time (HH:MM:SS)")
-        plt.ylabel("Cumulative Blink Count")
-        plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
-        plt.xticks(rotation=45)
-        plt.grid()
-        plt.legend()
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-        # Plot Blink Frequency in Intervals
-        plt.figure(figsize=(12, 6))
-        plt.bar(timestamps, blink_counts, width=0.01, label="Blink Frequency", color="purple")
-        plt.title("Blink Frequency in Intervals")
-        plt.xlabel("Time (HH:MM:SS)")
-        plt.ylabel("Blink Count")
-        plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
-        plt.xticks(rotation=45)
-        plt.grid()
-        plt.legend()
-        plt.tight_layout()
-        pdf.savefig()
-        plt.close()
-
-    print(f"All plots saved to {pdf_file}")
-
-
-# Initialize Firebase Admin SDK (Ensure the credentials JSON file is available)
-cred = credentials.Certificate("/Users/bocai/Desktop/Sensing and Internet of Things/serviceaccountKey.json")
-firebase_admin.initialize_app(cred, {
-    'storageBucket': 'siot-2bfb8.firebasestorage.app'  # Replace with your Firebase project's storage bucket
-})
-
-# Generate plots and save to PDF
-createpdf(outcsv, outpdf)
-
-
-# Function to upload file to Firebase Storage and delete local file
-def upload(local_file_path, folder_name):
-    bucket = storage.bucket()
-    blob = bucket.blob(f"{folder_name}/{os.path.basename(local_file_path)}")
-    # Upload the file to Firebase Storage
-    blob.upload_from_filename(local_file_path)
-    print(f"Uploaded {local_file_path} to {folder_name}/ in Firebase Storage.")
-
-# Upload CSV and PDF to Firebase Storage
-try:
-    upload(outcsv, "csv")  # Upload CSV to the "csv" folder
-    upload(outpdf, "pdf")  # Upload PDF to the "pdf" folder
-except Exception as e:
-    print(f"Error uploading files to Firebase Storage: {e}")
+        if session.framefile is not None:
+            session.framefile.append((
+                int(currentime * 1e9),
+                centre[primary, 0, 0], centre[primary, 0, 1], centre[primary, 1, 0], centre[primary, 1, 1],
+                speed[primary, 0], speed[primary, 1], ear[primary, 0], ear[primary, 1],
+                blinks.blinking[primary], blinks.count[primary]
+            ))
+
+        # One row per second for every subject in view
+        if self.lastime is None:
+            self.lastime = currentime
+        elif currentime - self.lastime >= 1:
+            for slot in slots:
+                row = (
+                    centre[slot, 0, 0], centre[slot, 0, 1],
+                    centre[slot, 1, 0], centre[slot, 1, 1],
+                    speed[slot, 0], speed[slot, 1], averagear[slot], blinks.count[slot]
+                )
+                session.subjectrecorder(self.matcher.ids[slot]).record(currentime, *row)
+                if slot == primary:
+                    session.recorder.record(currentime, *row)
+                    session.aggregates.add(currentime, *row)
+            self.lastime = currentime
+
+
+# Eye detection thread: capture, inference and metrics run as separate stages
+def detectionthread(session):
+    import cv2
+    from framesource import opensource, ColorConverter
+    from landmarkers import FaceMeshLandmarker, LiveStreamLandmarker
+    from facetracker import FaceRoiTracker
+
+
+    # Camera initialization. Frames are read into a ring of buffers that covers the frame
+    # queue, the frame being captured and the one held by the inference stage, with one to
+    # spare for the moment between taking a frame from the queue and holding it. They are
+    # converted to RGB into reused buffers, so capture allocates no frame memory.
+    source = opensource(session.source, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCC, buffers=QUEUE_SIZE + 3)
+    if session.trace is not None:
+        session.trace.fps = source.fps or CAMERA_FPS  # The trace video plays at the capture rate
+
+    tracker = FaceRoiTracker(margin=ROI_MARGIN, scale=INFERENCE_SCALE)
+    multiface = session.max_faces > 1
+    asynchronous = session.backend == "livestream"
+    roitracking = ROI_TRACKING and not multiface and not asynchronous
+    framemetrics = MultiSubjectMetrics(session, session.max_faces) if multiface else SessionMetrics(session)
+    positions = np.zeros((session.max_faces, 2))
+    # Frames for the trace video go along with their landmarks to the metrics stage, copied
+    # because the capture buffer is reused while the result waits in the queue
+    traceframes = session.trace is not None and session.trace.videopath is not None
+
+    # Without instrumentation the timing calls go to a throwaway instrument
+    instrument = session.instrument or FrameInstrument()
+    now, record, count = instrument.now, instrument.record, instrument.count
+    lastreport = [now()]
+    pipeline = None
+
+    # Initialize Mediapipe; live-stream results are handed to the metrics stage as they come
+    def detected(context, faces):
+        captured, start, box, submitted, kept = context
+        record("facemesh", submitted)
+        if not faces:
+            count("no_face")
+        elif pipeline is not None:
+            pipeline.deliver((captured, start, box, faces, kept))
+
+    # The live-stream landmarker may still hold a submitted image while the next one is converted
+    converter = ColorConverter(buffers=QUEUE_SIZE + 3 if asynchronous else 1)
+    if asynchronous:
+        landmarker = LiveStreamLandmarker(detected, max_faces=session.max_faces)
+        instrument.gauge("stale", lambda: landmarker.stale)
+    else:
+        landmarker = FaceMeshLandmarker(max_faces=session.max_faces)
+
+    # Capture stage: drain the camera at its native rate
+    def capture():
+        if session.stopdetect.is_set() or not source.opened:
+            return None
+        start = now()
+        frame = source.read()
+        if frame is None:
+            return None
+        read = record("read", start)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            return None
+        record("waitkey", read)
+        count("captured")
+        return time.time(), start, frame
+
+    # Inference stage: colour conversion and FaceMesh, on the face region when tracking.
+    # With the live-stream backend the frame is only submitted here.
+    def inference(item):
+        captured, start, frame = item
+        step = now()
+        if roitracking:
+            image, box = tracker.crop(frame)
+        else:
+            image = frame
+            box = (0, 0, frame.shape[1], frame.shape[0])
+        step = record("crop", step)
+        rgb_frame = converter.convert(image)
+        step = record("convert", step)
+        kept = frame.copy() if traceframes else None
+        if asynchronous:
+            landmarker.submit(rgb_frame, (captured, start, box, step, kept))
+            return None
+        faces = landmarker.process(rgb_frame)
+        record("facemesh", step)
+        if roitracking:
+            tracker.update(faces[0] if faces else None, box)
+        if not faces:
+            count("no_face")
+            return None
+        return captured, start, box, faces, kept
+
+    # The capture ring skips the frame while inference works on it, however long that takes
+    def heldinference(item):
+        frame = item[2]
+        source.hold(frame)
+        try:
+            return inference(item)
+        finally:
+            source.release(frame)
+
+    # Metrics stage: EAR, blink, speed and the session recorder
+    def metrics(result):
+        currentime, start, (x0, y0, width, height), faces, frame = result
+        step = now()
+        if multiface:
+            # One slot per subject, matched by the position of each face
+            for i, face_landmarks in enumerate(faces):
+                anchor = face_landmarks[FACE_ANCHOR]
+                positions[i] = (anchor.x * width + x0, anchor.y * height + y0)
+            slots = framemetrics.assign(positions[:len(faces)])
+            for face_landmarks, slot in zip(faces, slots):
+                if slot >= 0:
+                    framemetrics.kernel.load(slot, face_landmarks, width, height, origin=(x0, y0))
+            step = record("landmarks", step)
+            framemetrics.process(currentime, frame)
+            step = record("metrics", step)
+        else:
+            for face_landmarks in faces:
+                # Landmarks are relative to the inference box, map them back to the full frame.
+                # Speeds use the capture time, so queueing delay does not distort them
+                framemetrics.kernel.load(face_landmarks, width, height, origin=(x0, y0))
+                step = record("landmarks", step)
+                framemetrics.process(currentime, frame)
+                step = record("metrics", step)
+        count("processed")
+        # Capture to metrics done, including the time spent waiting in the queues
+        record("latency", start)
+
+        if session.instrument is not None and step - lastreport[0] >= REPORT_INTERVAL * 1e9:
+            lastreport[0] = step
+            print(instrument.format(instrument.rates()))
+
+    pipeline = Pipeline(capture, heldinference, metrics, maxsize=QUEUE_SIZE, policy=QUEUE_POLICY)
+    instrument.gauge("dropped", lambda: pipeline.frames.dropped + pipeline.results.dropped)
+    pipeline.run()
+    landmarker.close()
+    pipeline.report()
+    if session.instrument is not None:
+        print(instrument.format())
+
+    source.close()
+    cv2.destroyAllWindows()
 
+# Run one focus session: detection with the dashboard (or headless server), then the
+# report and the uploads
+def runsession(mode=DASHBOARD_MODE, full_rate=FULL_RATE_RECORDING, max_faces=MAX_FACES, backend=INFERENCE_BACKEND,
+               source=FRAME_SOURCE):
+    session = FocusSession(full_rate=full_rate, max_faces=max_faces, backend=backend, source=source)
+
+    # Start the eye detection thread
+    thread = threading.Thread(target=detectionthread, args=(session,), daemon=True)
+    thread.start()
+
+    # Display the dashboard, or serve the values until the detection thread ends (Ctrl+C to stop)
+    if mode == "headless":
+        from dashboard import AttentionServer
+
+        server = AttentionServer(session.attention.read, port=DASHBOARD_PORT, rate_hz=DASHBOARD_REFRESH_HZ).start()
+        try:
+            while thread.is_alive():
+                thread.join(0.5)
+        except KeyboardInterrupt:
+            pass
+        server.stop()
+    elif mode == "worker":
+        from sessionworker import reportstatus
+
+        reportstatus(session, thread)
+    else:
+        from dashboard import Dashboard
+
+        Dashboard(session.attention.read, refresh_hz=DASHBOARD_REFRESH_HZ).show()
+
+    # Stop detection and write out the rest of the session before the report. The writers
+    # are closed only once the metrics stage has finished, it may still be appending.
+    session.stopdetect.set()
+    thread.join()
+    session.close()
+    session.buildpyramid()
+
+    # Upload to Firebase Storage in the background; the session data goes up while the report renders
+    uploads = UploadQueue(FirebaseBucket()).start()
+    uploads.enqueue(session.outcsv, "csv")  # Upload CSV to the "csv" folder
+    if session.outrec:
+        uploads.enqueue(session.outrec, "rec")  # Upload frame records to the "rec" folder
+    uploads.enqueue(session.outblinks, "blinks")  # Upload the blink log to the "blinks" folder
+    uploads.enqueue(session.outpyramid, "pyramid")  # Upload the summary pyramid to the "pyramid" folder
+    for recorder in session.subjects.values():
+        uploads.enqueue(recorder.path, "csv")  # Per-subject CSVs go with the session CSV
+    for blinklog in session.subjectblinks.values():
+        uploads.enqueue(blinklog.path, "blinks")
+
+    # Generate plots and save to PDF
+    from report import createpdf
+
+    createpdf(session.outcsv, session.outpdf, session.aggregates, blinks=session.outblinks, pyramid=session.outpyramid)
+    uploads.enqueue(session.outpdf, "pdf")  # Upload PDF to the "pdf" folder
+
+    if not uploads.wait(UPLOAD_WAIT):
+        print(f"{len(uploads.pending())} uploads still pending, they will resume on the next start")
+    uploads.close(timeout=1)
+    return session
+
+
+if __name__ == "__main__":
+    runsession()
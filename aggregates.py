@@ -0,0 +1,142 @@
+import time
+
+import numpy as np
+
+from eyemetrics import focusscore
+
+BUCKET_SECONDS = 180             # 3-minute averages of the report
+HEATMAP_BINS = (100, 100)
+HEATMAP_RANGE = ((0, 1920), (0, 1080))
+
+# Columns kept for every sample, in the order of the session CSV after the timestamp
+COLUMNS = ["Left Eye X", "Left Eye Y", "Right Eye X", "Right Eye Y", "Left Speed", "Right Speed", "Average EAR", "Blink Count"]
+
+
+# Report aggregates kept up to date while the session runs, so the report does not
+# have to reparse the CSV. add() is O(1) per sample; extend() does the same for a
+# whole table at once. Times are stored as local-clock seconds, like the CSV.
+class SessionAggregator:
+    def __init__(self, capacity=4096):
+        self.count = 0
+        self.times = np.zeros(capacity)
+        self.values = np.zeros((capacity, len(COLUMNS)))
+        self.attention = np.zeros(capacity)
+        self.buckets = {}  # bucket number -> [attention sum, EAR sum, samples]
+        self.earsum = 0.0
+        self.heatmap = np.zeros(HEATMAP_BINS)
+        self.utcoffset = time.localtime().tm_gmtoff
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed <= len(self.times):
+            return
+        size = max(needed, 2 * len(self.times))
+        for name in ("times", "values", "attention"):
+            old = getattr(self, name)
+            new = np.zeros((size,) + old.shape[1:])
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # Heatmap bin of a position, positions outside the frame go to the edge bins
+    def _bin(self, value, axis):
+        low, high = HEATMAP_RANGE[axis]
+        bins = HEATMAP_BINS[axis]
+        return min(max(int((value - low) / (high - low) * bins), 0), bins - 1)
+
+    def _bins(self, values, axis):
+        low, high = HEATMAP_RANGE[axis]
+        bins = HEATMAP_BINS[axis]
+        return np.clip(((values - low) / (high - low) * bins).astype(np.int64), 0, bins - 1)
+
+    # One session row; `timestamp` is epoch seconds as given to the recorder
+    def add(self, timestamp, lx, ly, rx, ry, lspeed, rspeed, averagear, blinkcount):
+        self._reserve(1)
+        i = self.count
+        local = timestamp + self.utcoffset
+        score = float(focusscore(averagear, (lspeed + rspeed) / 2))
+        self.times[i] = local
+        self.values[i] = (lx, ly, rx, ry, lspeed, rspeed, averagear, blinkcount)
+        self.attention[i] = score
+        self.earsum += averagear
+        bucket = self.buckets.setdefault(int(local // BUCKET_SECONDS), [0.0, 0.0, 0])
+        bucket[0] += score
+        bucket[1] += averagear
+        bucket[2] += 1
+        for x, y in ((lx, ly), (rx, ry)):
+            self.heatmap[self._bin(x, 0), self._bin(y, 1)] += 1
+        self.count += 1
+
+    # Many rows at once from a session table with a Timestamp column
+    def extend(self, data):
+        rows = len(data)
+        if rows == 0:
+            return
+        self._reserve(rows)
+        part = slice(self.count, self.count + rows)
+        local = data["Timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64) / 1e9
+        values = data[COLUMNS].to_numpy(dtype=float)
+        speeds = (values[:, 4] + values[:, 5]) / 2
+        scores = focusscore(values[:, 6], speeds)
+        self.times[part] = local
+        self.values[part] = values
+        self.attention[part] = scores
+        self.earsum += values[:, 6].sum()
+
+        keys, inverse = np.unique((local // BUCKET_SECONDS).astype(np.int64), return_inverse=True)
+        attsums = np.bincount(inverse, weights=scores)
+        earsums = np.bincount(inverse, weights=values[:, 6])
+        counts = np.bincount(inverse)
+        for key, attsum, earsum, n in zip(keys.tolist(), attsums, earsums, counts):
+            bucket = self.buckets.setdefault(key, [0.0, 0.0, 0])
+            bucket[0] += attsum
+            bucket[1] += earsum
+            bucket[2] += int(n)
+
+        coords = np.vstack((values[:, 0:2], values[:, 2:4]))
+        np.add.at(self.heatmap, (self._bins(coords[:, 0], 0), self._bins(coords[:, 1], 1)), 1)
+        self.count += rows
+
+    @classmethod
+    def fromframe(cls, data):
+        aggregates = cls(capacity=max(len(data), 1))
+        aggregates.extend(data)
+        return aggregates
+
+    # Session table with the CSV columns plus "Attention Score"
+    def frame(self):
+        import pandas as pd
+
+        data = pd.DataFrame(self.values[:self.count], columns=COLUMNS)
+        data.insert(0, "Timestamp", pd.to_datetime(self.times[:self.count], unit="s"))
+        data["Attention Score"] = self.attention[:self.count]
+        return data
+
+    # 3-minute means of the attention score and the EAR, with gaps for empty buckets
+    def bucketmeans(self):
+        import pandas as pd
+
+        if not self.buckets:
+            empty = pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+            return empty, empty
+        first, last = min(self.buckets), max(self.buckets)
+        attention = np.full(last - first + 1, np.nan)
+        ear = np.full(last - first + 1, np.nan)
+        for key, (attsum, earsum, n) in self.buckets.items():
+            attention[key - first] = attsum / n
+            ear[key - first] = earsum / n
+        index = pd.to_datetime(np.arange(first, last + 1) * BUCKET_SECONDS, unit="s")
+        return pd.Series(attention, index=index), pd.Series(ear, index=index)
+
+    def overallear(self):
+        return self.earsum / self.count if self.count else float("nan")
+
+    # Blink Count is already cumulative within the session
+    def cumulativeblinks(self):
+        return self.values[:self.count, 7]
+
+    # Blinks that ended since the previous row; where the count goes down a new session
+    # started and the row's count is all new
+    def blinksteps(self):
+        counts = self.values[:self.count, 7]
+        steps = np.diff(counts, prepend=0)
+        return np.where(steps < 0, counts, steps)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from eyemetrics import focusscore
+
+# Session states, in the order the notebook reports them
+FOCUS = "Focus"
+FATIGUE = "Fatigue"
+LOSS_OF_FOCUS = "Loss of Focus"
+STATES = [FOCUS, FATIGUE, LOSS_OF_FOCUS]
+
+# Default thresholds of the notebook analysis
+SPEED_THRESHOLD = 100         # Fast eye movement, pixels/second
+BLINK_FATIGUE_THRESHOLD = 15  # Blinks per minute
+
+
+# Mean speed of both eyes for every row
+def averagespeed(data):
+    return (data["Left Speed"] + data["Right Speed"]) / 2
+
+
+# Attention score of every row, same formula as the dashboard focus score
+def attentionscore(data):
+    return pd.Series(focusscore(data["Average EAR"].to_numpy(), averagespeed(data).to_numpy()), index=data.index)
+
+
+# EAR quantiles used as fatigue (low) and high focus (high) thresholds
+def earthresholds(data, low=0.25, high=0.75):
+    ear = data["Average EAR"]
+    return ear.quantile(low), ear.quantile(high)
+
+
+# Per-user fatigue thresholds: EAR 10th percentile and average speed 90th percentile
+def fatiguethresholds(data, ear_quantile=0.10, speed_quantile=0.90):
+    return data["Average EAR"].quantile(ear_quantile), averagespeed(data).quantile(speed_quantile)
+
+
+# Focus / Fatigue / Loss of Focus for every row: low EAR is fatigue, otherwise either
+# eye moving faster than speed_threshold is loss of focus
+def classifystates(data, ear_low, speed_threshold=SPEED_THRESHOLD):
+    fatigue = data["Average EAR"].to_numpy() < ear_low
+    fast = (data["Left Speed"].to_numpy() > speed_threshold) | (data["Right Speed"].to_numpy() > speed_threshold)
+    codes = np.select([fatigue, fast], [1, 2], default=0)
+    return pd.Series(pd.Categorical.from_codes(codes, STATES), index=data.index, name="State")
+
+
+# EAR, combined speed (left + right) and blink statistics per state
+def statestats(data, states):
+    grouped = pd.DataFrame({
+        "State": states,
+        "EAR": data["Average EAR"],
+        "Speed": data["Left Speed"] + data["Right Speed"],
+        "Blink": data["Blink Count"],
+    }).groupby("State", observed=True)
+    return grouped.agg(
+        EAR_Mean=("EAR", "mean"),
+        EAR_Std=("EAR", "std"),
+        Speed_Mean=("Speed", "mean"),
+        Speed_Std=("Speed", "std"),
+        Blink_Mean=("Blink", "mean"),
+        Blink_Std=("Blink", "std"),
+    )
+
+
+# Share of rows in every state
+def statedistribution(states):
+    return states.value_counts(normalize=True).reindex(STATES, fill_value=0.0)
+
+
+# Blinks per minute from the cumulative Blink Count sampled once per second. The
+# count restarts with every session, so differences are taken within a session.
+def blinkrate(data):
+    counts = data["Blink Count"]
+    if "Session" in data:
+        steps = counts.groupby(data["Session"]).diff()
+    else:
+        steps = counts.diff()
+    return steps.fillna(0).clip(lower=0) * 60
+
+
+# Rows that look fatigued: low EAR, fast eye movement or a high blink rate
+def fatiguestate(data, ear_threshold, speed_threshold=SPEED_THRESHOLD, blink_threshold=BLINK_FATIGUE_THRESHOLD, blink_rate=None):
+    if blink_rate is None:
+        blink_rate = blinkrate(data)
+    return (
+        (data["Average EAR"] < ear_threshold)
+        | (averagespeed(data) > speed_threshold)
+        | (blink_rate > blink_threshold)
+    )
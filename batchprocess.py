@@ -0,0 +1,160 @@
+import argparse
+import csv
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from eyemetrics import EyeKernel, BlinkDetector
+from recorder import CSV_HEADER
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+RECORD_INTERVAL = 1  # Same one row per second as Detect.py
+
+# One FaceMesh instance per worker process
+face_mesh = None
+
+
+def initworker():
+    global face_mesh
+    face_mesh = mp.solutions.face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+# Collect the video files from a list of files and directories
+def findvideos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return videos
+
+
+# Split a video into (path, first frame, end frame) chunks of about chunk_seconds
+def splitvideo(path, chunk_seconds):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"Cannot open {path}, skipped.")
+        return [], 0.0
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    size = max(1, int(chunk_seconds * fps))
+    return [(path, start, min(start + size, frames)) for start in range(0, frames, size)], fps
+
+
+# Worker: per-frame EAR and eye centres of one chunk. Speeds and blinks need the
+# previous frames, so they are computed after the chunks are stitched back together.
+def processchunk(task):
+    path, start, end = task
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    kernel = EyeKernel()
+
+    count = end - start
+    found = np.zeros(count, dtype=bool)
+    ears = np.zeros((count, 2))
+    centres = np.zeros((count, 2, 2))
+    for k in range(count):
+        ret, frame = cap.read()
+        if not ret:
+            found, ears, centres = found[:k], ears[:k], centres[:k]
+            break
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = face_mesh.process(rgb_frame)
+        if results.multi_face_landmarks:
+            height, width, _ = frame.shape
+            kernel.load(results.multi_face_landmarks[0].landmark, width, height)
+            kernel.update(0)
+            found[k] = True
+            ears[k] = kernel.ear
+            centres[k] = kernel.centre
+    cap.release()
+    return path, start, found, ears, centres
+
+
+# Join the chunks of one video in order and run the speed, blink and one-row-per-second logic
+def stitch(chunks, fps):
+    chunks.sort(key=lambda chunk: chunk[0])
+    times = np.concatenate([(start + np.flatnonzero(found)) / fps for start, found, _, _ in chunks])
+    ears = np.concatenate([ears[found] for _, found, ears, _ in chunks])
+    centres = np.concatenate([centres[found] for _, found, _, centres in chunks])
+
+    # Speed between consecutive frames with a face, zero for the first one
+    speeds = np.zeros((len(times), 2))
+    if len(times) > 1:
+        moves = np.hypot(*np.moveaxis(np.diff(centres, axis=0), -1, 0))
+        speeds[1:] = moves / np.diff(times)[:, None]
+
+    blinks = BlinkDetector()
+    rows = []
+    lastime = 0.0
+    for k in range(len(times)):
+        blinks.update(ears[k])
+        if times[k] - lastime >= RECORD_INTERVAL:
+            rows.append((times[k], centres[k], speeds[k], ears[k].mean(), blinks.count))
+            lastime = times[k]
+    return rows
+
+
+def writecsv(rows, outcsv, starttime):
+    with open(outcsv, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        for offset, centre, speed, averagear, blinkcount in rows:
+            writer.writerow([
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(starttime + offset)),
+                centre[0, 0], centre[0, 1],
+                centre[1, 0], centre[1, 1],
+                speed[0], speed[1], averagear, blinkcount
+            ])
+
+
+# Score every video on a process pool, one CSV per video in outdir
+def processvideos(paths, outdir, chunk_seconds=60, workers=None, starttime=None):
+    os.makedirs(outdir, exist_ok=True)
+    tasks, rates, durations = [], {}, {}
+    for path in findvideos(paths):
+        chunks, fps = splitvideo(path, chunk_seconds)
+        if chunks:
+            tasks.extend(chunks)
+            rates[path] = fps
+            durations[path] = chunks[-1][2] / fps
+
+    results = {path: [] for path in rates}
+    with Pool(processes=workers, initializer=initworker) as pool:
+        for path, start, found, ears, centres in pool.imap_unordered(processchunk, tasks):
+            results[path].append((start, found, ears, centres))
+
+    outputs = []
+    for path, chunks in results.items():
+        rows = stitch(chunks, rates[path])
+        # Without an explicit start, assume the recording ended when the file was last written
+        start = starttime if starttime is not None else os.path.getmtime(path) - durations[path]
+        outcsv = os.path.join(outdir, os.path.splitext(os.path.basename(path))[0] + ".csv")
+        writecsv(rows, outcsv, start)
+        print(f"{path}: {len(rows)} rows saved to {outcsv}")
+        outputs.append(outcsv)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score recorded videos with the EAR/blink/speed pipeline.")
+    parser.add_argument("paths", nargs="+", help="Video files or directories of videos")
+    parser.add_argument("--out", default=".", help="Directory for the output CSV files")
+    parser.add_argument("--chunk-seconds", type=float, default=60, help="Length of the chunks given to each worker")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--start", default=None, help="Recording start time, YYYY-mm-dd HH:MM:SS")
+    args = parser.parse_args()
+
+    starttime = time.mktime(time.strptime(args.start, "%Y-%m-%d %H:%M:%S")) if args.start else None
+    processvideos(args.paths, args.out, args.chunk_seconds, args.workers, starttime)
+
+
+if __name__ == "__main__":
+    main()
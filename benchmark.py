@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Benchmark of the per-frame session code on a replayed landmark stream. Every component
+# runs on its own over the same frames and is timed per call; a second run under
+# tracemalloc gives its peak memory. Results can be saved as JSON and compared between
+# commits:
+#   python benchmark.py --json before.json
+#   python benchmark.py --compare before.json
+
+PERCENTILES = (50, 95, 99)
+
+
+# Frames of a source as arrays: timestamps (N,) and landmarks (N, 12, 2)
+def loadframes(source):
+    times, points = [], []
+    for timestamp, frame in source:
+        times.append(timestamp)
+        points.append(np.array(frame, dtype=float))
+    return np.array(times), np.array(points)
+
+
+# Call step(i) for every frame; returns frames/s and per-call latencies in nanoseconds
+def timeit(step, frames):
+    latencies = np.empty(frames, dtype=np.int64)
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(frames):
+        before = clock()
+        step(i)
+        latencies[i] = clock() - before
+    elapsed = (clock() - started) / 1e9
+    return frames / elapsed, latencies
+
+
+# Peak memory allocated while running step(i) over all frames
+def peakmemory(step, frames):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(frames):
+            step(i)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+# Components, as factories returning a fresh step(i) over (times, points) and a cleanup
+def components(times, points, workdir):
+    from eyemetrics import EyeKernel, BlinkDetector
+    from quantiles import ThresholdCalibrator
+    from snapshot import SnapshotChannel
+    from recorder import SessionRecorder
+    from sessionfile import RecordWriter
+    from landmarktrace import TraceRecorder
+    from aggregates import SessionAggregator
+
+    frames = len(times)
+    kernel = EyeKernel()
+    ears = np.empty((frames, 2))
+    centres = np.empty((frames, 2, 2))
+    speeds = np.empty((frames, 2))
+    for i in range(frames):
+        kernel.loadpixels(points[i])
+        ear, centre, speed = kernel.update(times[i])
+        ears[i], centres[i], speeds[i] = ear, centre, speed
+    averagears = ears.mean(axis=1).tolist()
+    averagespeeds = speeds.mean(axis=1).tolist()
+    rows = np.column_stack((centres.reshape(frames, 4), speeds, ears.mean(axis=1), np.zeros(frames))).tolist()
+    counter = [0]
+
+    def path(name):
+        counter[0] += 1
+        return os.path.join(workdir, f"{name}_{counter[0]}")
+
+    def kernelstep():
+        k = EyeKernel()
+
+        def step(i):
+            k.loadpixels(points[i])
+            k.update(times[i])
+        return step, None
+
+    def blinkstep():
+        blinks = BlinkDetector()
+        return (lambda i: blinks.update(ears[i])), None
+
+    def calibratestep():
+        calibrator = ThresholdCalibrator()
+        return (lambda i: calibrator.update(averagears[i], averagespeeds[i])), None
+
+    def publishstep():
+        channel = SnapshotChannel()
+        values = np.column_stack((times, ears.mean(axis=1), speeds.mean(axis=1), ears, speeds, np.zeros(frames),
+                                  np.full(frames, 0.25), np.full(frames, 150.0), np.full(frames, 300.0))).tolist()
+        return (lambda i: channel.publish(*values[i])), None
+
+    def recorderstep():
+        recorder = SessionRecorder(path("recorder.csv"))
+        return (lambda i: recorder.record(times[i], *rows[i])), recorder.close
+
+    def aggregatestep():
+        aggregates = SessionAggregator()
+        return (lambda i: aggregates.add(times[i], *rows[i])), None
+
+    def framefilestep():
+        writer = RecordWriter(path("frames.rec"))
+        return (lambda i: writer.append((int(times[i] * 1e9), *rows[i][:6], *ears[i], 0, 0))), writer.close
+
+    def tracestep():
+        trace = TraceRecorder(path("landmarks.trace"))
+        return (lambda i: trace.add(times[i], points[i])), trace.close
+
+    def metricsstep():
+        from Detect import FocusSession, SessionMetrics
+
+        session = FocusSession(name=path("session"), trace=False)
+        metrics = SessionMetrics(session)
+
+        def step(i):
+            metrics.kernel.loadpixels(points[i])
+            metrics.process(times[i])
+        return step, session.close
+
+    return {
+        "kernel": kernelstep,
+        "blink": blinkstep,
+        "calibrate": calibratestep,
+        "publish": publishstep,
+        "recorder": recorderstep,
+        "aggregates": aggregatestep,
+        "framefile": framefilestep,
+        "trace": tracestep,
+        "metrics": metricsstep,
+    }
+
+
+# Threaded capture -> inference -> metrics pipeline with trivial stages: queue overhead
+def pipelinerun(times, points, workdir):
+    from pipeline import Pipeline, BACKPRESSURE
+    from Detect import FocusSession, SessionMetrics
+
+    session = FocusSession(name=os.path.join(workdir, "pipeline"), trace=False)
+    metrics = SessionMetrics(session)
+    frames = iter(range(len(times)))
+
+    def capture():
+        return next(frames, None)
+
+    def metricstage(i):
+        metrics.kernel.loadpixels(points[i])
+        metrics.process(times[i])
+
+    pipeline = Pipeline(capture, lambda i: i, metricstage, policy=BACKPRESSURE)
+    started = time.perf_counter()
+    pipeline.run()
+    elapsed = time.perf_counter() - started
+    session.close()
+    return len(times) / elapsed
+
+
+# Run every component and the report; returns the results as a JSON-ready dict
+def runbenchmark(source, workdir, report=True):
+    times, points = loadframes(source)
+    results = {}
+    for name, factory in components(times, points, workdir).items():
+        step, cleanup = factory()
+        fps, latencies = timeit(step, len(times))
+        if cleanup:
+            cleanup()
+        step, cleanup = factory()
+        peak = peakmemory(step, len(times))
+        if cleanup:
+            cleanup()
+        quantiles = np.percentile(latencies, PERCENTILES) / 1000
+        results[name] = {"fps": fps, "peak_kb": peak / 1024}
+        results[name].update({f"p{p}_us": float(q) for p, q in zip(PERCENTILES, quantiles)})
+
+    results["pipeline"] = {"fps": pipelinerun(times, points, workdir)}
+
+    if report:
+        from report import createpdf
+        from Detect import FocusSession, SessionMetrics
+
+        session = FocusSession(name=os.path.join(workdir, "report"), trace=False)
+        metrics = SessionMetrics(session)
+        for i in range(len(times)):
+            metrics.kernel.loadpixels(points[i])
+            metrics.process(times[i])
+        session.close()
+        started = time.perf_counter()
+        createpdf(session.outcsv, session.outpdf, session.aggregates, workers=1, cache=False)
+        results["report"] = {"seconds": time.perf_counter() - started, "rows": session.aggregates.count}
+
+    return {
+        "commit": gitcommit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "frames": len(times),
+        "components": results,
+    }
+
+
+# Short hash of the checked-out commit, to tell saved results apart
+def gitcommit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Table of the results, with the change against `baseline` when given
+def printresults(results, baseline=None):
+    print(f"{results['frames']} frames, commit {results['commit']}, Python {results['python']}, numpy {results['numpy']}")
+    base = baseline["components"] if baseline else {}
+    header = f"{'component':<12}{'frames/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'peak KB':>10}"
+    print(header + ("   vs baseline" if baseline else ""))
+    for name, values in results["components"].items():
+        if "seconds" in values:
+            line = f"{name:<12}{values['seconds']:>11.2f}s"
+            if name in base:
+                line += f"{'':>40}   {(values['seconds'] / base[name]['seconds'] - 1) * 100:+.0f}% time"
+            print(line)
+            continue
+        line = f"{name:<12}{values['fps']:>12.0f}"
+        for key in ("p50_us", "p95_us", "p99_us"):
+            line += f"{values[key]:>10.1f}" if key in values else f"{'':>10}"
+        line += f"{values['peak_kb']:>10.0f}" if "peak_kb" in values else f"{'':>10}"
+        if name in base:
+            line += f"   {(values['fps'] / base[name]['fps'] - 1) * 100:+.0f}% fps"
+            if "p95_us" in values and "p95_us" in base[name]:
+                line += f", {(values['p95_us'] / base[name]['p95_us'] - 1) * 100:+.0f}% p95"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame session code on replayed landmarks")
+    parser.add_argument("source", nargs="?", help=".trace file or video (default: synthetic landmarks)")
+    parser.add_argument("--frames", type=int, default=20000, help="synthetic frames")
+    parser.add_argument("--no-report", action="store_true", help="skip the report benchmark")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    from replay import opensource, syntheticsource
+
+    source = opensource(args.source) if args.source else syntheticsource(args.frames, seed=0, start=1.7e9)
+    workdir = tempfile.mkdtemp(prefix="siot-bench-")
+    try:
+        results = runbenchmark(source, workdir, report=not args.no_report)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    printresults(results, baseline)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
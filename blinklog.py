@@ -0,0 +1,124 @@
+import numpy as np
+
+from sessionfile import RecordWriter, readrecords
+
+# One record per blink, written when the blink ends (see sessionfile.py for the file layout)
+BLINK_DTYPE = np.dtype([
+    ("onset_ns", "<i8"),    # First frame below the low threshold, epoch nanoseconds
+    ("offset_ns", "<i8"),   # Frame both eyes were back above the high threshold
+    ("min_left", "<f4"),    # Lowest EAR of each eye during the blink
+    ("min_right", "<f4"),
+])
+
+LONG_BLINK_SECONDS = 0.5  # Blinks at least this long count as a fatigue sign
+
+
+# Blink event log of a session, fed with every frame's EAR and BlinkDetector state.
+# A few bytes per blink; the header count is refreshed after every blink, so the
+# file can be read while the session is still running.
+class BlinkLog:
+    def __init__(self, path):
+        self.path = path
+        self.writer = RecordWriter(path, BLINK_DTYPE, block=256, sync_every=1)
+        self.onset = None
+        self.minimum = [0.0, 0.0]
+
+    @property
+    def count(self):
+        return self.writer.count
+
+    # `blinking` and `ended` as BlinkDetector left them after this frame's update
+    def update(self, timestamp, ear, blinking, ended):
+        if blinking:
+            if self.onset is None:
+                self.onset = timestamp
+                self.minimum[0], self.minimum[1] = ear[0], ear[1]
+            else:
+                self.minimum[0] = min(self.minimum[0], ear[0])
+                self.minimum[1] = min(self.minimum[1], ear[1])
+        elif ended and self.onset is not None:
+            self.writer.append((int(self.onset * 1e9), int(timestamp * 1e9), self.minimum[0], self.minimum[1]))
+            self.onset = None
+
+    # Drop a blink in progress, e.g. when the log starts following another subject
+    def reset(self):
+        self.onset = None
+
+    def close(self):
+        self.writer.close()
+
+
+# Blink events of a session file, with the per-blink values as arrays. Everything is
+# computed from the events alone, O(number of blinks).
+class BlinkEvents:
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def read(cls, path):
+        records = readrecords(path)
+        if records.dtype != BLINK_DTYPE:
+            raise ValueError(f"{path} is not a blink log")
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    # Epoch seconds
+    @property
+    def onsets(self):
+        return self.records["onset_ns"] / 1e9
+
+    @property
+    def offsets(self):
+        return self.records["offset_ns"] / 1e9
+
+    # Seconds from onset to offset
+    @property
+    def durations(self):
+        return (self.records["offset_ns"] - self.records["onset_ns"]) / 1e9
+
+    # Lowest EAR of either eye
+    @property
+    def minears(self):
+        return np.minimum(self.records["min_left"], self.records["min_right"])
+
+    # Seconds between the end of a blink and the start of the next
+    @property
+    def intervals(self):
+        return (self.records["onset_ns"][1:] - self.records["offset_ns"][:-1]) / 1e9
+
+    # Blinks started in each `seconds`-long bin from `start` (epoch seconds) to `end`
+    def counts(self, start, end, seconds=60):
+        bins = max(int(np.ceil((end - start) / seconds)), 1)
+        index = ((self.onsets - start) // seconds).astype(np.int64)
+        index = index[(index >= 0) & (index < bins)]
+        return start + np.arange(bins) * seconds, np.bincount(index, minlength=bins)
+
+    # Blinks per minute between `start` and `end`, by default the span of the blinks
+    def rate(self, start=None, end=None):
+        if not len(self):
+            return 0.0
+        start = self.onsets[0] if start is None else start
+        end = self.offsets[-1] if end is None else end
+        return float(len(self) / (end - start) * 60) if end > start else float("nan")
+
+    # Rate, duration and closure statistics used as fatigue signs
+    def fatigueindicators(self, start=None, end=None):
+        durations = self.durations
+        if not len(durations):
+            return {"blinks": 0, "rate": 0.0}
+        intervals = self.intervals
+        return {
+            "blinks": len(durations),
+            "rate": self.rate(start, end),
+            "mean_duration_ms": float(durations.mean() * 1000),
+            "p90_duration_ms": float(np.percentile(durations, 90) * 1000),
+            "long_blink_share": float((durations >= LONG_BLINK_SECONDS).mean()),
+            "mean_min_ear": float(self.minears.mean()),
+            "mean_interval_s": float(intervals.mean()) if len(intervals) else float("nan"),
+        }
+
+
+def readblinks(path):
+    return BlinkEvents.read(path)
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+SESSION_EXTENSIONS = (".csv", ".rec")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # Timestamp column of the session CSVs, one row per second
+STAT_COLUMNS = ["Left Eye X", "Left Eye Y", "Right Eye X", "Right Eye Y", "Left Speed", "Right Speed", "Average EAR", "Blink Count"]
+# Columns of SessionCatalog.read and of merged CSVs, in this order whatever the sessions
+# recorded; columns older sessions lack are empty
+MERGED_COLUMNS = ["Timestamp"] + STAT_COLUMNS + ["Session"]
+
+
+# Hash of a file's content, read in 1 MB blocks
+def filehash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Parse the Timestamp column of a session CSV table, in place
+def parsetimestamps(data):
+    data["Timestamp"] = pd.to_datetime(data["Timestamp"], format=TIMESTAMP_FORMAT)
+    return data
+
+
+# Load one session file (CSV or full-rate record file) with parsed timestamps. The one
+# loader of session files: the report, the catalog, the pyramid and imageGenerate use it.
+def loadsession(path):
+    if path.endswith(".rec"):
+        from sessionfile import readrecords, toframe
+        return toframe(readrecords(path))
+    return parsetimestamps(pd.read_csv(path))
+
+
+# Index of the session files in a directory, stored as JSON next to them. Every entry
+# keeps the file's size, mtime and hash, its time range, row count and per-column
+# summary statistics, so unchanged files are never reread and range queries only
+# need the index.
+class SessionCatalog:
+    def __init__(self, directory, index="catalog.json"):
+        self.directory = directory
+        self.indexpath = os.path.join(directory, index)
+        self.entries = {}
+        self.merged = {}  # Output file -> {session: hash} already written to it
+        if os.path.exists(self.indexpath):
+            with open(self.indexpath) as file:
+                saved = json.load(file)
+            self.entries = saved.get("sessions", {})
+            self.merged = saved.get("merged", {})
+
+    def save(self):
+        temp = self.indexpath + ".tmp"
+        with open(temp, "w") as file:
+            json.dump({"sessions": self.entries, "merged": self.merged}, file, indent=1)
+        os.replace(temp, self.indexpath)
+
+    # Summary of one session file
+    def _describe(self, path, stat, digest):
+        data = loadsession(path)
+        stats = {}
+        for column in STAT_COLUMNS:
+            if column in data:
+                values = data[column]
+                stats[column] = {
+                    "count": int(values.count()),
+                    "mean": float(values.mean()),
+                    "std": float(values.std()),
+                    "min": float(values.min()),
+                    "max": float(values.max()),
+                }
+        return {
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "hash": digest,
+            "start": str(data["Timestamp"].min()) if len(data) else None,
+            "end": str(data["Timestamp"].max()) if len(data) else None,
+            "rows": len(data),
+            "stats": stats,
+        }
+
+    # Bring the index up to date, only new or changed files are read
+    def refresh(self, skip=()):
+        skip = {os.path.abspath(path) for path in skip}
+        found = {}
+        for f in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, f)
+            if f.endswith(SESSION_EXTENSIONS) and os.path.abspath(path) not in skip:
+                found[f] = path
+
+        added, changed = [], []
+        for session, path in found.items():
+            stat = os.stat(path)
+            entry = self.entries.get(session)
+            if entry and entry["path"] == path and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+            digest = filehash(path)
+            if entry and entry["path"] == path and entry["hash"] == digest:
+                entry["mtime"] = stat.st_mtime
+                continue
+            try:
+                self.entries[session] = self._describe(path, stat, digest)
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            (changed if entry else added).append(session)
+
+        removed = [session for session in self.entries if session not in found]
+        for session in removed:
+            del self.entries[session]
+        self.save()
+        return added, changed, removed
+
+    # Sessions overlapping [start, end], answered from the index alone
+    def sessions(self, start=None, end=None):
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        matches = []
+        for session, entry in sorted(self.entries.items(), key=lambda item: item[1]["start"] or ""):
+            if entry["start"] is None:
+                continue
+            if end is not None and pd.Timestamp(entry["start"]) > end:
+                continue
+            if start is not None and pd.Timestamp(entry["end"]) < start:
+                continue
+            matches.append(session)
+        return matches
+
+    # Rows of the selected sessions with a "Session" column, reading only those files
+    def read(self, sessions=None, start=None, end=None):
+        if sessions is None:
+            sessions = self.sessions(start, end)
+        frames = []
+        for session in sessions:
+            data = loadsession(self.entries[session]["path"])
+            if start is not None:
+                data = data[data["Timestamp"] >= pd.Timestamp(start)]
+            if end is not None:
+                data = data[data["Timestamp"] <= pd.Timestamp(end)]
+            data["Session"] = os.path.splitext(session)[0]
+            frames.append(data)
+        if not frames:
+            return pd.DataFrame(columns=MERGED_COLUMNS)
+        return pd.concat(frames, ignore_index=True).reindex(columns=MERGED_COLUMNS)
+
+    # Keep a merged CSV of all sessions up to date. New sessions are appended; if a
+    # merged session changed or disappeared, or the file has other columns than
+    # MERGED_COLUMNS, the file is rebuilt.
+    def merge(self, output_file):
+        key = os.path.abspath(output_file)
+        done = self.merged.get(key, {})
+        current = {session: entry["hash"] for session, entry in self.entries.items()}
+        stale = any(current.get(session) != digest for session, digest in done.items())
+        if stale or not os.path.exists(output_file) or list(pd.read_csv(output_file, nrows=0).columns) != MERGED_COLUMNS:
+            done = {}
+        new = [session for session in self.sessions() if session not in done]
+
+        if new or not done:
+            data = self.read(new)
+            if len(data):
+                data["Timestamp"] = data["Timestamp"].dt.strftime(TIMESTAMP_FORMAT)
+            if done:
+                data.to_csv(output_file, mode="a", header=False, index=False)
+            else:
+                data.to_csv(output_file, index=False)
+            done.update({session: current[session] for session in new})
+            self.merged[key] = done
+            self.save()
+        print(f"Merged {len(new)} new of {len(done)} sessions into {output_file}")
+        return new
@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+
+from landmarkers import BACKENDS
+
+# Command line entry point. Each subcommand imports only what it needs, so `report`
+# never loads OpenCV or Mediapipe and `upload` loads neither pandas nor matplotlib.
+# Cold start of a subcommand: python -X importtime cli.py <command> ... 2>&1 | tail
+
+# Upload folder of every session file type
+UPLOAD_FOLDERS = {".csv": "csv", ".pdf": "pdf", ".rec": "rec", ".blinks": "blinks", ".npz": "pyramid"}
+
+
+# Live session with the dashboard, or the headless attention server
+def detect(args):
+    import Detect
+
+    mode = "worker" if args.worker else "headless" if args.headless else "blit"
+    source = Detect.FRAME_SOURCE if args.source is None else args.source
+    faces = Detect.MAX_FACES if args.faces is None else args.faces
+    backend = Detect.INFERENCE_BACKEND if args.backend is None else args.backend
+    Detect.runsession(mode=mode, full_rate=args.full_rate, max_faces=faces, backend=backend, source=source)
+
+
+# PDF report of one session file
+def report(args):
+    from report import createpdf
+
+    pdf_file = args.pdf or f"{os.path.splitext(args.file)[0]}_FocusReport.pdf"
+    createpdf(args.file, pdf_file, workers=args.workers, blinks=args.blinks, cache=not args.no_cache)
+
+
+# Upload files through the spool, and resume what earlier runs left in it
+def upload(args):
+    from uploader import UploadQueue, FirebaseBucket, LocalBucket
+
+    bucket = LocalBucket(args.local) if args.local else FirebaseBucket()
+    uploads = UploadQueue(bucket).start()
+    for path in args.files:
+        folder = args.folder or UPLOAD_FOLDERS.get(os.path.splitext(path)[1], "other")
+        uploads.enqueue(path, folder)
+    done = uploads.wait(args.wait)
+    uploads.close(timeout=1)
+    if not done:
+        print(f"{len(uploads.pending())} uploads still pending, they will resume on the next start")
+        return 1
+
+
+# Out-of-core statistics over session files and directories
+def analyze(args):
+    import streamstats
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith((".csv", ".rec")))
+        else:
+            paths.append(path)
+    summary = streamstats.streamanalysis(paths, workers=args.workers, chunksize=args.chunk_rows)
+    print(f"{summary['rows']} rows from {summary['sessions']} sessions")
+    print(summary["summary"])
+    print(f"EAR thresholds: {summary['ear_low']:.3f} / {summary['ear_high']:.3f}")
+    print(f"Fatigue thresholds: EAR {summary['fatigue_ear']:.3f}, speed {summary['fatigue_speed']:.1f}")
+    print(f"Blinks: {summary['blinks']} ({summary['blink_rate']:.1f} per minute)")
+    print(summary["distribution"])
+    print(summary["states"])
+
+
+# Summary pyramids of existing session files, saved as <file>.pyramid.npz
+def pyramid(args):
+    from pyramid import sessionpyramid, LEVELS
+
+    for path in args.files:
+        levels = sessionpyramid(path, rebuild=args.rebuild).levels
+        print(f"{path}: " + ", ".join(f"{len(levels[seconds]['start'])} x {seconds} s" for seconds in LEVELS))
+
+
+# Size of the report cache, or empty it
+def cache(args):
+    from reportcache import ReportCache
+
+    reports = ReportCache()
+    if args.clear:
+        reports.clear()
+    print(f"{reports.directory}: {len(reports.entries())} entries, {reports.size() / 1e6:.1f} of {reports.max_bytes / 1e6:.0f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py", description="Focus detection sessions, reports and uploads")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("detect", help="run a live focus session")
+    command.add_argument("--headless", action="store_true", help="serve the attention values instead of the dashboard")
+    command.add_argument("--worker", action="store_true", help="status lines on stdout, 'stop' on stdin ends the session")
+    command.add_argument("--full-rate", action="store_true", help="also record every frame to a .rec file")
+    command.add_argument("--source", help="camera index, video file, image directory or 'synthetic'")
+    command.add_argument("--faces", type=int, help="subjects to track, each with its own CSV (default: Detect.MAX_FACES)")
+    command.add_argument("--backend", choices=BACKENDS,
+                         help="legacy FaceMesh, or the asynchronous FaceLandmarker (needs face_landmarker.task; "
+                              "default: Detect.INFERENCE_BACKEND)")
+    command.set_defaults(run=detect)
+
+    command = commands.add_parser("report", help="build the PDF report of a session file")
+    command.add_argument("file", help="session .csv or .rec file")
+    command.add_argument("--pdf", help="output PDF (default: <file>_FocusReport.pdf)")
+    command.add_argument("--workers", type=int, default=None, help="processes rendering pages (default: all cores)")
+    command.add_argument("--blinks", help="blink log of the session (default: <file>.blinks if it exists)")
+    command.add_argument("--no-cache", action="store_true", help="render everything again, without the report cache")
+    command.set_defaults(run=report)
+
+    command = commands.add_parser("upload", help="upload files, and whatever is still pending in the spool")
+    command.add_argument("files", nargs="*", help="files to upload")
+    command.add_argument("--folder", help="remote folder (default: by file type)")
+    command.add_argument("--local", help="copy into this directory instead of Firebase Storage")
+    command.add_argument("--wait", type=float, default=None, help="seconds to wait for the uploads (default: until done)")
+    command.set_defaults(run=upload)
+
+    command = commands.add_parser("analyze", help="statistics and states over many sessions, out of core")
+    command.add_argument("paths", nargs="+", help="session files or directories")
+    command.add_argument("--workers", type=int, default=None, help="processes, one per session file (default: all cores)")
+    command.add_argument("--chunk-rows", type=int, default=100000, help="rows read at once per file")
+    command.set_defaults(run=analyze)
+
+    command = commands.add_parser("pyramid", help="build the min/max/mean summary pyramid of session files")
+    command.add_argument("files", nargs="+", help="session .csv or .rec files")
+    command.add_argument("--rebuild", action="store_true", help="rebuild pyramids that are up to date")
+    command.set_defaults(run=pyramid)
+
+    command = commands.add_parser("cache", help="show or clear the cache of reports and derived data")
+    command.add_argument("--clear", action="store_true", help="delete every entry")
+    command.set_defaults(run=cache)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eyemetrics import focusscore
+from quantiles import DEFAULT_THRESHOLDS
+
+# Scale of the EAR bar and threshold of the focus bar; the EAR and speed thresholds
+# come with every sample
+EAR_SCALE = 0.30
+FOCUS_THRESHOLD = 0.5
+
+
+# Function to limit change, avoide error and the dashboard changes too quickly
+def smoothchange(current, target, change):
+    if abs(current - target) > change:
+        return current + change if target > current else current - change
+    return target
+
+
+# Current dashboard values from one attention sample (see snapshot.py)
+def dashboardvalues(sample):
+    return {
+        "frame": sample.frame,
+        "timestamp": sample.timestamp,
+        "ear": sample.ear,
+        "speed": sample.speed,
+        "focus_score": float(focusscore(sample.ear, sample.speed, sample.ear_fatigue, sample.speed_scale)),
+        "blinks": int(sample.blinks),
+        "ear_fatigue": sample.ear_fatigue,
+        "speed_fatigue": sample.speed_fatigue,
+        "speed_scale": sample.speed_scale,
+    }
+
+
+# Matplotlib dashboard that blits the three bars only. `source` returns the latest
+# attention sample (e.g. SnapshotChannel.read); the bars are refreshed `refresh_hz`
+# times per second and their properties only touched when something visible changed.
+# The bars are blitted on every frame all the same: blitting restores the background
+# first, so a frame that returned no artists would leave them off the screen.
+class Dashboard:
+    def __init__(self, source, refresh_hz=2):
+        import matplotlib.pyplot as plt
+        from matplotlib.animation import FuncAnimation
+
+        self.source = source
+        self.prev_ear = 0.5
+        self.state = None
+
+        self.fig, ax = plt.subplots(3, 1, figsize=(6, 8))
+        self.fig.suptitle("Attention Monitoring Dashboard")
+        self.p_ear = ax[0].barh(0, 0, color="green", align="center")[0]
+        self.p_speed = ax[1].barh(0, 0, color="green", align="center")[0]
+        self.p_focus = ax[2].barh(0, 0, color="blue", align="center")[0]
+        defaults = DEFAULT_THRESHOLDS
+        self.l_ear = ax[0].axvline(x=defaults.ear_fatigue / EAR_SCALE, color="red", linestyle="--", label="Fatigue Threshold")
+        self.l_speed = ax[1].axvline(x=defaults.speed_fatigue / defaults.speed_scale, color="red", linestyle="--", label="Fatigue Threshold")
+        # Threshold lines move once the thresholds are calibrated, so they are blitted too
+        for artist in (self.p_ear, self.p_speed, self.p_focus, self.l_ear, self.l_speed):
+            artist.set_animated(True)
+        for i, a in enumerate(ax):
+            a.set_xlim(0, 1)
+            a.set_ylim(-0.5, 0.5)
+            if i == 0:
+                a.set_title("EAR")
+            elif i == 1:
+                a.set_title("Speed")
+            else:
+                a.axvline(x=FOCUS_THRESHOLD, color="yellow", linestyle="--", label="Threshold")
+                a.set_title("Focus Score")
+            a.legend(loc="upper right")
+            a.axis("off")
+
+        self.ani = FuncAnimation(self.fig, self.update, interval=1000 / refresh_hz, blit=True, cache_frame_data=False)
+
+    # Update dashboard
+    def update(self, frame):
+        values = dashboardvalues(self.source())
+        ear, speed, focus_score = values["ear"], values["speed"], values["focus_score"]
+        ear_fatigue, speed_fatigue, speed_scale = values["ear_fatigue"], values["speed_fatigue"], values["speed_scale"]
+
+        ear_value = smoothchange(self.prev_ear, max(0, min(ear / EAR_SCALE, 1)), 0.05)
+        self.prev_ear = ear_value
+        speed_value = max(0, min(speed / speed_scale, 1))
+        ear_line = min(ear_fatigue / EAR_SCALE, 1)
+        speed_line = min(speed_fatigue / speed_scale, 1)
+
+        state = (
+            round(ear_value, 3), ear < ear_fatigue, round(ear_line, 3),
+            round(speed_value, 3), speed > speed_fatigue, round(speed_line, 3),
+            round(focus_score, 3), focus_score > FOCUS_THRESHOLD,
+        )
+        artists = [self.p_ear, self.p_speed, self.p_focus, self.l_ear, self.l_speed]
+        if state == self.state:
+            return artists
+        self.state = state
+
+        self.p_ear.set_width(ear_value)
+        self.p_ear.set_color("red" if ear < ear_fatigue else "green")
+        self.l_ear.set_xdata([ear_line, ear_line])
+        self.p_speed.set_width(speed_value)
+        self.p_speed.set_color("red" if speed > speed_fatigue else "green")
+        self.l_speed.set_xdata([speed_line, speed_line])
+        self.p_focus.set_width(focus_score)
+        self.p_focus.set_color("blue" if focus_score > FOCUS_THRESHOLD else "red")
+        return artists
+
+    def show(self):
+        import matplotlib.pyplot as plt
+        plt.show()
+
+
+# Headless mode: serve the attention values on localhost instead of drawing them.
+#   GET /attention  latest values as JSON
+#   GET /events     server-sent events, one JSON message every 1 / rate_hz seconds
+class AttentionServer:
+    def __init__(self, source, host="127.0.0.1", port=8765, rate_hz=2):
+        self.source = source
+        self.interval = 1 / rate_hz
+        self.stopped = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/attention":
+                    body = json.dumps(dashboardvalues(server.source())).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.path == "/events":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    try:
+                        while not server.stopped.is_set():
+                            message = json.dumps(dashboardvalues(server.source()))
+                            self.wfile.write(f"data: {message}\n\n".encode())
+                            self.wfile.flush()
+                            server.stopped.wait(server.interval)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="attention-server", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        print(f"Attention values served at {self.url}/attention and {self.url}/events")
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
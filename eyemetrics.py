@@ -0,0 +1,187 @@
+import numpy as np
+
+# Define left and right eye landmarks
+LEFT_EYE = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+
+# Blink thresholds
+EAR_THRESHOLD_LOW = 0.21   # Start of a blink (either eye)
+EAR_THRESHOLD_HIGH = 0.23  # End of a blink (both eyes)
+
+# Each eye is stored as [p1, p2, p0, p5, p4, p3] so the two vertical and the
+# horizontal EAR distances are the first three rows minus the last three rows
+EAR_ORDER = [1, 2, 0, 5, 4, 3]
+EYE_INDICES = np.array([[eye[i] for i in EAR_ORDER] for eye in (LEFT_EYE, RIGHT_EYE)])
+
+
+# EAR, eye centres and speeds of both eyes from the 12 eye landmarks.
+# All buffers are allocated once, the returned arrays are overwritten by the next update.
+class EyeKernel:
+    def __init__(self):
+        self.indices = EYE_INDICES.ravel()
+        self.points = np.zeros((2, 6, 2))  # Pixel coordinates, row 0 left eye, row 1 right eye
+        self.flat = self.points.reshape(12, 2)
+        self.scale = np.ones(2)
+        self.origin = np.zeros(2)
+        self.diff = np.zeros((2, 3, 2))
+        self.dist = np.zeros((2, 3))
+        self.ear = np.zeros(2)
+        self.centre = np.zeros((2, 2))
+        self.prev = np.zeros((2, 2))
+        self.move = np.zeros((2, 2))
+        self.speed = np.zeros(2)
+        self.pretime = None
+
+    # Copy the eye landmarks out of a Mediapipe landmark list (normalized x, y)
+    def load(self, landmarks, width, height, origin=(0, 0)):
+        flat = self.flat
+        for k, i in enumerate(self.indices):
+            point = landmarks[i]
+            flat[k, 0] = point.x
+            flat[k, 1] = point.y
+        self._toframe(width, height, origin)
+
+    # Same as load, for an (N, 2) or (N, 3) array of normalized landmarks
+    def loadarray(self, landmarks, width, height, origin=(0, 0)):
+        np.take(landmarks[:, :2], self.indices, axis=0, out=self.flat)
+        self._toframe(width, height, origin)
+
+    # Landmarks already in full-frame pixels, in the order of `flat` (e.g. from a trace)
+    def loadpixels(self, points):
+        self.flat[...] = points
+
+    def _toframe(self, width, height, origin):
+        self.scale[0], self.scale[1] = width, height
+        self.origin[0], self.origin[1] = origin
+        np.multiply(self.flat, self.scale, out=self.flat)
+        np.add(self.flat, self.origin, out=self.flat)
+
+    # Compute EAR, centres and speeds of the loaded landmarks at time `timestamp` (seconds)
+    def update(self, timestamp):
+        np.subtract(self.points[:, :3], self.points[:, 3:], out=self.diff)
+        np.hypot(self.diff[..., 0], self.diff[..., 1], out=self.dist)
+        np.add(self.dist[:, 0], self.dist[:, 1], out=self.ear)
+        np.divide(self.ear, self.dist[:, 2], out=self.ear)
+        np.multiply(self.ear, 0.5, out=self.ear)
+
+        np.mean(self.points, axis=1, out=self.centre)
+
+        if self.pretime is not None and timestamp > self.pretime:
+            np.subtract(self.centre, self.prev, out=self.move)
+            np.hypot(self.move[:, 0], self.move[:, 1], out=self.speed)
+            np.divide(self.speed, timestamp - self.pretime, out=self.speed)
+        else:
+            self.speed.fill(0)
+
+        self.prev[...] = self.centre
+        self.pretime = timestamp
+        return self.ear, self.centre, self.speed
+
+    # Forget the previous position, the next update reports zero speed
+    def reset(self):
+        self.pretime = None
+
+
+# Blink detection with hysteresis between the low and high EAR thresholds
+class BlinkDetector:
+    def __init__(self, low=EAR_THRESHOLD_LOW, high=EAR_THRESHOLD_HIGH):
+        self.low = low
+        self.high = high
+        self.count = 0
+        self.blinking = False
+
+    # Feed the (left, right) EAR, returns True when a blink has just ended
+    def update(self, ear):
+        if ear[0] < self.low or ear[1] < self.low:
+            self.blinking = True
+        elif ear[0] > self.high and ear[1] > self.high and self.blinking:
+            self.count += 1
+            self.blinking = False
+            return True
+        return False
+
+
+# EyeKernel for up to `faces` faces at once: one slot per tracked face, every update
+# computes all slots in the same vectorized operations. `active` masks the slots with a
+# face in the current frame; the others keep their previous position.
+class MultiEyeKernel:
+    def __init__(self, faces):
+        self.indices = EYE_INDICES.ravel()
+        self.points = np.zeros((faces, 2, 6, 2))
+        self.flat = self.points.reshape(faces, 12, 2)
+        self.diff = np.zeros((faces, 2, 3, 2))
+        self.dist = np.zeros((faces, 2, 3))
+        self.ear = np.zeros((faces, 2))
+        self.centre = np.zeros((faces, 2, 2))
+        self.prev = np.zeros((faces, 2, 2))
+        self.move = np.zeros((faces, 2, 2))
+        self.speed = np.zeros((faces, 2))
+        self.pretime = np.full(faces, np.nan)  # NaN: no previous position
+        self.elapsed = np.zeros(faces)
+        self.moving = np.zeros(faces, dtype=bool)
+
+    # Copy one face's eye landmarks (normalized x, y) into `slot`
+    def load(self, slot, landmarks, width, height, origin=(0, 0)):
+        flat = self.flat[slot]
+        for k, i in enumerate(self.indices):
+            point = landmarks[i]
+            flat[k, 0] = point.x * width + origin[0]
+            flat[k, 1] = point.y * height + origin[1]
+
+    # Landmarks already in full-frame pixels, in the order of `flat[slot]`
+    def loadpixels(self, slot, points):
+        self.flat[slot] = points
+
+    # EAR, centres and speeds of every slot, shapes (faces, 2), (faces, 2, 2), (faces, 2)
+    def update(self, timestamp, active):
+        np.subtract(self.points[:, :, :3], self.points[:, :, 3:], out=self.diff)
+        np.hypot(self.diff[..., 0], self.diff[..., 1], out=self.dist)
+        np.add(self.dist[..., 0], self.dist[..., 1], out=self.ear)
+        with np.errstate(invalid="ignore"):  # Slots never used yet hold zeros
+            np.divide(self.ear, self.dist[..., 2], out=self.ear)
+        np.multiply(self.ear, 0.5, out=self.ear)
+
+        np.mean(self.points, axis=2, out=self.centre)
+
+        np.subtract(timestamp, self.pretime, out=self.elapsed)
+        np.greater(self.elapsed, 0, out=self.moving)  # False for NaN
+        np.logical_and(self.moving, active, out=self.moving)
+        np.subtract(self.centre, self.prev, out=self.move)
+        np.hypot(self.move[..., 0], self.move[..., 1], out=self.speed)
+        np.divide(self.speed, self.elapsed[:, None], out=self.speed, where=self.moving[:, None])
+        np.copyto(self.speed, 0, where=~self.moving[:, None])
+
+        np.copyto(self.prev, self.centre, where=active[:, None, None])
+        np.copyto(self.pretime, timestamp, where=active)
+        return self.ear, self.centre, self.speed
+
+    # Forget the previous position of `slot`, e.g. when a new face takes it
+    def reset(self, slot):
+        self.pretime[slot] = np.nan
+
+
+# BlinkDetector for every slot of a MultiEyeKernel, with per-slot thresholds
+class MultiBlinkDetector:
+    def __init__(self, faces, low=EAR_THRESHOLD_LOW, high=EAR_THRESHOLD_HIGH):
+        self.low = np.full(faces, low)
+        self.high = np.full(faces, high)
+        self.count = np.zeros(faces, dtype=int)
+        self.blinking = np.zeros(faces, dtype=bool)
+
+    # Feed the (faces, 2) EAR of the `active` slots, returns the mask of blinks that just ended
+    def update(self, ear, active):
+        closed = (ear < self.low[:, None]).any(axis=1) & active
+        ended = (ear > self.high[:, None]).all(axis=1) & active & self.blinking
+        self.count += ended
+        self.blinking = (self.blinking | closed) & ~ended
+        return ended
+
+    def reset(self, slot):
+        self.count[slot] = 0
+        self.blinking[slot] = False
+
+
+# Focus score from EAR and average eye speed, for single values or whole columns.
+# ear_fatigue and speed_scale default to the fixed thresholds, see quantiles.py
+def focusscore(ear, speed, ear_fatigue=0.25, speed_scale=300):
+    return np.clip(1 - np.abs(ear - ear_fatigue) / 0.30 - speed / speed_scale, 0, 1)
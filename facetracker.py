@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+# Face oval landmarks (forehead, chin, cheeks, temples, jaw) used to bound the face
+FACE_OUTLINE = [10, 152, 234, 454, 127, 356, 172, 397]
+
+
+# Track the face box from the previous frame's landmarks so FaceMesh only sees the face.
+# Falls back to the full frame when no box is known or the face was lost.
+class FaceRoiTracker:
+    def __init__(self, margin=0.25, scale=1.0, min_size=96):
+        self.margin = margin  # Extra border around the face, as a fraction of its size
+        self.scale = scale    # Resize factor applied to the crop before inference
+        self.min_size = min_size
+        self.box = None       # (x0, y0, w, h) in full-frame pixels
+        self.framesize = None
+        self.points = np.zeros((len(FACE_OUTLINE), 2))
+        self.lost = 0
+
+    # Returns the image to run inference on and the box it covers in the full frame
+    def crop(self, frame):
+        height, width = frame.shape[:2]
+        if self.framesize != (width, height):
+            self.framesize = (width, height)
+            self.box = None
+        if self.box is None:
+            box = (0, 0, width, height)
+            roi = frame
+        else:
+            box = self.box
+            x0, y0, w, h = box
+            roi = frame[y0:y0 + h, x0:x0 + w]
+        if self.scale != 1.0:
+            roi = cv2.resize(roi, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return roi, box
+
+    # Feed the landmarks found inside `box` (None when no face was found)
+    def update(self, landmarks, box):
+        if landmarks is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+        x0, y0, w, h = box
+        for k, i in enumerate(FACE_OUTLINE):
+            point = landmarks[i]
+            self.points[k, 0] = point.x * w + x0
+            self.points[k, 1] = point.y * h + y0
+        left, top = self.points.min(axis=0)
+        right, bottom = self.points.max(axis=0)
+
+        # Keep the current box while the face stays well inside it, so the crop does not jitter
+        if self.box is not None:
+            bx, by, bw, bh = self.box
+            inset = self.margin / 2 * max(right - left, bottom - top)
+            if left - inset >= bx and top - inset >= by and right + inset <= bx + bw and bottom + inset <= by + bh:
+                return
+
+        width, height = self.framesize
+        pad = self.margin * max(right - left, bottom - top)
+        x0 = int(max(0, left - pad))
+        y0 = int(max(0, top - pad))
+        x1 = int(min(width, right + pad))
+        y1 = int(min(height, bottom + pad))
+        if x1 - x0 < self.min_size or y1 - y0 < self.min_size:
+            self.box = None
+        else:
+            self.box = (x0, y0, x1 - x0, y1 - y0)
@@ -0,0 +1,220 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Frame sources for the capture stage. Every source reads into a small ring of
+# preallocated BGR buffers, so steady-state capture allocates no frame memory.
+# A buffer is normally reused `buffers` frames later. Under DROP_OLDEST capture keeps
+# going while inference works on a frame, however long that takes, so a consumer that
+# keeps a frame holds it (source.hold / source.release) and the ring skips it until
+# it is released. The ring then only has to cover the frames waiting in the queue,
+# the one being captured and the held ones.
+FRAME_BUFFERS = 5
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+# Ring of preallocated arrays of one shape. Held buffers are skipped; when every buffer
+# is held the ring grows by one.
+class FramePool:
+    def __init__(self, shape, count=FRAME_BUFFERS, dtype=np.uint8):
+        self.buffers = [np.empty(shape, dtype=dtype) for _ in range(count)]
+        self.index = 0
+        self.held = set()  # id() of the held buffers
+
+    @property
+    def shape(self):
+        return self.buffers[0].shape
+
+    def take(self):
+        for _ in range(len(self.buffers)):
+            buffer = self.buffers[self.index]
+            self.index = (self.index + 1) % len(self.buffers)
+            if id(buffer) not in self.held:
+                return buffer
+        buffer = np.empty_like(self.buffers[0])
+        self.buffers.insert(self.index, buffer)
+        self.index = (self.index + 1) % len(self.buffers)
+        return buffer
+
+    def hold(self, buffer):
+        self.held.add(id(buffer))
+
+    def release(self, buffer):
+        self.held.discard(id(buffer))
+
+
+# Holding frames of a source's pool; after a resolution change the old pool is gone
+# and releasing its frames does nothing
+class PooledSource:
+    pool = None
+
+    def hold(self, frame):
+        if self.pool is not None:
+            self.pool.hold(frame)
+
+    def release(self, frame):
+        if self.pool is not None:
+            self.pool.release(frame)
+
+
+# Colour conversion into reused buffers, reallocated only when the image size changes
+# (e.g. when the tracked face region is resized)
+class ColorConverter:
+    def __init__(self, code=cv2.COLOR_BGR2RGB, buffers=1):
+        self.code = code
+        self.count = buffers
+        self.pool = None
+
+    def convert(self, image):
+        if self.pool is None or self.pool.shape != image.shape:
+            self.pool = FramePool(image.shape, self.count, image.dtype)
+        return cv2.cvtColor(image, self.code, dst=self.pool.take())
+
+
+# cv2.VideoCapture decoding into the buffer pool: cameras and video files
+class CaptureSource(PooledSource):
+    def __init__(self, capture, buffers=FRAME_BUFFERS):
+        self.capture = capture
+        self.count = buffers
+        self.pool = None
+
+    @property
+    def opened(self):
+        return self.capture.isOpened()
+
+    @property
+    def fps(self):
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    # Next frame, or None at the end of the stream; the array is reused later
+    def read(self):
+        buffer = self.pool.take() if self.pool is not None else None
+        ret, frame = self.capture.read(buffer)
+        if not ret:
+            return None
+        if frame is not buffer:
+            # First frame, a resolution change, or a backend that returned its own array
+            if self.pool is None or self.pool.shape != frame.shape:
+                self.pool = FramePool(frame.shape, self.count)
+            buffer = self.pool.take()
+            np.copyto(buffer, frame)
+        return buffer
+
+    def close(self):
+        self.capture.release()
+
+
+# Camera by index; fourcc such as "MJPG" lets many USB cameras reach 60 fps at 1080p
+class CameraSource(CaptureSource):
+    def __init__(self, index=0, width=1920, height=1080, fps=60, fourcc=None, buffers=FRAME_BUFFERS):
+        capture = cv2.VideoCapture(index)
+        if fourcc:
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        capture.set(cv2.CAP_PROP_FPS, fps)
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Keep frames from piling up in the driver
+        super().__init__(capture, buffers)
+
+
+# Video file, as fast as it decodes or paced at its own frame rate with `realtime`
+class VideoSource(CaptureSource):
+    def __init__(self, path, realtime=False, buffers=FRAME_BUFFERS):
+        super().__init__(cv2.VideoCapture(path), buffers)
+        self.realtime = realtime
+        self.next = None
+
+    def read(self):
+        if self.realtime:
+            self.next = pace(self.next, self.fps or 30)
+        return super().read()
+
+
+# Images of a directory in name order. Decoding allocates, the frames handed out are
+# still pool buffers so downstream stages see the same memory behaviour as a camera.
+class ImageDirectorySource(PooledSource):
+    def __init__(self, path, fps=30, realtime=False, buffers=FRAME_BUFFERS):
+        self.files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.position = 0
+        self.fps = fps
+        self.realtime = realtime
+        self.next = None
+        self.count = buffers
+        self.pool = None
+
+    @property
+    def opened(self):
+        return self.position < len(self.files)
+
+    def read(self):
+        while self.position < len(self.files):
+            image = cv2.imread(self.files[self.position], cv2.IMREAD_COLOR)
+            self.position += 1
+            if image is None:
+                continue
+            if self.realtime:
+                self.next = pace(self.next, self.fps)
+            if self.pool is None or self.pool.shape != image.shape:
+                self.pool = FramePool(image.shape, self.count)
+            buffer = self.pool.take()
+            np.copyto(buffer, image)
+            return buffer
+        return None
+
+    def close(self):
+        self.position = len(self.files)
+
+
+# Moving gradient frames generated in place, for exercising capture and the pipeline
+# without a camera; `frames` None runs until closed
+class SyntheticSource(PooledSource):
+    def __init__(self, width=1920, height=1080, fps=60, frames=None, realtime=True, buffers=FRAME_BUFFERS):
+        self.fps = fps
+        self.frames = frames
+        self.realtime = realtime
+        self.next = None
+        self.position = 0
+        self.pool = FramePool((height, width, 3), buffers)
+        x = np.linspace(0, 255, width, dtype=np.uint16)
+        y = np.linspace(0, 255, height, dtype=np.uint16)
+        self.base = ((x[None, :, None] + y[:, None, None] + np.array([0, 85, 170], dtype=np.uint16)) % 256).astype(np.uint8)
+
+    @property
+    def opened(self):
+        return self.frames is None or self.position < self.frames
+
+    def read(self):
+        if not self.opened:
+            return None
+        if self.realtime:
+            self.next = pace(self.next, self.fps)
+        buffer = self.pool.take()
+        np.add(self.base, self.position % 256, out=buffer, casting="unsafe")
+        self.position += 1
+        return buffer
+
+    def close(self):
+        self.frames = self.position
+
+
+# Sleep until the deadline of the next frame, returns the deadline after that
+def pace(deadline, fps):
+    now = time.monotonic()
+    if deadline is None or deadline < now - 1:
+        deadline = now
+    elif deadline > now:
+        time.sleep(deadline - now)
+    return deadline + 1 / fps
+
+
+# Source from a specification: a camera index, "synthetic", a directory of images or a video file
+def opensource(spec, width=1920, height=1080, fps=60, fourcc=None, buffers=FRAME_BUFFERS):
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), width, height, fps, fourcc, buffers)
+    if spec == "synthetic":
+        return SyntheticSource(width, height, fps, buffers=buffers)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, fps, realtime=True, buffers=buffers)
+    return VideoSource(spec, realtime=True, buffers=buffers)
@@ -1,6 +1,10 @@
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from catalog import loadsession
+from pyramid import sessionpyramid
+from reportcache import ReportCache, cachekey
 
 # File path for the combined data
 combined_file = "/Users/bocai/Desktop/Sensing and Internet of Things/Analysis/28NOVNight.csv"
@@ -9,8 +13,7 @@ combined_file = "/Users/bocai/Desktop/Sensing and Internet of Things/Analysis/28
 def load_combined_data(file):
     try:
         # Load the data from the CSV file
-        data = pd.read_csv(file)
-        data["Timestamp"] = pd.to_datetime(data["Timestamp"], format="%Y-%m-%d %H:%M:%S")
+        data = loadsession(file)
         print("Combined data loaded successfully!")
         return data
     except FileNotFoundError:
@@ -32,6 +35,13 @@ def load_combined_data(file):
         plt.tight_layout()
         plt.close()
     
+# Load combined data, parsed once per file content and then read back from the report cache
+def load_cached_data(file):
+    if not os.path.exists(file):
+        return load_combined_data(file)
+    cache = ReportCache()
+    return cache.cached(cachekey("frame", cache.filekey(file)), lambda: load_combined_data(file))
+
 # Plot Eye Movement Hotspot Map
 def plot_hotspot_map(data):
     left_eye_coords = data[["Left Eye X", "Left Eye Y"]].values
@@ -50,15 +60,16 @@ def plot_hotspot_map(data):
     plt.tight_layout()
     plt.show()
 
-# Plot Speed Over Time
-def plot_speed_over_time(data):
-    timestamps = data["Timestamp"]
-    left_speeds = data["Left Speed"]
-    right_speeds = data["Right Speed"]
+# Min/max envelope of a column from the session pyramid, a few hundred points whatever the session length
+def envelope(pyramid, column):
+    x, y = pyramid.envelope(column)
+    return pd.to_datetime(x, unit="s"), y
 
+# Plot Speed Over Time
+def plot_speed_over_time(pyramid):
     plt.figure(figsize=(12, 6))
-    plt.plot(timestamps, left_speeds, label="Left Eye Speed", linewidth=2)
-    plt.plot(timestamps, right_speeds, label="Right Eye Speed", linewidth=2)
+    plt.plot(*envelope(pyramid, "Left Speed"), label="Left Eye Speed", linewidth=2)
+    plt.plot(*envelope(pyramid, "Right Speed"), label="Right Eye Speed", linewidth=2)
     plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
     plt.gca().xaxis.set_major_locator(plt.matplotlib.dates.AutoDateLocator())
     plt.title("Eye Movement Speed Over Time")
@@ -71,23 +82,20 @@ def plot_speed_over_time(data):
     plt.show()
 
 # Plot EAR Over Time with Averages
-def plot_ear_over_time(data):
-    timestamps = data["Timestamp"]
-    avg_ears = data["Average EAR"]
-
-    # Calculate 3-minute averages
-    data.set_index("Timestamp", inplace=True)
-    rolling_3min_avg = data["Average EAR"].resample("3min").mean()  # Updated to "10min"
+def plot_ear_over_time(pyramid):
+    # Calculate 3-minute averages from the 1-minute buckets
+    minutes = pyramid.query("Average EAR", level=60)
+    keys, inverse = np.unique(minutes.times // 180, return_inverse=True)
+    counts = np.bincount(inverse, weights=minutes.count)
+    sums = np.bincount(inverse, weights=minutes.mean * minutes.count)
+    rolling_3min_avg = pd.Series(sums / np.maximum(counts, 1), index=pd.to_datetime(keys * 180, unit="s"))
 
     # Overall average EAR
-    overall_avg_ear = avg_ears.mean()
-
-    # Reset index
-    data.reset_index(inplace=True)
+    overall_avg_ear = pyramid.summary("Average EAR")["mean"]
 
     # Plot EAR over time
     plt.figure(figsize=(12, 6))
-    plt.plot(timestamps, avg_ears, label="Average EAR", color="blue", linewidth=2)
+    plt.plot(*envelope(pyramid, "Average EAR"), label="Average EAR", color="blue", linewidth=2)
     plt.plot(
         rolling_3min_avg.index, rolling_3min_avg.values, label="3-Minute Average EAR", color="orange", linewidth=2
     )
@@ -104,14 +112,10 @@ def plot_ear_over_time(data):
 
 
 
-# Plot Cumulative Blink Count Over Time
-def plot_cumulative_blinks(data):
-    timestamps = data["Timestamp"]
-    blink_counts = data["Blink Count"]
-    cumulative_blinks = blink_counts.cumsum()
-
+# Plot Cumulative Blink Count Over Time (the Blink Count column is already cumulative)
+def plot_cumulative_blinks(pyramid):
     plt.figure(figsize=(12, 6))
-    plt.plot(timestamps, cumulative_blinks, label="Cumulative Blink Count", color="green", linewidth=2)
+    plt.plot(*envelope(pyramid, "Blink Count"), label="Cumulative Blink Count", color="green", linewidth=2)
     plt.title("Cumulative Blink Count Over Time")
     plt.xlabel("Time (HH:MM:SS)")
     plt.ylabel("Cumulative Blink Count")
@@ -122,16 +126,18 @@ def plot_cumulative_blinks(data):
     plt.tight_layout()
     plt.show()
 
-# Plot Blink Frequency in Intervals
-def plot_blink_frequency(data):
-    timestamps = data["Timestamp"]
-    blink_counts = data["Blink Count"]
+# Plot Blink Frequency in Intervals: blinks per minute, from the growth of the cumulative count
+def plot_blink_frequency(pyramid):
+    minutes = pyramid.query("Blink Count", level=60)
+    blink_counts = np.diff(minutes.max, prepend=minutes.min[:1])
+    blink_counts = np.where(blink_counts < 0, minutes.max, blink_counts)  # Count restarted
 
     plt.figure(figsize=(12, 6))
-    plt.bar(timestamps, blink_counts, width=0.01, label="Blink Frequency", color="purple")
+    plt.bar(pd.to_datetime(minutes.times, unit="s"), blink_counts, width=0.8 * minutes.level / 86400,
+            align="edge", label="Blink Frequency", color="purple")
     plt.title("Blink Frequency in Intervals")
     plt.xlabel("Time (HH:MM:SS)")
-    plt.ylabel("Blink Count")
+    plt.ylabel("Blinks per Minute")
     plt.gca().xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter("%H:%M:%S"))
     plt.xticks(rotation=45)
     plt.grid()
@@ -141,15 +147,16 @@ def plot_blink_frequency(data):
 
 # Main function to generate all plots
 def generate_all_plots(file):
-    # Load data
-    data = load_combined_data(file)
+    # Load data; the time series come from the session's summary pyramid, built on first use
+    data = load_cached_data(file)
+    pyramid = sessionpyramid(file, data=data)
 
     # Generate plots
     plot_hotspot_map(data)
-    plot_speed_over_time(data)
-    plot_ear_over_time(data)
-    plot_cumulative_blinks(data)
-    plot_blink_frequency(data)
+    plot_speed_over_time(pyramid)
+    plot_ear_over_time(pyramid)
+    plot_cumulative_blinks(pyramid)
+    plot_blink_frequency(pyramid)
 
 # Call the main function
 generate_all_plots(combined_file)
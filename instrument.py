@@ -0,0 +1,162 @@
+import json
+import math
+import threading
+import time
+
+# Latency histograms: log-spaced bins from 1 us to 10 s, 20 per decade, so a quantile is
+# known to within ~6% whatever the stage; a fixed 142 counters per stage however long the session
+MIN_NS = 1_000
+DECADES = 7
+BINS_PER_DECADE = 20
+BINS = DECADES * BINS_PER_DECADE + 2  # With the underflow and overflow bins
+
+QUANTILES = (0.50, 0.95, 0.99)
+REPORT_INTERVAL = 10.0  # Seconds between live summaries printed by the detection loop
+
+
+# Fixed-size histogram of durations in nanoseconds
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * BINS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    # Hot path: a few arithmetic operations and one list update per sample
+    def add(self, ns):
+        if ns < MIN_NS:
+            index = 0
+        else:
+            index = min(int(math.log10(ns / MIN_NS) * BINS_PER_DECADE) + 1, BINS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    # Duration of bin `index` in nanoseconds: geometric middle, or the edge for under/overflow
+    @staticmethod
+    def binvalue(index):
+        if index == 0:
+            return MIN_NS
+        if index == BINS - 1:
+            return MIN_NS * 10 ** DECADES
+        return MIN_NS * 10 ** ((index - 0.5) / BINS_PER_DECADE)
+
+    # Quantile q in nanoseconds, never above the largest sample
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.binvalue(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    # Count, mean, quantiles and maximum in milliseconds
+    def summary(self):
+        values = {"count": self.count, "mean_ms": self.total / self.count / 1e6 if self.count else math.nan}
+        for q in QUANTILES:
+            values[f"p{round(q * 100)}_ms"] = self.quantile(q) / 1e6
+        values["max_ms"] = self.max / 1e6
+        return values
+
+
+# Per-stage timings and frame counters of the detection loop. Stages are timed with the
+# monotonic perf_counter_ns clock:
+#   start = instrument.now()
+#   ...
+#   start = instrument.record("convert", start)  # returns now, to chain the next stage
+# Counters ("captured", "processed", ...) are plain increments; gauges are functions read
+# when a summary is made, e.g. the pipeline's dropped frames. Each histogram is only
+# written by one thread, summaries may be taken from any thread.
+class FrameInstrument:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.perf_counter_ns()
+        self.window = (self.started, {})
+        self.windowlock = threading.Lock()
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = LatencyHistogram()
+        return histogram
+
+    def record(self, name, start):
+        end = time.perf_counter_ns()
+        self.stage(name).add(end - start)
+        return end
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, function):
+        self.gauges[name] = function
+
+    def totals(self):
+        totals = dict(self.counters)
+        for name, function in self.gauges.items():
+            totals[name] = function()
+        return totals
+
+    # Whole-session summary: per-stage latencies, counters and rates per second
+    def summary(self):
+        elapsed = (time.perf_counter_ns() - self.started) / 1e9
+        totals = self.totals()
+        return {
+            "seconds": elapsed,
+            "counters": totals,
+            "fps": {name: value / elapsed for name, value in totals.items()} if elapsed > 0 else {},
+            "stages": {name: histogram.summary() for name, histogram in list(self.stages.items())},
+        }
+
+    # Counter rates per second since the previous call, for a live display
+    def rates(self):
+        with self.windowlock:
+            now = time.perf_counter_ns()
+            totals = self.totals()
+            since, previous = self.window
+            self.window = (now, totals)
+        elapsed = (now - since) / 1e9
+        if elapsed <= 0:
+            return {}
+        return {name: (value - previous.get(name, 0)) / elapsed for name, value in totals.items()}
+
+    # One line per stage with its quantiles, and the counters
+    def format(self, rates=None):
+        lines = []
+        for name, values in self.summary()["stages"].items():
+            lines.append(
+                f"{name:>10}: p50 {values['p50_ms']:7.2f} ms, p95 {values['p95_ms']:7.2f} ms, "
+                f"p99 {values['p99_ms']:7.2f} ms, max {values['max_ms']:7.2f} ms ({values['count']} frames)"
+            )
+        totals = self.totals()
+        line = ", ".join(f"{totals[name]} {name}" for name in totals)
+        if rates:
+            line += " | " + ", ".join(f"{rates[name]:.1f} {name}/s" for name in rates if rates[name])
+        lines.append(line)
+        return "\n".join(lines)
+
+    # Sidecar file: the summary and the non-empty histogram bins, as (ms, count) pairs
+    def save(self, path):
+        summary = self.summary()
+        summary["histograms"] = {
+            name: [(LatencyHistogram.binvalue(i) / 1e6, count) for i, count in enumerate(histogram.counts) if count]
+            for name, histogram in list(self.stages.items())
+        }
+        with open(path, "w") as file:
+            json.dump(summary, file, indent=1)
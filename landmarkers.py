@@ -0,0 +1,89 @@
+import threading
+import time
+
+# Face landmark backends for the inference stage. Both give, per image, a list with one
+# landmark sequence per face (normalized x, y, indexed like the 468 FaceMesh points).
+#   "facemesh"    legacy mp.solutions FaceMesh, synchronous: process(rgb) returns the faces
+#   "livestream"  FaceLandmarker task in LIVE_STREAM mode: submit(rgb, context) returns at
+#                 once and on_result(context, faces) is called on MediaPipe's thread
+BACKENDS = ("facemesh", "livestream")
+
+# Model bundle of the live-stream backend, from
+# https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/latest/face_landmarker.task
+LANDMARKER_MODEL = "face_landmarker.task"
+MAX_RESULT_AGE = 0.25  # Seconds after submission beyond which a result is dropped as stale
+
+
+# Legacy FaceMesh, the inference stage blocks while a frame is processed
+class FaceMeshLandmarker:
+    asynchronous = False
+
+    def __init__(self, max_faces=1):
+        import mediapipe as mp
+
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            max_num_faces=max_faces, min_detection_confidence=0.5, min_tracking_confidence=0.5
+        )
+
+    def process(self, rgb):
+        results = self.face_mesh.process(rgb)
+        if not results.multi_face_landmarks:
+            return []
+        return [face.landmark for face in results.multi_face_landmarks]
+
+    def close(self):
+        self.face_mesh.close()
+
+
+# FaceLandmarker in live-stream mode: inference of one frame overlaps the capture and
+# colour conversion of the next, and MediaPipe itself skips frames while it is busy.
+# Results come back in timestamp order; one older than the last delivered or than
+# max_age is counted in `stale` and dropped, so the metrics never go back in time.
+class LiveStreamLandmarker:
+    asynchronous = True
+
+    def __init__(self, on_result, max_faces=1, model=LANDMARKER_MODEL, max_age=MAX_RESULT_AGE):
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python import vision
+
+        self.mp = mp
+        self.on_result = on_result
+        self.max_age_ms = max_age * 1000
+        self.pending = {}  # Timestamp in ms -> context given to submit()
+        self.lock = threading.Lock()
+        self.lastsubmitted = -1
+        self.lastdelivered = -1
+        self.stale = 0
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_faces=max_faces,
+            min_face_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            result_callback=self._result,
+        )
+        self.landmarker = vision.FaceLandmarker.create_from_options(options)
+
+    # Queue an RGB image, timestamps have to increase strictly
+    def submit(self, rgb, context):
+        timestamp = max(int(time.monotonic() * 1000), self.lastsubmitted + 1)
+        self.lastsubmitted = timestamp
+        with self.lock:
+            self.pending[timestamp] = context
+        self.landmarker.detect_async(self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=rgb), timestamp)
+
+    def _result(self, result, image, timestamp):
+        with self.lock:
+            context = self.pending.pop(timestamp, None)
+            # Frames skipped by the landmarker never get a result
+            for skipped in [t for t in self.pending if t < timestamp]:
+                del self.pending[skipped]
+        if context is None or timestamp <= self.lastdelivered or time.monotonic() * 1000 - timestamp > self.max_age_ms:
+            self.stale += 1
+            return
+        self.lastdelivered = timestamp
+        self.on_result(context, result.face_landmarks)
+
+    def close(self):
+        self.landmarker.close()
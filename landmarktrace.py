@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+from sessionfile import RecordWriter, readrecords
+
+# One record per processed frame: the 12 eye landmarks in full-frame pixels, in the
+# order of EyeKernel.flat (left eye then right eye, see eyemetrics.EAR_ORDER)
+TRACE_DTYPE = np.dtype([
+    ("t_ns", "<i8"),                # Capture time, epoch nanoseconds
+    ("points", "<f4", (12, 2)),
+])
+
+# Capture time of every frame of the trace video, in <video name>.times next to it
+FRAME_TIMES_DTYPE = np.dtype([("t_ns", "<i8")])
+
+
+# Landmark trace of a session, for replaying it without a camera (see replay.py).
+# With `video` the frame of every landmark record is also written to that file, at the
+# capture rate `fps`; frames are processed irregularly, so their capture times are kept
+# as well and frame i of the video always belongs to landmark record i.
+class TraceRecorder:
+    def __init__(self, path, video=None, fps=30):
+        self.path = path
+        self.records = RecordWriter(path, dtype=TRACE_DTYPE)
+        self.videopath = video
+        self.fps = fps
+        self.video = None
+        self.frametimes = None
+
+    # `frame` is the decoded BGR frame the landmarks were found in
+    def add(self, timestamp, points, frame=None):
+        t_ns = int(timestamp * 1e9)
+        self.records.append((t_ns, points))
+        if frame is not None and self.videopath is not None:
+            self.addframe(t_ns, frame)
+
+    def addframe(self, t_ns, frame):
+        import cv2
+
+        if self.video is None:
+            height, width = frame.shape[:2]
+            self.video = cv2.VideoWriter(self.videopath, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (width, height))
+            self.frametimes = RecordWriter(frametimespath(self.videopath), dtype=FRAME_TIMES_DTYPE)
+        self.video.write(frame)
+        self.frametimes.append((t_ns,))
+
+    def close(self):
+        self.records.close()
+        if self.video is not None:
+            self.video.release()
+            self.frametimes.close()
+            self.video = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Trace records as a read-only memory map
+def readtrace(path):
+    records = readrecords(path)
+    if records.dtype != TRACE_DTYPE:
+        raise ValueError(f"{path} is not a landmark trace")
+    return records
+
+
+def frametimespath(video):
+    return os.path.splitext(video)[0] + ".times"
+
+
+# Capture times (epoch seconds) of the frames of a trace video, None without a times file
+def readframetimes(video):
+    path = frametimespath(video)
+    if not os.path.exists(path):
+        return None
+    records = readrecords(path)
+    if records.dtype != FRAME_TIMES_DTYPE:
+        raise ValueError(f"{path} is not a frame times file")
+    return records["t_ns"] / 1e9
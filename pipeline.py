@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+
+# Queue policies between stages
+DROP_OLDEST = "drop"    # Never block the producer, discard the oldest waiting item instead
+BACKPRESSURE = "block"  # Producer waits until the consumer has taken an item
+
+
+# Bounded queue joining two pipeline stages
+class StageQueue:
+    def __init__(self, maxsize=2, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, BACKPRESSURE):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.dropped = 0
+        self.closed = False
+        self.lock = threading.Condition()
+
+    # Add an item, returns False once the queue is closed
+    def put(self, item):
+        with self.lock:
+            if self.policy == BACKPRESSURE:
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.lock.wait()
+            elif len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            if self.closed:
+                return False
+            self.items.append(item)
+            self.lock.notify_all()
+            return True
+
+    # Take the next item, returns None when the queue is closed and empty
+    def get(self):
+        with self.lock:
+            while not self.items and not self.closed:
+                self.lock.wait()
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.lock.notify_all()
+            return item
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+
+
+# Throughput counters for one stage
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+
+    def add(self, seconds):
+        self.count += 1
+        self.busy += seconds
+
+    def summary(self):
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            "stage": self.name,
+            "items": self.count,
+            "fps": self.count / elapsed if elapsed > 0 else 0.0,
+            "avg_ms": 1000 * self.busy / self.count if self.count else 0.0,
+            "busy": self.busy / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+# Capture -> inference -> metrics, each stage on its own thread
+# capture() returns the next item or None at the end of the stream,
+# inference(item) returns a result or None to skip it, metrics(result) consumes it
+class Pipeline:
+    def __init__(self, capture, inference, metrics, maxsize=2, policy=DROP_OLDEST):
+        self.capture = capture
+        self.inference = inference
+        self.metrics = metrics
+        self.frames = StageQueue(maxsize, policy)
+        self.results = StageQueue(maxsize, policy)
+        self.stop_event = threading.Event()
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "metrics")}
+        self.threads = []
+
+    def _capturestage(self):
+        stats = self.stats["capture"]
+        stats.started = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                item = self.capture()
+                if item is None:
+                    break
+                stats.add(time.perf_counter() - start)
+                if not self.frames.put(item):
+                    break
+        finally:
+            stats.finished = time.perf_counter()
+            self.frames.close()
+
+    def _inferencestage(self):
+        stats = self.stats["inference"]
+        stats.started = time.perf_counter()
+        try:
+            while True:
+                item = self.frames.get()
+                if item is None:
+                    break
+                start = time.perf_counter()
+                result = self.inference(item)
+                stats.add(time.perf_counter() - start)
+                if result is not None and not self.results.put(result):
+                    break
+        except Exception:
+            self.stop()
+            raise
+        finally:
+            stats.finished = time.perf_counter()
+            self.results.close()
+
+    def _metricstage(self):
+        stats = self.stats["metrics"]
+        stats.started = time.perf_counter()
+        try:
+            while True:
+                result = self.results.get()
+                if result is None:
+                    break
+                start = time.perf_counter()
+                self.metrics(result)
+                stats.add(time.perf_counter() - start)
+        except Exception:
+            self.stop()
+            raise
+        finally:
+            stats.finished = time.perf_counter()
+
+    def start(self):
+        for name, target in (("capture", self._capturestage),
+                             ("inference", self._inferencestage),
+                             ("metrics", self._metricstage)):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    # Hand a result to the metrics stage from outside the inference stage, e.g. from the
+    # callback of an asynchronous model. Returns False once the pipeline is finishing.
+    def deliver(self, result):
+        return self.results.put(result)
+
+    # Ask every stage to finish. Closing both queues wakes a stage blocked in put() or
+    # get() on either side, so a failed stage cannot leave another one waiting forever;
+    # items already queued are still processed.
+    def stop(self):
+        self.stop_event.set()
+        self.frames.close()
+        self.results.close()
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def run(self):
+        self.start()
+        self.join()
+        return self.summary()
+
+    def summary(self):
+        rows = [self.stats[name].summary() for name in ("capture", "inference", "metrics")]
+        rows[1]["dropped"] = self.frames.dropped
+        rows[2]["dropped"] = self.results.dropped
+        return rows
+
+    def report(self):
+        for row in self.summary():
+            line = f"{row['stage']:>9}: {row['items']} items, {row['fps']:.1f} fps, {row['avg_ms']:.1f} ms/item, {row['busy']:.0%} busy"
+            if "dropped" in row:
+                line += f", {row['dropped']} dropped"
+            print(line)
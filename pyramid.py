@@ -0,0 +1,165 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from aggregates import COLUMNS
+from eyemetrics import focusscore
+
+# Bucket sizes in seconds, finest first
+LEVELS = (1, 10, 60, 600)
+PYRAMID_COLUMNS = COLUMNS + ["Attention Score"]
+QUERY_POINTS = 600  # Default bucket budget of a query, about one per pixel column of a report page
+
+# Buckets of one column over a time range. Times are bucket starts in the clock of the
+# session (local-clock seconds, as in SessionAggregator); buckets without samples are absent.
+PyramidSlice = namedtuple("PyramidSlice", ("level", "times", "min", "max", "mean", "count"))
+
+
+# Group runs of equal sorted keys: min, max, sum and count per group
+def _reduce(keys, mins, maxs, sums, counts):
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    if not len(starts):
+        return keys, mins, maxs, sums, counts
+    return (
+        keys[starts],
+        np.fmin.reduceat(mins, starts, axis=0),  # fmin/fmax skip NaN
+        np.fmax.reduceat(maxs, starts, axis=0),
+        np.add.reduceat(sums, starts, axis=0),
+        np.add.reduceat(counts, starts, axis=0),
+    )
+
+
+# Min/max/mean/count summaries of a session's series at every level of LEVELS. Each
+# level is built from the one below, so building is O(rows) once; a query reads the
+# finest level that fits its bucket budget, a few hundred buckets whatever the length
+# of the recording. Stored as <name>.pyramid.npz next to the session files.
+class Pyramid:
+    def __init__(self, columns, levels):
+        self.columns = list(columns)
+        self.levels = levels  # seconds -> dict of arrays: start, min, max, mean, count
+
+    # From sample times (seconds) and an (N, len(columns)) array; NaN values are skipped
+    @classmethod
+    def build(cls, times, values, columns=PYRAMID_COLUMNS):
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float).reshape(len(times), len(columns))
+        if len(times) > 1 and np.any(np.diff(times) < 0):
+            order = np.argsort(times, kind="stable")
+            times, values = times[order], values[order]
+        present = ~np.isnan(values)
+        keys = np.floor(times).astype(np.int64)
+        mins, maxs, sums, counts = values, values, np.where(present, values, 0.0), present.astype(np.int64)
+        levels = {}
+        previous = 1
+        for seconds in LEVELS:
+            keys = keys * previous // seconds
+            keys, mins, maxs, sums, counts = _reduce(keys, mins, maxs, sums, counts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums / counts
+            levels[seconds] = {
+                "start": keys * seconds,
+                "min": mins.astype(np.float32),
+                "max": maxs.astype(np.float32),
+                "mean": mean.astype(np.float32),
+                "count": counts.astype(np.int32),
+            }
+            previous = seconds
+        return cls(columns, levels)
+
+    # From the live report aggregates of a session
+    @classmethod
+    def fromaggregates(cls, aggregates):
+        n = aggregates.count
+        values = np.column_stack((aggregates.values[:n], aggregates.attention[:n]))
+        return cls.build(aggregates.times[:n], values)
+
+    # From a session table with a Timestamp column (see catalog.loadsession)
+    @classmethod
+    def fromframe(cls, data):
+        times = data["Timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64) / 1e9
+        values = data.reindex(columns=COLUMNS).to_numpy(dtype=float)
+        attention = focusscore(values[:, 6], (values[:, 4] + values[:, 5]) / 2)
+        return cls.build(times, np.column_stack((values, attention)))
+
+    def save(self, path):
+        arrays = {"columns": np.array(self.columns)}
+        for seconds, level in self.levels.items():
+            for name, array in level.items():
+                arrays[f"l{seconds}_{name}"] = array
+        with open(path, "wb") as file:
+            np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            columns = [str(column) for column in saved["columns"]]
+            levels = {
+                seconds: {name: saved[f"l{seconds}_{name}"] for name in ("start", "min", "max", "mean", "count")}
+                for seconds in LEVELS
+            }
+        return cls(columns, levels)
+
+    @property
+    def span(self):
+        level = self.levels[LEVELS[0]]
+        if not len(level["start"]):
+            return None, None
+        return float(level["start"][0]), float(level["start"][-1] + LEVELS[0])
+
+    # Buckets of `column` between `start` and `end` (None: the whole session) at the
+    # finest level with at most `points` buckets in the range, or at `level` seconds
+    def query(self, column, start=None, end=None, points=QUERY_POINTS, level=None):
+        k = self.columns.index(column)
+        for seconds in (level,) if level else LEVELS:
+            level = self.levels[seconds]
+            lo = 0 if start is None else np.searchsorted(level["start"], start - seconds, side="right")
+            hi = len(level["start"]) if end is None else np.searchsorted(level["start"], end, side="left")
+            if hi - lo <= points:
+                break
+        part = slice(lo, hi)
+        count = level["count"][part, k]
+        present = count > 0
+        return PyramidSlice(
+            seconds, level["start"][part][present], level["min"][part, k][present], level["max"][part, k][present],
+            level["mean"][part, k][present], count[present],
+        )
+
+    # Min and max of every bucket as one line, two points per bucket like reportrender.minmax
+    def envelope(self, column, start=None, end=None, points=QUERY_POINTS):
+        buckets = self.query(column, start, end, points // 2)
+        x = np.empty(2 * len(buckets.times))
+        y = np.empty(2 * len(buckets.times))
+        x[0::2] = buckets.times
+        x[1::2] = buckets.times + buckets.level / 2
+        y[0::2] = buckets.min
+        y[1::2] = buckets.max
+        return x, y
+
+    # Min, max, mean and count of `column` over a range, from at most `points` buckets
+    def summary(self, column, start=None, end=None, points=QUERY_POINTS):
+        buckets = self.query(column, start, end, points)
+        count = int(buckets.count.sum())
+        if not count:
+            return {"min": np.nan, "max": np.nan, "mean": np.nan, "count": 0}
+        return {
+            "min": float(buckets.min.min()),
+            "max": float(buckets.max.max()),
+            "mean": float(np.dot(buckets.mean.astype(float), buckets.count) / count),
+            "count": count,
+        }
+
+
+# Pyramid of a session file (CSV or .rec), built and saved next to it unless it exists.
+# `data` is the session table when the caller has already loaded it.
+def sessionpyramid(path, rebuild=False, data=None):
+    target = os.path.splitext(path)[0] + ".pyramid.npz"
+    if not rebuild and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return Pyramid.load(target)
+    if data is None:
+        from catalog import loadsession
+
+        data = loadsession(path)
+    pyramid = Pyramid.fromframe(data)
+    pyramid.save(target)
+    return pyramid
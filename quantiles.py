@@ -0,0 +1,111 @@
+import math
+from collections import namedtuple
+
+# Thresholds used by the live loop; the defaults are the fixed values used before calibration
+Thresholds = namedtuple("Thresholds", ("blink_low", "blink_high", "ear_fatigue", "speed_fatigue", "speed_scale"))
+DEFAULT_THRESHOLDS = Thresholds(0.21, 0.23, 0.25, 150, 300)
+
+BLINK_RATIO = 0.84       # blink_low / ear_fatigue, as between the default thresholds (0.21 / 0.25)
+BLINK_HYSTERESIS = 0.02  # blink_high - blink_low, as between the default thresholds
+WARMUP_SAMPLES = 1800    # Frames before the calibrated thresholds are used, ~30 s at 60 fps
+
+
+# P-square estimator (Jain & Chlamtac, 1985) of one quantile: five markers whose heights
+# are adjusted with a piecewise-parabolic formula on every sample. O(1) memory and time.
+class P2Quantile:
+    def __init__(self, q):
+        self.q = q
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        heights = self.heights
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # Cell of the new sample, extending the extreme markers if needed
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i, d):
+        n, h = self.positions, self.heights
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    # Current estimate; exact while fewer than five samples were seen
+    @property
+    def value(self):
+        if self.count > 5:
+            return self.heights[2]
+        if not self.heights:
+            return math.nan
+        return self.heights[min(int(self.q * len(self.heights)), len(self.heights) - 1)]
+
+
+# Per-user thresholds from streaming quantiles of the live EAR and eye speed:
+#   ear_fatigue   EAR 25th percentile
+#   blink_low     BLINK_RATIO * ear_fatigue, capped at the EAR 10th percentile;
+#                 blink_high = blink_low + BLINK_HYSTERESIS
+#   speed_fatigue speed 90th percentile, speed_scale = 2 * speed_fatigue
+# The blink threshold has to stay below the open-eye EAR, or its frame-to-frame noise
+# counts as blinks. The defaults are used until `warmup` samples have been seen.
+class ThresholdCalibrator:
+    def __init__(self, warmup=WARMUP_SAMPLES, defaults=DEFAULT_THRESHOLDS):
+        self.warmup = warmup
+        self.thresholds = defaults
+        self.ear10 = P2Quantile(0.10)
+        self.ear25 = P2Quantile(0.25)
+        self.speed90 = P2Quantile(0.90)
+
+    @property
+    def count(self):
+        return self.ear10.count
+
+    @property
+    def ready(self):
+        return self.count >= self.warmup
+
+    # Feed one frame's average EAR and speed, returns True when calibration has just completed
+    def update(self, ear, speed):
+        self.ear10.add(ear)
+        self.ear25.add(ear)
+        self.speed90.add(speed)
+        if self.count < self.warmup:
+            return False
+        ear_fatigue = float(self.ear25.value)
+        low = min(BLINK_RATIO * ear_fatigue, float(self.ear10.value))
+        speed_fatigue = float(self.speed90.value)
+        self.thresholds = Thresholds(low, low + BLINK_HYSTERESIS, ear_fatigue, speed_fatigue, max(2 * speed_fatigue, 1.0))
+        return self.count == self.warmup
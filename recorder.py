@@ -0,0 +1,110 @@
+import atexit
+import csv
+import os
+import threading
+import time
+from collections import deque
+
+# Columns of the session CSV
+CSV_HEADER = [
+    "Timestamp", "Left Eye X", "Left Eye Y", "Right Eye X", "Right Eye Y", "Left Speed", "Right Speed", "Average EAR", "Blink Count"
+]
+
+
+# Session CSV writer for the detection loop. record() only appends to an in-memory ring
+# buffer; a background thread formats and writes the rows in batches, fsyncs every
+# fsync_interval seconds and flushes whatever is left on close or at interpreter exit.
+# `timing`, a LatencyHistogram (see instrument.py), gets the duration of every batch write.
+class SessionRecorder:
+    def __init__(self, path, capacity=4096, flush_interval=1.0, fsync_interval=10.0, header=CSV_HEADER, timing=None):
+        self.path = path
+        self.timing = timing
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.buffer = deque(maxlen=capacity)  # Oldest rows are overwritten if the writer falls behind
+        self.dropped = 0
+        self.written = 0
+        self.closed = False
+        self.wake = threading.Event()
+        self.writelock = threading.Lock()
+        self.lastsync = time.monotonic()
+        self.lastsecond = None
+        self.laststamp = ""
+
+        self.file = open(path, mode='a', newline='')
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow(header)
+            self.file.flush()
+
+        self.thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # Hot path: queue one row, `timestamp` is the epoch time in seconds
+    def record(self, timestamp, *values):
+        if self.closed:
+            return
+        if len(self.buffer) == self.capacity:
+            self.dropped += 1
+        self.buffer.append((timestamp, values))
+        if len(self.buffer) >= self.capacity // 2:
+            self.wake.set()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    # Timestamps are formatted once per second rather than once per row
+    def _stamp(self, timestamp):
+        second = int(timestamp)
+        if second != self.lastsecond:
+            self.lastsecond = second
+            self.laststamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self.laststamp
+
+    # Write everything buffered so far
+    def flush(self, sync=False):
+        with self.writelock:
+            if self.file.closed:
+                return
+            rows = []
+            while True:
+                try:
+                    timestamp, values = self.buffer.popleft()
+                except IndexError:
+                    break
+                rows.append((self._stamp(timestamp),) + values)
+            if rows:
+                start = time.perf_counter_ns()
+                self.writer.writerows(rows)
+                self.written += len(rows)
+                self.file.flush()
+                if self.timing is not None:
+                    self.timing.add(time.perf_counter_ns() - start)
+            if sync or time.monotonic() - self.lastsync >= self.fsync_interval:
+                os.fsync(self.file.fileno())
+                self.lastsync = time.monotonic()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+        self.flush(sync=True)
+        with self.writelock:
+            self.file.close()
+        atexit.unregister(self.close)
+        if self.dropped:
+            print(f"Recorder dropped {self.dropped} rows, the buffer of {self.capacity} rows was full.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
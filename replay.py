@@ -0,0 +1,156 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Synthetic eye: corners 60 pixels apart, EAR = lid height / 30 (see syntheticeye)
+EYE_WIDTH = 60.0
+EYE_DISTANCE = 64.0     # Between the two eye centres
+OPEN_EAR = 0.28
+CLOSED_EAR = 0.08
+BLINKS_PER_MINUTE = 15
+BLINK_SECONDS = 0.15
+FIXATION_SECONDS = (0.2, 1.0)  # Time between saccades
+BLOCK_FRAMES = 4096            # Synthetic frames generated at once
+
+
+# Landmarks of eyes with the given EAR around the given centres, shape (N, 12, 2)
+# in EyeKernel order [p1, p2, p0, p5, p4, p3] per eye
+def syntheticeye(ear, centres):
+    half = EYE_WIDTH / 2
+    lid = ear * EYE_WIDTH / 2
+    n = len(ear)
+    points = np.empty((n, 2, 6, 2))
+    xs = np.array([-half / 3, half / 3, -half, -half / 3, half / 3, half])
+    ys = np.array([-1.0, -1.0, 0.0, 1.0, 1.0, 0.0])
+    for eye, offset in enumerate((-EYE_DISTANCE / 2, EYE_DISTANCE / 2)):
+        points[:, eye, :, 0] = centres[:, 0, None] + offset + xs
+        points[:, eye, :, 1] = centres[:, 1, None] + ys * lid[:, None]
+    return points.reshape(n, 12, 2)
+
+
+# Synthetic landmark stream with fixations, saccades and blinks, yielded as
+# (timestamp, points); generated in blocks so memory does not grow with `frames`
+def syntheticsource(frames=3600, fps=60, seed=0, start=None):
+    rng = np.random.default_rng(seed)
+    start = time.time() if start is None else start
+    gaze = np.array([960.0, 540.0])
+    nextsaccade = 0.0
+    blinkends = []
+    for first in range(0, frames, BLOCK_FRAMES):
+        n = min(BLOCK_FRAMES, frames - first)
+        t = (first + np.arange(n)) / fps
+
+        centres = np.empty((n, 2))
+        for i in range(n):
+            if t[i] >= nextsaccade:
+                gaze = np.clip(gaze + rng.normal(0, 150, 2), (200, 150), (1720, 930))
+                nextsaccade = t[i] + rng.uniform(*FIXATION_SECONDS)
+            centres[i] = gaze
+        centres += rng.normal(0, 0.5, (n, 2))
+
+        ear = OPEN_EAR + rng.normal(0, 0.01, n)
+        blinks = rng.random(n) < BLINKS_PER_MINUTE / 60 / fps
+        blinkends = [end for end in blinkends if end > t[0]] + list(t[blinks] + BLINK_SECONDS)
+        for end in blinkends:
+            inside = (t > end - BLINK_SECONDS) & (t <= end)
+            depth = 1 - np.abs((t[inside] - (end - BLINK_SECONDS / 2)) / (BLINK_SECONDS / 2))
+            ear[inside] = np.minimum(ear[inside], OPEN_EAR - (OPEN_EAR - CLOSED_EAR) * depth)
+
+        points = syntheticeye(ear, centres)
+        for i in range(n):
+            yield start + t[i], points[i]
+
+
+# Landmark trace recorded by a session (see landmarktrace.py)
+def tracesource(path):
+    from landmarktrace import readtrace
+
+    records = readtrace(path)
+    for record in records:
+        yield record["t_ns"] / 1e9, record["points"]
+
+
+# Video file through FaceMesh, as the live session would see it. Frames without a face
+# are skipped. Timestamps are the recorded capture times of a trace video, otherwise
+# they follow the video's frame rate from `start`.
+def videosource(path, start=None):
+    import cv2
+    from eyemetrics import EyeKernel
+    from landmarkers import FaceMeshLandmarker
+    from landmarktrace import readframetimes
+
+    start = time.time() if start is None else start
+    landmarker = FaceMeshLandmarker()
+    kernel = EyeKernel()
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frametimes = readframetimes(path)
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            faces = landmarker.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if faces:
+                kernel.load(faces[0], frame.shape[1], frame.shape[0])
+                if frametimes is not None and index < len(frametimes):
+                    yield frametimes[index], kernel.flat
+                else:
+                    yield start + index / fps, kernel.flat
+            index += 1
+    finally:
+        cap.release()
+        landmarker.close()
+
+
+# Source from a path: .trace files, anything else is read as video
+def opensource(path):
+    if path.endswith(".trace"):
+        return tracesource(path)
+    return videosource(path)
+
+
+# Feed a landmark stream through the session metrics and recording at full speed, as the
+# metrics stage of Detect.py does, then optionally build the report. Returns the session.
+def replay(source, name=None, full_rate=False, report=False):
+    from Detect import FocusSession, SessionMetrics
+
+    session = FocusSession(name=name or f"replay_{time.strftime('%Y%m%d_%H%M%S')}", full_rate=full_rate, trace=False)
+    metrics = SessionMetrics(session)
+    frames = 0
+    started = time.perf_counter()
+    for timestamp, points in source:
+        metrics.kernel.loadpixels(points)
+        metrics.process(timestamp)
+        frames += 1
+    session.close()
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {frames} frames in {elapsed:.2f} s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+
+    if report:
+        from report import createpdf
+
+        createpdf(session.outcsv, session.outpdf, session.aggregates)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark trace, a video or a synthetic stream through the session code")
+    parser.add_argument("source", nargs="?", help=".trace file or video (default: synthetic landmarks)")
+    parser.add_argument("--frames", type=int, default=36000, help="synthetic frames")
+    parser.add_argument("--fps", type=float, default=60, help="synthetic frame rate")
+    parser.add_argument("--name", help="output name, the session files are <name>.csv etc.")
+    parser.add_argument("--full-rate", action="store_true", help="also write the .rec frame file")
+    parser.add_argument("--report", action="store_true", help="build the PDF report")
+    args = parser.parse_args()
+
+    source = opensource(args.source) if args.source else syntheticsource(args.frames, args.fps)
+    name = args.name or (os.path.splitext(os.path.basename(args.source))[0] + "_replay" if args.source else None)
+    replay(source, name=name, full_rate=args.full_rate, report=args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from aggregates import SessionAggregator
+from blinklog import readblinks
+from catalog import loadsession
+from pyramid import Pyramid
+from reportcache import ReportCache, cachekey
+from reportrender import PAGE_DPI, PAGE_SIZE, decimate, renderreport
+
+# Worker processes for rendering the report pages (None: all cores)
+REPORT_WORKERS = None
+PAGE_POINTS = 1200  # Points of a line read from the pyramid, two per pixel column
+REPORT_CACHE = True  # Serve repeated reports and their derived data from reportcache.ReportCache
+
+
+# Load combined data, from a session CSV or a full-rate record file
+def readata(file):
+    try:
+        data = loadsession(file)
+        print("Combined data loaded successfully!")
+        return data
+    except FileNotFoundError:
+        print(f"File {file} not found.")
+        exit()
+
+
+# Blinks per minute of the session as (minute start in local-clock seconds, count): from
+# the blink events when the log has any, else from the steps of the per-second Blink Count
+def blinksperminute(aggregates, events=None):
+    times = aggregates.times[:aggregates.count]
+    if not len(times):
+        return np.zeros(0), np.zeros(0)
+    start = times[0] // 60 * 60
+    if events is not None and len(events):
+        # Blink times are epoch seconds
+        minutes, counts = events.counts(start - aggregates.utcoffset, times[-1] - aggregates.utcoffset + 1)
+        return minutes + aggregates.utcoffset, counts
+    index = ((times - start) // 60).astype(np.int64)
+    counts = np.bincount(index, weights=aggregates.blinksteps(), minlength=index[-1] + 1)
+    return start + np.arange(len(counts)) * 60, counts
+
+
+# Generate plots and save to PDF, from the live aggregates when the session provides them.
+# Long series are decimated to the page's pixel width and the pages are rendered in parallel.
+# `blinks` is the session's blink log, by default <file>.blinks when it exists, and
+# `pyramid` its summary pyramid, by default <file>.pyramid.npz or built from the aggregates.
+# `cache` (True: the default ReportCache, False: off) keeps the finished PDF, the parsed
+# aggregates and the rendered pages under the hashes of the input files and settings.
+def createpdf(file, pdf_file, aggregates=None, workers=REPORT_WORKERS, blinks=None, pyramid=None, cache=REPORT_CACHE):
+    import matplotlib.dates as mdates
+
+    if blinks is None and os.path.exists(os.path.splitext(file)[0] + ".blinks"):
+        blinks = os.path.splitext(file)[0] + ".blinks"
+    if pyramid is None and os.path.exists(os.path.splitext(file)[0] + ".pyramid.npz"):
+        pyramid = os.path.splitext(file)[0] + ".pyramid.npz"
+    cache = (ReportCache() if cache is True else cache or None) if os.path.exists(file) else None
+    if cache is not None:
+        # Live aggregates can hold more than the session file, so they get their own entry
+        key = cachekey(
+            "pdf", cache.filekey(file), aggregates is None, blinks and cache.filekey(blinks),
+            pyramid and cache.filekey(pyramid), PAGE_POINTS, PAGE_SIZE, PAGE_DPI,
+        )
+        if cache.getfile(key, ".pdf", pdf_file):
+            print(f"All plots saved to {pdf_file} (cached)")
+            return
+    if aggregates is None:
+        build = lambda: SessionAggregator.fromframe(readata(file))
+        aggregates = cache.cached(cachekey("aggregates", cache.filekey(file)), build) if cache is not None else build()
+    events = readblinks(blinks) if blinks else None
+    pyramid = Pyramid.load(pyramid) if pyramid else Pyramid.fromaggregates(aggregates)
+    data = aggregates.frame()
+    rolling_fit_curve, rolling_3min_avg = aggregates.bucketmeans()
+
+    states = analytics.statedistribution(analytics.classifystates(data, analytics.earthresholds(data)[0]))
+
+    timestamps = mdates.date2num(data["Timestamp"])
+    fittimes = mdates.date2num(rolling_fit_curve.index)
+    timeaxis = dict(xlabel="Time (HH:MM:SS)", dates="%H:%M:%S", rotate=45, grid=True, legend=True)
+
+    def line(y, method="minmax", **kwargs):
+        x, y = decimate(timestamps, np.asarray(y, dtype=float), method)
+        return dict(x=x, y=y, kwargs=kwargs)
+
+    # Min/max envelope of a column from the pyramid, at the page's pixel budget
+    def envelope(column, **kwargs):
+        x, y = pyramid.envelope(column, points=PAGE_POINTS)
+        return dict(x=mdates.date2num(pd.to_datetime(x, unit="s")), y=y, kwargs=kwargs)
+
+    pages = [
+        # Plot the attention curve
+        dict(
+            title="Attention Curve Over Time", titlesize=16, xlabel="Time", ylabel="Attention Score", labelsize=12,
+            dates="auto", rotate=45, grid=True, legend=True,
+            lines=[
+                line(data["Attention Score"], "lttb", marker='o', linestyle='-', label="Attention Score", alpha=0.7),
+                dict(x=fittimes, y=rolling_fit_curve.values, kwargs=dict(linestyle='--', color="orange", label="3-Minute Fit Curve")),
+            ],
+            hlines=[dict(y=0.5, kwargs=dict(color="red", linestyle="--", label="Threshold"))],
+        ),
+        # Plot Eye Movement Hotspot Map
+        dict(
+            title="Eye Movement Hotspot Map", xlabel="Horizontal Position (pixels)", ylabel="Vertical Position (pixels)",
+            image=dict(data=aggregates.heatmap.T, cmap="hot", extent=[0, 1920, 0, 1080], colorbar="Frequency"),
+        ),
+        # Plot Speed Over Time
+        dict(
+            title="Eye Movement Speed Over Time", ylabel="Speed (pixels/second)", **timeaxis,
+            lines=[
+                envelope("Left Speed", label="Left Eye Speed", linewidth=2),
+                envelope("Right Speed", label="Right Eye Speed", linewidth=2),
+            ],
+        ),
+        # Plot EAR Over Time with Averages
+        dict(
+            title="EAR (Eye Aspect Ratio) Over Time", ylabel="EAR", **timeaxis,
+            lines=[
+                envelope("Average EAR", label="Average EAR", color="blue", linewidth=2),
+                dict(x=fittimes, y=rolling_3min_avg.values, kwargs=dict(label="3-Minute Average EAR", color="orange", linewidth=2)),
+            ],
+            hlines=[dict(y=aggregates.overallear(), kwargs=dict(color="red", linestyle="--", linewidth=2, label="Overall Average EAR"))],
+        ),
+        # Plot Cumulative Blink Count Over Time
+        dict(
+            title="Cumulative Blink Count Over Time", ylabel="Cumulative Blink Count", **timeaxis,
+            lines=[envelope("Blink Count", label="Cumulative Blink Count", color="green", linewidth=2)],
+        ),
+        # Plot Blink Frequency in Intervals
+        dict(
+            title="Blink Frequency in Intervals", ylabel="Blinks per Minute", **timeaxis,
+            bars=[dict(x=mdates.date2num(pd.to_datetime(x, unit="s")), y=y,
+                       kwargs=dict(width=0.8 / 1440, align="edge", label="Blink Frequency", color="purple"))
+                  for x, y in [blinksperminute(aggregates, events)]],
+        ),
+        # Plot Time Spent in Each State
+        dict(
+            title="Time Spent in Each State", xlabel="State", ylabel="Share of Session",
+            bars=[dict(x=np.arange(len(states)), y=states.values, kwargs=dict(color=["blue", "red", "orange"]))],
+            xticks=(np.arange(len(states)), list(states.index)), grid=True,
+        ),
+    ]
+    if events is not None and len(events):
+        # Plot Blink Duration Distribution
+        durations = events.durations * 1000
+        indicators = events.fatigueindicators()
+        counts, edges = np.histogram(durations, bins=30)
+        pages.append(dict(
+            title=f"Blink Duration Distribution ({indicators['blinks']} blinks, {indicators['long_blink_share']:.0%} long)",
+            xlabel="Blink Duration (ms)", ylabel="Blinks", grid=True, legend=True,
+            bars=[dict(x=edges[:-1], y=counts, kwargs=dict(width=np.diff(edges), align="edge", color="purple", label="Blinks"))],
+            lines=[dict(x=[indicators["mean_duration_ms"]] * 2, y=[0, counts.max()],
+                        kwargs=dict(color="red", linestyle="--", label="Mean Duration"))],
+        ))
+    renderreport(pages, pdf_file, workers=workers, cache=cache)
+    if cache is not None:
+        cache.putfile(key, ".pdf", pdf_file)
+
+    print(f"All plots saved to {pdf_file}")
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import pickle
+import shutil
+import uuid
+
+import numpy as np
+
+from catalog import filehash
+
+# Disk cache of derived report data: parsed sessions, aggregates, rendered pages and
+# finished PDFs. Entries are named by a hash of everything they were computed from, so
+# a changed input or setting simply misses; the least recently used entries are
+# deleted once the cache grows beyond CACHE_MAX_BYTES. The cache is kept per user, so
+# every program shares one cache whatever directory it runs from.
+CACHE_ENV = "SIOT_CACHE_DIR"  # Environment variable that overrides the cache directory
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_VERSION = 1  # Part of every key; bump it when the report output changes
+
+
+# Cache directory: $SIOT_CACHE_DIR if set, else siot/reports in the user cache directory
+# ($XDG_CACHE_HOME, by default ~/.cache)
+def cachedir():
+    if os.environ.get(CACHE_ENV):
+        return os.environ[CACHE_ENV]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "siot", "reports")
+
+
+# Feed a value into a hash in a canonical form: dicts by sorted key, arrays by dtype,
+# shape and bytes, so equal page descriptions always give the same key
+def _update(digest, value):
+    if isinstance(value, dict):
+        digest.update(b"d%d" % len(value))
+        for key in sorted(value, key=str):
+            _update(digest, str(key))
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"l%d" % len(value))
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        digest.update(f"a{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes() if array.dtype != object else repr(array.tolist()).encode())
+    elif isinstance(value, bytes):
+        digest.update(b"b%d" % len(value))
+        digest.update(value)
+    else:
+        text = repr(value.item() if isinstance(value, np.generic) else value).encode()
+        digest.update(b"s%d" % len(text))
+        digest.update(text)
+
+
+# Cache key of any mix of strings, numbers, arrays, lists and dicts
+def cachekey(*parts):
+    digest = hashlib.sha256()
+    _update(digest, (CACHE_VERSION,) + parts)
+    return digest.hexdigest()
+
+
+class ReportCache:
+    def __init__(self, directory=None, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory or cachedir()
+        self.max_bytes = max_bytes
+        self.hashes = {}  # (path, size, mtime) -> content hash, so a file is hashed once per process
+        os.makedirs(self.directory, exist_ok=True)
+
+    # Content hash of an input file
+    def filekey(self, path):
+        stat = os.stat(path)
+        marker = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if marker not in self.hashes:
+            self.hashes[marker] = filehash(path)
+        return self.hashes[marker]
+
+    def path(self, key, extension):
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    # Path of a cached entry, or None; a hit marks the entry as recently used
+    def get(self, key, extension):
+        path = self.path(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    # Store an entry written by write(path) to a temporary file, then make room
+    def put(self, key, extension, write):
+        path = self.path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(temp)
+            os.replace(temp, path)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        self.evict()
+        return path
+
+    def getobject(self, key):
+        path = self.get(key, ".pkl")
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def putobject(self, key, value):
+        def write(path):
+            with open(path, "wb") as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.put(key, ".pkl", write)
+
+    # Arrays are stored compressed, rendered pages shrink to a few percent of their pixels
+    def getarray(self, key):
+        path = self.get(key, ".npz")
+        if path is None:
+            return None
+        with np.load(path) as saved:
+            return saved["array"]
+
+    def putarray(self, key, array):
+        def write(path):
+            with open(path, "wb") as file:
+                np.savez_compressed(file, array=array)
+        self.put(key, ".npz", write)
+
+    # Copy a cached file to `target`, returns False on a miss
+    def getfile(self, key, extension, target):
+        path = self.get(key, extension)
+        if path is None:
+            return False
+        shutil.copyfile(path, target)
+        return True
+
+    def putfile(self, key, extension, source):
+        self.put(key, extension, lambda path: shutil.copyfile(source, path))
+
+    # Value under `key`, computed and stored on a miss
+    def cached(self, key, compute):
+        value = self.getobject(key)
+        if value is None:
+            value = compute()
+            self.putobject(key, value)
+        return value
+
+    def entries(self):
+        found = []
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    # Delete the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
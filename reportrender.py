@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PAGE_SIZE = (12, 6)  # Inches, same figure size as the report always used
+PAGE_DPI = 100
+MARKER_LIMIT = 300   # Draw point markers only on short series
+
+
+# Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the visual shape
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.zeros(threshold, dtype=np.int64)
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        nextstart, nextend = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avgx = x[nextstart:nextend].mean()
+        avgy = y[nextstart:nextend].mean()
+        area = np.abs((x[a] - avgx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avgy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+# Min/max per bucket: two points per pixel column, keeps every spike visible
+def minmax(x, y, buckets):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= 2 * buckets:
+        return x, y
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    mids = starts + np.diff(np.append(starts, n)) // 2
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    outx = np.empty(2 * buckets)
+    outy = np.empty(2 * buckets)
+    outx[0::2], outx[1::2] = x[starts], x[mids]
+    outy[0::2], outy[1::2] = lows, highs
+    return outx, outy
+
+
+# Reduce a series to the pixel budget of one page
+def decimate(x, y, method="minmax", budget=None):
+    budget = budget or PAGE_SIZE[0] * PAGE_DPI
+    if method == "lttb":
+        return lttb(x, y, budget)
+    return minmax(x, y, budget // 2)
+
+
+# Render one page description to an RGBA image. The figure is drawn straight on an Agg
+# canvas without pyplot, so the caller's matplotlib backend is left alone.
+# A page is a dict of plain data so it can be sent to worker processes:
+#   title, titlesize, xlabel, ylabel, lines, bars, hlines, image, xticks, dates, grid, legend, rotate
+def renderpage(page, dpi=PAGE_DPI):
+    import matplotlib.dates as mdates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=PAGE_SIZE, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.gca()
+    for line in page.get("lines", []):
+        kwargs = dict(line.get("kwargs", {}))
+        if len(line["x"]) > MARKER_LIMIT:
+            kwargs.pop("marker", None)
+        ax.plot(line["x"], line["y"], **kwargs)
+    for bar in page.get("bars", []):
+        ax.bar(bar["x"], bar["y"], **bar.get("kwargs", {}))
+    for hline in page.get("hlines", []):
+        ax.axhline(hline["y"], **hline.get("kwargs", {}))
+    if "image" in page:
+        image = page["image"]
+        shown = ax.imshow(image["data"], origin="lower", cmap=image["cmap"], extent=image["extent"])
+        fig.colorbar(shown, label=image["colorbar"])
+    if "xticks" in page:
+        ax.set_xticks(*page["xticks"])
+    if page.get("dates"):
+        ax.xaxis_date()
+        if page["dates"] != "auto":
+            ax.xaxis.set_major_formatter(mdates.DateFormatter(page["dates"]))
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.set_title(page["title"], fontsize=page.get("titlesize"))
+    ax.set_xlabel(page.get("xlabel", ""), fontsize=page.get("labelsize"))
+    ax.set_ylabel(page.get("ylabel", ""), fontsize=page.get("labelsize"))
+    if page.get("rotate"):
+        for label in ax.get_xticklabels():
+            label.set_rotation(page["rotate"])
+    if page.get("grid"):
+        ax.grid(True)
+    if page.get("legend"):
+        ax.legend()
+    fig.tight_layout()
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+# Render all pages, in parallel when workers > 1, and write them into one PDF. With a
+# reportcache.ReportCache, pages already rendered from the same description are reused.
+def renderreport(pages, pdf_file, workers=None, dpi=PAGE_DPI, cache=None):
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    if cache is not None:
+        from reportcache import cachekey
+
+        keys = [cachekey("page", PAGE_SIZE, dpi, page) for page in pages]
+        images = [cache.getarray(key) for key in keys]
+    else:
+        images = [None] * len(pages)
+    missing = [i for i, image in enumerate(images) if image is None]
+    workers = min(workers or os.cpu_count() or 1, len(missing))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(renderpage, [pages[i] for i in missing], [dpi] * len(missing)))
+    else:
+        rendered = [renderpage(pages[i], dpi) for i in missing]
+    for i, pixels in zip(missing, rendered):
+        images[i] = pixels
+        if cache is not None:
+            cache.putarray(keys[i], pixels)
+
+    with PdfPages(pdf_file) as pdf:
+        for pixels in images:
+            height, width = pixels.shape[:2]
+            fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+            fig.figimage(pixels)
+            pdf.savefig(fig, dpi=dpi)
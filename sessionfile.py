@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+# File layout: fixed-size header, then fixed-width records back to back.
+# Header: magic (8 bytes), record count (uint64), dtype description as JSON padded with spaces.
+MAGIC = b"SIOTREC1"
+HEADER_SIZE = 1024
+
+# One record per processed frame
+FRAME_DTYPE = np.dtype([
+    ("t_ns", "<i8"),           # Capture time, epoch nanoseconds
+    ("left_x", "<f4"), ("left_y", "<f4"),
+    ("right_x", "<f4"), ("right_y", "<f4"),
+    ("left_speed", "<f4"), ("right_speed", "<f4"),
+    ("left_ear", "<f4"), ("right_ear", "<f4"),
+    ("blinking", "u1"),        # 1 while a blink is in progress
+    ("blinks", "<u4"),         # Cumulative blink count
+])
+
+
+def _header(dtype, count):
+    descr = json.dumps(np.lib.format.dtype_to_descr(dtype)).encode()
+    if len(descr) > HEADER_SIZE - 16:
+        raise ValueError("Record type too large for the file header")
+    return MAGIC + np.uint64(count).tobytes() + descr.ljust(HEADER_SIZE - 16)
+
+
+def _readheader(file):
+    header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+        raise ValueError(f"{file.name} is not a session record file")
+    count = int(np.frombuffer(header[8:16], dtype="<u8")[0])
+    descr = json.loads(header[16:].decode().strip())
+    dtype = np.lib.format.descr_to_dtype([tuple(field) for field in descr] if isinstance(descr, list) else descr)
+    return dtype, count
+
+
+# Append-only writer. The file is grown in blocks and memory-mapped, so an append is a
+# single store into the map. The record count in the header is refreshed every
+# `sync_every` records and on close; readers only see records covered by that count.
+class RecordWriter:
+    def __init__(self, path, dtype=FRAME_DTYPE, block=4096, sync_every=600):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.block = block
+        self.sync_every = sync_every
+        self.count = 0
+        self.capacity = 0
+        self.map = None
+        self.file = open(path, "w+b")
+        self.file.write(_header(self.dtype, 0))
+        self._grow()
+
+    def _grow(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map = None
+        self.capacity += max(self.block, self.capacity)
+        self.file.truncate(HEADER_SIZE + self.capacity * self.dtype.itemsize)
+        self.map = np.memmap(self.file, dtype=self.dtype, mode="r+", offset=HEADER_SIZE, shape=(self.capacity,))
+
+    # Append one record, given as a tuple in field order
+    def append(self, record):
+        if self.count == self.capacity:
+            self._grow()
+        self.map[self.count] = record
+        self.count += 1
+        if self.count % self.sync_every == 0:
+            self.flush()
+
+    def flush(self):
+        if self.map is None:
+            return
+        self.map.flush()
+        self.file.seek(8)
+        self.file.write(np.uint64(self.count).tobytes())
+        self.file.flush()
+
+    # Cut the preallocated tail and write the final count
+    def close(self):
+        if self.map is None:
+            return
+        self.flush()
+        self.map = None
+        self.file.truncate(HEADER_SIZE + self.count * self.dtype.itemsize)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Open a record file without copying: returns a read-only structured memmap
+def readrecords(path):
+    with open(path, "rb") as file:
+        dtype, count = _readheader(file)
+    available = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    count = min(count, available)
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+# Convert frame records to the session CSV columns
+def toframe(records):
+    import pandas as pd
+
+    tz = datetime.now().astimezone().tzinfo
+    timestamps = pd.to_datetime(records["t_ns"], unit="ns", utc=True).tz_convert(tz).tz_localize(None)
+    return pd.DataFrame({
+        "Timestamp": timestamps,
+        "Left Eye X": records["left_x"],
+        "Left Eye Y": records["left_y"],
+        "Right Eye X": records["right_x"],
+        "Right Eye Y": records["right_y"],
+        "Left Speed": records["left_speed"],
+        "Right Speed": records["right_speed"],
+        "Average EAR": (records["left_ear"] + records["right_ear"]) / 2,
+        "Blink Count": records["blinks"],
+    })
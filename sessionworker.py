@@ -0,0 +1,157 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+# Lines of the worker's stdout that carry a status message, everything else is log output
+STATUS_PREFIX = "@status "
+STATUS_INTERVAL = 1.0  # Seconds between status messages
+STOP_COMMAND = "stop"
+
+
+# Worker side, inside the detection process: one JSON status line per interval on
+# stdout until the detection thread ends, and a stop command on stdin ends the session
+def reportstatus(session, thread, interval=STATUS_INTERVAL):
+    from dashboard import dashboardvalues
+
+    def watchstdin():
+        for line in sys.stdin:
+            if line.strip() == STOP_COMMAND:
+                session.stopdetect.set()
+                return
+        # Parent went away: stop as well instead of running unattended
+        session.stopdetect.set()
+
+    threading.Thread(target=watchstdin, name="worker-stdin", daemon=True).start()
+
+    def send(message):
+        sys.stdout.write(STATUS_PREFIX + json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+    send({"state": "running", "csv": session.outcsv})
+    lastframe, lastime = session.attention.read().frame, time.monotonic()
+    while thread.is_alive():
+        thread.join(interval)
+        values = dashboardvalues(session.attention.read())
+        now = time.monotonic()
+        values["fps"] = (values["frame"] - lastframe) / (now - lastime)
+        values["state"] = "running"
+        if session.instrument is not None:
+            summary = session.instrument.summary()
+            values["dropped"] = summary["counters"].get("dropped", 0)
+            values["stages_p95_ms"] = {name: stage["p95_ms"] for name, stage in summary["stages"].items()}
+        lastframe, lastime = values["frame"], now
+        send(values)
+    send({"state": "stopped"})
+
+
+# UI side: runs `cli.py detect --worker` as a child process and reads its output on a
+# background thread. Nothing here blocks; poll() hands the queued messages to the
+# callbacks and must be called from the thread that owns the UI (see TkSessionWorker).
+class SessionWorker:
+    def __init__(self, on_status=None, on_log=None, on_exit=None, args=()):
+        self.on_status = on_status or (lambda status: None)
+        self.on_log = on_log or print
+        self.on_exit = on_exit or (lambda returncode: None)
+        self.args = list(args)
+        self.process = None
+        self.messages = queue.Queue()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if self.running:
+            return False
+        clipath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+        self.process = subprocess.Popen(
+            [sys.executable, clipath, "detect", "--worker"] + self.args,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, bufsize=1, cwd=os.path.dirname(clipath),
+        )
+        threading.Thread(target=self._read, args=(self.process,), name="worker-reader", daemon=True).start()
+        return True
+
+    def _read(self, process):
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith(STATUS_PREFIX):
+                try:
+                    self.messages.put(("status", json.loads(line[len(STATUS_PREFIX):])))
+                    continue
+                except ValueError:
+                    pass
+            self.messages.put(("log", line))
+        self.messages.put(("exit", process.wait()))
+
+    # Ask the session to end; it still writes its report and uploads before exiting
+    def stop(self):
+        if not self.running:
+            return
+        try:
+            self.process.stdin.write(STOP_COMMAND + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass
+
+    # Stop without waiting for the report, e.g. when the UI is closed
+    def kill(self, timeout=5):
+        if self.running:
+            self.stop()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.terminate()
+
+    def poll(self):
+        while True:
+            try:
+                kind, value = self.messages.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "status":
+                self.on_status(value)
+            elif kind == "log":
+                self.on_log(value)
+            else:
+                self.on_exit(value)
+
+
+# SessionWorker polled from the Tk event loop every `interval_ms`
+class TkSessionWorker(SessionWorker):
+    def __init__(self, widget, interval_ms=200, **callbacks):
+        super().__init__(**callbacks)
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self.poll()
+        self.widget.after(self.interval_ms, self._tick)
+
+
+# Run a blocking call (gcloud, firebase deploy, ...) on a background thread and hand its
+# result, or the exception it raised, to `done` on the Tk thread
+def runlater(widget, work, done, interval_ms=100):
+    result = {}
+
+    def run():
+        try:
+            result["value"] = work()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def check():
+        if thread.is_alive():
+            widget.after(interval_ms, check)
+        else:
+            done(result.get("value"), result.get("error"))
+
+    widget.after(interval_ms, check)
@@ -0,0 +1,45 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Values published by the detection thread for every processed frame, with the
+# thresholds currently in use (calibrated per user, see quantiles.py)
+ATTENTION_FIELDS = (
+    "timestamp", "ear", "speed", "left_ear", "right_ear", "left_speed", "right_speed", "blinks",
+    "ear_fatigue", "speed_fatigue", "speed_scale",
+)
+
+
+# Single-writer, many-reader snapshot of a small fixed set of floats (a seqlock).
+# The writer makes the sequence number odd, overwrites the values, then makes it even
+# again; a reader copies the values and retries if the sequence changed meanwhile, so
+# it always gets one complete sample and never blocks the writer.
+class SnapshotChannel:
+    # `initial` maps fields to the values read before the first publish (default 0)
+    def __init__(self, fields=ATTENTION_FIELDS, initial=None):
+        self.fields = fields
+        self.sampletype = namedtuple("Sample", ("frame",) + tuple(fields))
+        self.values = np.zeros(len(fields))
+        for field, value in (initial or {}).items():
+            self.values[fields.index(field)] = value
+        self.seq = 0
+
+    # Writer side, values in field order. Only one thread may publish.
+    def publish(self, *values):
+        self.seq += 1
+        self.values[:] = values
+        self.seq += 1
+
+    # Reader side: a consistent copy of the latest sample, frame is the number of publishes so far
+    def read(self):
+        spins = 0
+        while True:
+            before = self.seq
+            if not before & 1:
+                values = self.values.tolist()
+                if self.seq == before:
+                    return self.sampletype(before // 2, *values)
+            spins += 1
+            if spins % 100 == 0:
+                time.sleep(0)
@@ -0,0 +1,241 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from catalog import STAT_COLUMNS, parsetimestamps
+
+CHUNK_ROWS = 100000  # Rows held in memory at once per session file
+
+# Columns with running count / sum / sum of squares / min / max
+MOMENT_COLUMNS = ["Average EAR", "Left Speed", "Right Speed", "Average Speed"]
+
+# Fixed-bin histograms used for quantiles: (low, high, bins). Values outside the
+# range are counted in the edge bins, so quantiles there are clamped to the range.
+HISTOGRAMS = {
+    "Average EAR": (0.0, 0.6, 6000),        # 0.0001 resolution
+    "Average Speed": (0.0, 5000.0, 50000),  # 0.1 pixels/second resolution
+}
+
+
+# Rows of one session file in chunks of at most `chunksize` rows. CSV files are read
+# with the chunked parser, record files are sliced from the memory map. Columns that
+# older sessions did not record are filled with NaN.
+def readchunks(path, chunksize=CHUNK_ROWS):
+    if path.endswith(".rec"):
+        from sessionfile import readrecords, toframe
+        records = readrecords(path)
+        for start in range(0, len(records), chunksize):
+            yield toframe(records[start:start + chunksize])
+        return
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield parsetimestamps(chunk).reindex(columns=["Timestamp"] + STAT_COLUMNS)
+
+
+# Mergeable summary of any number of rows. Partials of chunks, files or workers are
+# combined with merge(); the result does not depend on how the rows were split.
+class PartialStats:
+    def __init__(self):
+        self.rows = 0
+        self.moments = {column: np.array([0.0, 0.0, 0.0, np.inf, -np.inf]) for column in MOMENT_COLUMNS}
+        self.histograms = {column: np.zeros(bins, dtype=np.int64) for column, (low, high, bins) in HISTOGRAMS.items()}
+        self.blinks = 0      # Sum of the final Blink Count of every session
+        self.seconds = 0.0   # Sum of the session durations
+        self.sessions = 0
+        self.lastblinks = 0  # Blink Count of the last row added
+        self.start = None
+        self.end = None
+
+    # Blink Count is cumulative within a session, so one file's partial keeps the last
+    # count and duration of its session until it is closed by endsession()
+    def add(self, chunk):
+        if len(chunk) == 0:
+            return self
+        values = {
+            "Average EAR": chunk["Average EAR"].to_numpy(dtype=float),
+            "Left Speed": chunk["Left Speed"].to_numpy(dtype=float),
+            "Right Speed": chunk["Right Speed"].to_numpy(dtype=float),
+        }
+        values["Average Speed"] = (values["Left Speed"] + values["Right Speed"]) / 2
+        # Missing values are skipped, like pandas does
+        for column in values:
+            values[column] = values[column][~np.isnan(values[column])]
+        for column, moment in self.moments.items():
+            v = values[column]
+            if len(v):
+                moment += (len(v), v.sum(), np.square(v).sum(), 0.0, 0.0)
+                moment[3] = min(moment[3], v.min())
+                moment[4] = max(moment[4], v.max())
+        for column, (low, high, bins) in HISTOGRAMS.items():
+            index = np.clip(((values[column] - low) / (high - low) * bins).astype(np.int64), 0, bins - 1)
+            self.histograms[column] += np.bincount(index, minlength=bins)
+        times = chunk["Timestamp"]
+        self.start = times.iloc[0] if self.start is None else min(self.start, times.iloc[0])
+        self.end = times.iloc[-1] if self.end is None else max(self.end, times.iloc[-1])
+        # Last recorded count; sessions from before Blink Count have none and count 0
+        blinks = chunk["Blink Count"].dropna()
+        if len(blinks):
+            self.lastblinks = int(blinks.iloc[-1])
+        self.rows += len(chunk)
+        return self
+
+    def endsession(self):
+        if self.rows:
+            self.blinks += self.lastblinks
+            self.seconds += (self.end - self.start).total_seconds()
+            self.sessions += 1
+        return self
+
+    def merge(self, other):
+        for column, moment in self.moments.items():
+            theirs = other.moments[column]
+            moment[:3] += theirs[:3]
+            moment[3] = min(moment[3], theirs[3])
+            moment[4] = max(moment[4], theirs[4])
+        for column in self.histograms:
+            self.histograms[column] += other.histograms[column]
+        self.rows += other.rows
+        self.blinks += other.blinks
+        self.seconds += other.seconds
+        self.sessions += other.sessions
+        if other.start is not None:
+            self.start = other.start if self.start is None else min(self.start, other.start)
+            self.end = other.end if self.end is None else max(self.end, other.end)
+        return self
+
+    # Quantile read from the fixed-bin histogram, interpolated inside the bin
+    def quantile(self, column, q):
+        low, high, bins = HISTOGRAMS[column]
+        counts = self.histograms[column]
+        total = counts.sum()
+        if total == 0:
+            return float("nan")
+        cumulative = np.cumsum(counts)
+        target = q * total
+        i = int(np.searchsorted(cumulative, target))
+        i = min(i, bins - 1)
+        before = cumulative[i - 1] if i else 0
+        inside = (target - before) / counts[i] if counts[i] else 0.0
+        width = (high - low) / bins
+        return low + (i + inside) * width
+
+    # Count, mean, std, min and max of every moment column, like DataFrame.describe
+    def summary(self):
+        rows = {}
+        for column, (n, s, ss, lo, hi) in self.moments.items():
+            mean = s / n if n else np.nan
+            var = (ss - n * mean * mean) / (n - 1) if n > 1 else np.nan
+            if not n:
+                lo = hi = np.nan
+            rows[column] = {"count": int(n), "mean": mean, "std": np.sqrt(max(var, 0.0)), "min": lo, "max": hi}
+        return pd.DataFrame(rows).T
+
+    # Blinks per minute over all sessions
+    def blinkrate(self):
+        return self.blinks / self.seconds * 60 if self.seconds else float("nan")
+
+
+# Mergeable per-state counts and EAR / combined speed / Blink Count moments, the
+# streaming counterpart of analytics.statedistribution and analytics.statestats
+class PartialStates:
+    FIELDS = ["EAR", "Speed", "Blink"]
+
+    def __init__(self):
+        self.counts = np.zeros(len(analytics.STATES), dtype=np.int64)
+        self.present = np.zeros((len(analytics.STATES), len(self.FIELDS)))  # Non-missing values
+        self.sums = np.zeros((len(analytics.STATES), len(self.FIELDS)))
+        self.sumsqs = np.zeros((len(analytics.STATES), len(self.FIELDS)))
+
+    def add(self, chunk, ear_low, speed_threshold=analytics.SPEED_THRESHOLD):
+        codes = analytics.classifystates(chunk, ear_low, speed_threshold).cat.codes.to_numpy()
+        values = np.column_stack((
+            chunk["Average EAR"].to_numpy(dtype=float),
+            chunk["Left Speed"].to_numpy(dtype=float) + chunk["Right Speed"].to_numpy(dtype=float),
+            chunk["Blink Count"].to_numpy(dtype=float),
+        ))
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+        self.counts += np.bincount(codes, minlength=len(analytics.STATES))
+        np.add.at(self.present, codes, present)
+        np.add.at(self.sums, codes, values)
+        np.add.at(self.sumsqs, codes, np.square(values))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.present += other.present
+        self.sums += other.sums
+        self.sumsqs += other.sumsqs
+        return self
+
+    def distribution(self):
+        total = self.counts.sum()
+        return pd.Series(self.counts / total if total else np.zeros(len(self.counts)), index=analytics.STATES, name="proportion")
+
+    def stats(self):
+        n = self.present
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sums / n
+            std = np.sqrt(np.maximum((self.sumsqs - n * mean * mean) / (n - 1), 0.0))
+        table = pd.DataFrame(index=pd.Index(analytics.STATES, name="State"))
+        for i, field in enumerate(self.FIELDS):
+            table[f"{field}_Mean"] = mean[:, i]
+            table[f"{field}_Std"] = std[:, i]
+        return table[self.counts > 0]
+
+
+# First pass over one session file
+def sessionstats(path, chunksize=CHUNK_ROWS):
+    partial = PartialStats()
+    for chunk in readchunks(path, chunksize):
+        partial.add(chunk)
+    return partial.endsession()
+
+
+# Second pass over one session file, once the thresholds are known
+def sessionstates(path, ear_low, speed_threshold=analytics.SPEED_THRESHOLD, chunksize=CHUNK_ROWS):
+    partial = PartialStates()
+    for chunk in readchunks(path, chunksize):
+        partial.add(chunk, ear_low, speed_threshold)
+    return partial
+
+
+# Run `function(path, *args)` for every file, one worker process per file when
+# workers > 1, and merge the partial results in file order
+def scan(paths, function, *args, workers=None):
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(function, paths, *[[arg] * len(paths) for arg in args]))
+    else:
+        partials = [function(path, *args) for path in paths]
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged.merge(partial)
+    return merged
+
+
+# Statistics, quantile thresholds and state distribution of any number of session
+# files in two chunked passes. Memory depends on the chunk size, not on the data.
+def streamanalysis(paths, workers=None, chunksize=CHUNK_ROWS, ear_quantile=0.25, speed_threshold=analytics.SPEED_THRESHOLD):
+    paths = list(paths)
+    if not paths:
+        raise ValueError("No session files to analyse")
+    stats = scan(paths, sessionstats, chunksize, workers=workers)
+    ear_low = stats.quantile("Average EAR", ear_quantile)
+    states = scan(paths, sessionstates, ear_low, speed_threshold, chunksize, workers=workers)
+    return {
+        "rows": stats.rows,
+        "sessions": stats.sessions,
+        "summary": stats.summary(),
+        "ear_low": ear_low,
+        "ear_high": stats.quantile("Average EAR", 0.75),
+        "fatigue_ear": stats.quantile("Average EAR", 0.10),
+        "fatigue_speed": stats.quantile("Average Speed", 0.90),
+        "blinks": stats.blinks,
+        "blink_rate": stats.blinkrate(),
+        "distribution": states.distribution(),
+        "states": states.stats(),
+    }
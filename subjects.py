@@ -0,0 +1,67 @@
+import numpy as np
+
+# Landmark between the eyes (nose bridge) used as the position of a face
+FACE_ANCHOR = 168
+
+MAX_MATCH_DISTANCE = 200.0  # Pixels a face may move between two frames and keep its identity
+MAX_MISSED_FRAMES = 30      # Frames a subject may be out of view before its slot is freed
+
+
+# Face identities across frames from their positions. Each tracked subject holds one of
+# `slots` slots (the rows of a MultiEyeKernel); a detection takes the slot of the nearest
+# subject within max_distance, closest pairs first, and anything left over starts a new
+# subject in a free slot. Subject ids count up from 1 and are never reused.
+class FaceMatcher:
+    def __init__(self, slots, max_distance=MAX_MATCH_DISTANCE, max_missed=MAX_MISSED_FRAMES):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.positions = np.zeros((slots, 2))
+        self.ids = np.zeros(slots, dtype=int)  # 0: free slot
+        self.missed = np.zeros(slots, dtype=int)
+        self.nextid = 1
+
+    # Match the (N, 2) face positions of one frame. Returns the slot of every detection
+    # (-1 when all slots are taken), the slots of new subjects and the (slot, id) of
+    # the subjects that were out of view for too long and are now dropped.
+    def match(self, positions):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        assigned = np.full(len(positions), -1)
+        taken = np.zeros(len(self.ids), dtype=bool)
+
+        tracked = np.flatnonzero(self.ids)
+        if len(tracked) and len(positions):
+            distances = np.hypot(*(positions[:, None, :] - self.positions[None, tracked, :]).transpose(2, 0, 1))
+            for flat in np.argsort(distances, axis=None):
+                detection, k = divmod(int(flat), len(tracked))
+                if distances[detection, k] > self.max_distance:
+                    break
+                slot = tracked[k]
+                if assigned[detection] < 0 and not taken[slot]:
+                    assigned[detection] = slot
+                    taken[slot] = True
+
+        started = []
+        for detection in np.flatnonzero(assigned < 0):
+            free = np.flatnonzero((self.ids == 0) & ~taken)
+            if not len(free):
+                break
+            slot = free[0]
+            self.ids[slot] = self.nextid
+            self.nextid += 1
+            assigned[detection] = slot
+            taken[slot] = True
+            started.append(int(slot))
+
+        ended = []
+        for slot in tracked:
+            if taken[slot]:
+                continue
+            self.missed[slot] += 1
+            if self.missed[slot] > self.max_missed:
+                ended.append((int(slot), int(self.ids[slot])))
+                self.ids[slot] = 0
+
+        matched = assigned >= 0
+        self.positions[assigned[matched]] = positions[matched]
+        self.missed[assigned[matched]] = 0
+        return assigned, started, ended
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Write a session CSV in the layout SessionRecorder writes, one row per second.
+# Without blinks the file has no Blink Count column, like sessions recorded before it existed.
+def writesession(path, rows=300, seed=0, blinks=True):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        "Timestamp": pd.date_range("2024-11-28 21:00:00", periods=rows, freq="s").strftime("%Y-%m-%d %H:%M:%S"),
+        "Left Eye X": rng.uniform(0, 1920, rows),
+        "Left Eye Y": rng.uniform(0, 1080, rows),
+        "Right Eye X": rng.uniform(0, 1920, rows),
+        "Right Eye Y": rng.uniform(0, 1080, rows),
+        "Left Speed": rng.gamma(2, 40, rows),
+        "Right Speed": rng.gamma(2, 40, rows),
+        "Average EAR": rng.normal(0.28, 0.03, rows),
+        "Blink Count": np.cumsum(rng.random(rows) < 0.25),
+    })
+    if not blinks:
+        data = data.drop(columns=["Blink Count"])
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+# Synthetic session factory: sessioncsv(path, rows=..., seed=..., blinks=...) -> path
+@pytest.fixture
+def sessioncsv():
+    return writesession
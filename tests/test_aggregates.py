@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import BUCKET_SECONDS, COLUMNS, HEATMAP_BINS, SessionAggregator
+from eyemetrics import focusscore
+
+
+@pytest.fixture
+def session(tmp_path, sessioncsv):
+    data = pd.read_csv(sessioncsv(tmp_path / "s.csv", rows=1000))
+    data["Timestamp"] = pd.to_datetime(data["Timestamp"])
+    return data
+
+
+# Rows fed one at a time, with the clock in UTC so epoch and CSV time agree
+def _added(data):
+    aggregates = SessionAggregator(capacity=16)
+    aggregates.utcoffset = 0
+    epochs = data["Timestamp"].to_numpy().astype("datetime64[ns]").astype(np.int64) / 1e9
+    for epoch, row in zip(epochs, data[COLUMNS].to_numpy(dtype=float)):
+        aggregates.add(epoch, *row)
+    return aggregates
+
+
+def test_add_and_extend_agree(session):
+    added = _added(session)
+    extended = SessionAggregator.fromframe(session)
+    assert added.count == extended.count == len(session)
+    pd.testing.assert_frame_equal(added.frame(), extended.frame())
+    np.testing.assert_array_equal(added.heatmap, extended.heatmap)
+    assert added.overallear() == pytest.approx(extended.overallear())
+    for a, b in zip(added.bucketmeans(), extended.bucketmeans()):
+        pd.testing.assert_series_equal(a, b)
+
+
+def test_matches_pandas(session):
+    aggregates = SessionAggregator.fromframe(session)
+    frame = aggregates.frame()
+    expected = focusscore(session["Average EAR"], (session["Left Speed"] + session["Right Speed"]) / 2)
+    np.testing.assert_allclose(frame["Attention Score"], expected)
+    assert aggregates.overallear() == pytest.approx(session["Average EAR"].mean())
+    assert aggregates.heatmap.shape == HEATMAP_BINS
+    assert aggregates.heatmap.sum() == 2 * len(session)
+
+    attention, ear = aggregates.bucketmeans()
+    resampled = session.set_index("Timestamp").resample(f"{BUCKET_SECONDS}s")["Average EAR"].mean()
+    np.testing.assert_allclose(ear.to_numpy(), resampled.to_numpy())
+    assert (ear.index == resampled.index).all()
+    frame["Bucket"] = frame["Timestamp"].dt.floor(f"{BUCKET_SECONDS}s")
+    np.testing.assert_allclose(attention.to_numpy(), frame.groupby("Bucket")["Attention Score"].mean().to_numpy())
+
+
+# Buckets with no samples stay as gaps in the means
+def test_empty_buckets_are_gaps(session):
+    gap = session["Timestamp"] >= session["Timestamp"].iloc[0] + pd.Timedelta(seconds=BUCKET_SECONDS)
+    later = session.copy()
+    later.loc[gap, "Timestamp"] += pd.Timedelta(seconds=3 * BUCKET_SECONDS)
+    attention, ear = SessionAggregator.fromframe(later).bucketmeans()
+    assert attention.isna().sum() == ear.isna().sum() == 3
+    assert attention.notna().sum() == SessionAggregator.fromframe(session).bucketmeans()[0].notna().sum()
+
+
+def test_empty():
+    aggregates = SessionAggregator()
+    attention, ear = aggregates.bucketmeans()
+    assert attention.empty and ear.empty
+    assert np.isnan(aggregates.overallear())
+    assert aggregates.frame().empty
+    assert len(aggregates.blinksteps()) == 0
+
+
+# Where the count drops a new session started, all of its count is new blinks
+def test_blink_steps_across_sessions():
+    data = pd.DataFrame(0.0, index=range(7), columns=COLUMNS)
+    data.insert(0, "Timestamp", pd.date_range("2024-11-28 21:00:00", periods=7, freq="s"))
+    data["Blink Count"] = [0, 2, 2, 5, 1, 1, 3]
+    aggregates = SessionAggregator.fromframe(data)
+    assert aggregates.blinksteps().tolist() == [0, 2, 0, 3, 1, 0, 2]
+    assert aggregates.cumulativeblinks().tolist() == [0, 2, 2, 5, 1, 1, 3]
+
+
+# Positions outside the frame are counted in the edge bins
+def test_heatmap_clips_to_frame():
+    aggregates = SessionAggregator()
+    aggregates.add(0, -50, 2000, 5000, -1, 0, 0, 0.3, 0)
+    assert aggregates.heatmap[0, -1] == 1
+    assert aggregates.heatmap[-1, 0] == 1
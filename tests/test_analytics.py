@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+
+
+@pytest.fixture
+def data(tmp_path, sessioncsv):
+    return pd.read_csv(sessioncsv(tmp_path / "s.csv", rows=600))
+
+
+# Row by row, the way the notebook classified the session
+def _state(row, ear_low, speed_threshold):
+    if row["Average EAR"] < ear_low:
+        return analytics.FATIGUE
+    if row["Left Speed"] > speed_threshold or row["Right Speed"] > speed_threshold:
+        return analytics.LOSS_OF_FOCUS
+    return analytics.FOCUS
+
+
+def test_classify_states(data):
+    ear_low, _ = analytics.earthresholds(data)
+    states = analytics.classifystates(data, ear_low)
+    expected = data.apply(_state, axis=1, args=(ear_low, analytics.SPEED_THRESHOLD))
+    assert states.astype(str).tolist() == expected.tolist()
+    assert list(states.cat.categories) == analytics.STATES
+
+
+def test_state_stats_and_distribution(data):
+    states = analytics.classifystates(data, data["Average EAR"].quantile(0.25))
+    stats = analytics.statestats(data, states)
+    for state in analytics.STATES:
+        rows = data[states == state]
+        assert stats.loc[state, "EAR_Mean"] == pytest.approx(rows["Average EAR"].mean())
+        assert stats.loc[state, "Speed_Std"] == pytest.approx((rows["Left Speed"] + rows["Right Speed"]).std())
+        assert stats.loc[state, "Blink_Mean"] == pytest.approx(rows["Blink Count"].mean())
+    distribution = analytics.statedistribution(states)
+    assert distribution.index.tolist() == analytics.STATES
+    assert distribution.sum() == pytest.approx(1.0)
+    assert distribution[analytics.FATIGUE] == pytest.approx((data["Average EAR"] < data["Average EAR"].quantile(0.25)).mean())
+
+
+# States that never occur are still reported, with a share of zero
+def test_distribution_of_missing_state(data):
+    states = analytics.classifystates(data, ear_low=0, speed_threshold=np.inf)
+    assert analytics.statedistribution(states).tolist() == [1.0, 0.0, 0.0]
+
+
+def test_thresholds_and_score(data):
+    ear_low, ear_high = analytics.earthresholds(data)
+    assert ear_low == data["Average EAR"].quantile(0.25) and ear_high == data["Average EAR"].quantile(0.75)
+    ear_fatigue, speed_fatigue = analytics.fatiguethresholds(data)
+    assert ear_fatigue == data["Average EAR"].quantile(0.10)
+    assert speed_fatigue == pytest.approx(((data["Left Speed"] + data["Right Speed"]) / 2).quantile(0.90))
+    score = analytics.attentionscore(data)
+    assert score.between(0, 1).all()
+    expected = 1 - (data["Average EAR"] - 0.25).abs() / 0.30 - (data["Left Speed"] + data["Right Speed"]) / 2 / 300
+    np.testing.assert_allclose(score, expected.clip(0, 1))
+
+
+# The blink count restarts with each session; the drop is not a negative rate
+def test_blink_rate_within_sessions():
+    data = pd.DataFrame({"Blink Count": [0, 1, 1, 3, 0, 2, 2], "Session": ["a"] * 4 + ["b"] * 3})
+    assert analytics.blinkrate(data).tolist() == [0, 60, 0, 120, 0, 120, 0]
+    assert analytics.blinkrate(data.drop(columns="Session")).tolist() == [0, 60, 0, 120, 0, 120, 0]
+
+
+def test_fatigue_state():
+    data = pd.DataFrame({
+        "Average EAR": [0.30, 0.15, 0.30, 0.30],
+        "Left Speed": [10, 10, 250, 10],
+        "Right Speed": [10, 10, 250, 10],
+        "Blink Count": [0, 0, 0, 1],
+    })
+    assert analytics.fatiguestate(data, ear_threshold=0.2).tolist() == [False, True, True, True]
+    assert analytics.fatiguestate(data, 0.2, blink_threshold=100).tolist() == [False, True, True, False]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from blinklog import LONG_BLINK_SECONDS, BlinkLog, readblinks
+from eyemetrics import BlinkDetector
+from sessionfile import RecordWriter
+
+FPS = 32
+START = 1_700_000_000
+CLOSED = [3, 5, 8, 20, 4]  # Frames each blink is closed for
+
+
+# EAR stream with a blink every 100 frames, the k-th closed for CLOSED[k] frames
+def _stream(frames=600):
+    ear = np.full((frames, 2), 0.30)
+    for k, closed in enumerate(CLOSED):
+        onset = 100 * k + 50
+        ear[onset:onset + closed] = (0.10 + 0.01 * k, 0.12)
+    return START + np.arange(frames) / FPS, ear
+
+
+def _log(path, times, ear):
+    log = BlinkLog(str(path))
+    detector = BlinkDetector()
+    for timestamp, pair in zip(times, ear):
+        ended = detector.update(pair)
+        log.update(timestamp, pair, detector.blinking, ended)
+    return log
+
+
+def test_round_trip(tmp_path):
+    times, ear = _stream()
+    log = _log(tmp_path / "s.blinks", times, ear)
+    log.close()
+    events = readblinks(str(tmp_path / "s.blinks"))
+    onsets = START + (100 * np.arange(len(CLOSED)) + 50) / FPS
+    assert len(events) == log.count == len(CLOSED)
+    # Epoch nanoseconds are beyond float precision, times round-trip to well under a microsecond
+    np.testing.assert_allclose(events.onsets, onsets, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(events.offsets, onsets + np.array(CLOSED) / FPS, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(events.durations, np.array(CLOSED) / FPS, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(events.minears, [min(0.10 + 0.01 * k, 0.12) for k in range(len(CLOSED))], rtol=1e-6)
+    np.testing.assert_allclose(events.intervals, (100 - np.array(CLOSED[:-1])) / FPS, rtol=0, atol=1e-6)
+
+
+# The header is refreshed after every blink, the log can be read during the session
+def test_read_while_recording(tmp_path):
+    times, ear = _stream()
+    log = _log(tmp_path / "s.blinks", times[:260], ear[:260])
+    assert len(readblinks(str(tmp_path / "s.blinks"))) == 3
+    log.close()
+
+
+def test_reset_drops_blink_in_progress(tmp_path):
+    times, ear = _stream()
+    log = BlinkLog(str(tmp_path / "s.blinks"))
+    log.update(times[0], (0.1, 0.1), True, False)
+    log.reset()
+    log.update(times[1], (0.3, 0.3), False, True)
+    log.close()
+    assert len(readblinks(str(tmp_path / "s.blinks"))) == 0
+
+
+def test_fatigue_indicators(tmp_path):
+    times, ear = _stream()
+    _log(tmp_path / "s.blinks", times, ear).close()
+    events = readblinks(str(tmp_path / "s.blinks"))
+    durations = np.array(CLOSED) / FPS
+    indicators = events.fatigueindicators(times[0], times[-1])
+    assert indicators["blinks"] == 5
+    assert indicators["rate"] == pytest.approx(5 / (times[-1] - times[0]) * 60)
+    assert indicators["mean_duration_ms"] == pytest.approx(durations.mean() * 1000)
+    assert indicators["p90_duration_ms"] == pytest.approx(np.percentile(durations, 90) * 1000)
+    assert indicators["long_blink_share"] == pytest.approx((durations >= LONG_BLINK_SECONDS).mean()) == 0.2
+    assert indicators["mean_interval_s"] == pytest.approx(events.intervals.mean())
+    starts, counts = events.counts(times[0], times[-1], seconds=5)
+    assert starts.tolist() == [START, START + 5, START + 10, START + 15]
+    assert counts.tolist() == [2, 1, 2, 0]
+
+
+def test_no_blinks(tmp_path):
+    BlinkLog(str(tmp_path / "s.blinks")).close()
+    events = readblinks(str(tmp_path / "s.blinks"))
+    assert events.fatigueindicators() == {"blinks": 0, "rate": 0.0}
+    assert events.rate() == 0.0
+
+
+def test_other_record_file_is_refused(tmp_path):
+    RecordWriter(str(tmp_path / "s.rec")).close()
+    with pytest.raises(ValueError):
+        readblinks(str(tmp_path / "s.rec"))
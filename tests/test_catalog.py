@@ -0,0 +1,107 @@
+import os
+
+import pandas as pd
+import pytest
+
+from catalog import MERGED_COLUMNS, SessionCatalog, loadsession
+from report import readata
+from streamstats import readchunks
+
+ROWS = """Timestamp,Left Eye X,Left Eye Y,Right Eye X,Right Eye Y,Left Speed,Right Speed,Average EAR,Blink Count
+2024-11-28 21:00:00,900,500,960,500,12.5,13.5,0.28,0
+2024-11-28 21:00:01,901,501,961,501,14.0,15.0,0.27,1
+"""
+
+
+# The report, the catalog and the streaming statistics read session CSVs the same way
+def test_one_session_loader(tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_text(ROWS)
+    data = loadsession(str(path))
+    assert data["Timestamp"].iloc[1] == pd.Timestamp("2024-11-28 21:00:01")
+    pd.testing.assert_frame_equal(readata(str(path)), data)
+    chunk = next(readchunks(str(path)))
+    pd.testing.assert_series_equal(chunk["Timestamp"], data["Timestamp"])
+
+
+LEGACY_ROWS = """Timestamp,Average EAR,Blink Count
+2024-11-26 20:45:28,0.23,6
+2024-11-26 20:45:29,0.24,7
+"""
+
+
+def _later(text, day):
+    return text.replace("2024-11-28", day)
+
+
+def _catalog(tmp_path, files):
+    directory = tmp_path / "sessions"
+    directory.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (directory / name).write_text(text)
+    return SessionCatalog(str(directory)), directory
+
+
+def test_refresh_reads_only_new_or_changed_files(tmp_path, monkeypatch):
+    catalog, directory = _catalog(tmp_path, {"a.csv": ROWS, "b.csv": _later(ROWS, "2024-11-29")})
+    assert catalog.refresh() == (["a.csv", "b.csv"], [], [])
+    assert catalog.entries["a.csv"]["rows"] == 2
+    assert catalog.entries["a.csv"]["stats"]["Left Speed"]["mean"] == pytest.approx(13.25)
+
+    described = []
+    original = SessionCatalog._describe
+    monkeypatch.setattr(SessionCatalog, "_describe", lambda self, *args: described.append(args[0]) or original(self, *args))
+    assert SessionCatalog(catalog.directory).refresh() == ([], [], [])
+    assert not described
+
+    (directory / "b.csv").write_text(_later(ROWS, "2024-11-30"))
+    os.utime(directory / "b.csv", (1, 1))
+    os.remove(directory / "a.csv")
+    catalog = SessionCatalog(catalog.directory)
+    assert catalog.refresh() == ([], ["b.csv"], ["a.csv"])
+    assert catalog.sessions("2024-11-30", "2024-12-01") == ["b.csv"]
+
+
+# A legacy session without the eye and speed columns merged first, a full one appended
+# later: every value stays under its own header
+def test_merge_keeps_one_column_order(tmp_path):
+    catalog, directory = _catalog(tmp_path, {"26NOV.csv": LEGACY_ROWS})
+    catalog.refresh()
+    output = str(tmp_path / "merged.csv")
+    assert catalog.merge(output) == ["26NOV.csv"]
+
+    (directory / "3DEC.csv").write_text(_later(ROWS, "2024-12-03"))
+    catalog.refresh()
+    assert catalog.merge(output) == ["3DEC.csv"]
+    merged = pd.read_csv(output)
+    assert list(merged.columns) == MERGED_COLUMNS
+    assert len(merged) == 4
+    full = merged[merged["Session"] == "3DEC"]
+    assert list(full["Left Eye X"]) == [900, 901]
+    assert list(full["Average EAR"]) == [0.28, 0.27]
+    assert merged[merged["Session"] == "26NOV"]["Left Eye X"].isna().all()
+    assert catalog.merge(output) == []
+
+
+def test_merge_rebuilds_after_a_change(tmp_path):
+    catalog, directory = _catalog(tmp_path, {"a.csv": ROWS, "b.csv": _later(ROWS, "2024-11-29")})
+    catalog.refresh()
+    output = str(tmp_path / "merged.csv")
+    catalog.merge(output)
+    (directory / "a.csv").write_text(ROWS + "2024-11-28 21:00:02,902,502,962,502,1.0,2.0,0.26,1\n")
+    catalog.refresh()
+    assert sorted(catalog.merge(output)) == ["a.csv", "b.csv"]
+    assert len(pd.read_csv(output)) == 5
+
+
+# A merged file written with another column order is rebuilt rather than appended to
+def test_merge_rebuilds_file_with_other_columns(tmp_path):
+    catalog, directory = _catalog(tmp_path, {"a.csv": ROWS})
+    catalog.refresh()
+    output = str(tmp_path / "merged.csv")
+    catalog.merge(output)
+    pd.read_csv(output)[["Timestamp", "Average EAR", "Blink Count", "Session"]].to_csv(output, index=False)
+    (directory / "b.csv").write_text(_later(ROWS, "2024-11-29"))
+    catalog.refresh()
+    assert sorted(catalog.merge(output)) == ["a.csv", "b.csv"]
+    assert list(pd.read_csv(output).columns) == MERGED_COLUMNS
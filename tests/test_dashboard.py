@@ -0,0 +1,54 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pytest
+
+from dashboard import Dashboard, dashboardvalues, smoothchange
+from snapshot import SnapshotChannel
+
+
+def _channel(ear=0.3, speed=10.0):
+    channel = SnapshotChannel()
+    channel.publish(1.0, ear, speed, ear, ear, speed, speed, 0, 0.2, 200.0, 300.0)
+    return channel
+
+
+# Pixels of the focus bar's colour (blue) on the canvas
+def _bluepixels(fig):
+    pixels = np.asarray(fig.canvas.buffer_rgba())
+    return int(np.sum((pixels[..., 2] > 200) & (pixels[..., 0] < 50) & (pixels[..., 1] < 50)))
+
+
+def test_smoothchange_limits_step():
+    assert smoothchange(0.5, 1.0, 0.05) == pytest.approx(0.55)
+    assert smoothchange(0.5, 0.0, 0.05) == pytest.approx(0.45)
+    assert smoothchange(0.5, 0.52, 0.05) == 0.52
+
+
+def test_dashboardvalues():
+    values = dashboardvalues(_channel().read())
+    assert values["frame"] == 1
+    assert values["blinks"] == 0
+    assert 0 <= values["focus_score"] <= 1
+
+
+# Unchanged values must keep the bars on screen: blitting restores the background
+# before every frame, so every frame has to draw the bars again
+def test_bars_stay_drawn_when_values_do_not_change():
+    import matplotlib.pyplot as plt
+
+    dashboard = Dashboard(_channel().read)
+    fig = dashboard.fig
+    fig.canvas.draw()
+    redraws = []
+    fig.canvas.draw_idle = lambda *args: redraws.append(args)
+    counts = []
+    for frame in range(30):
+        dashboard.ani._draw_next_frame(frame, blit=True)
+        counts.append(_bluepixels(fig))
+    plt.close(fig)
+    assert counts[0] > 0
+    assert min(counts) == counts[0]
+    assert not redraws
@@ -0,0 +1,158 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from eyemetrics import LEFT_EYE, RIGHT_EYE, BlinkDetector, EyeKernel, MultiBlinkDetector, MultiEyeKernel
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+# The per-frame formulas of the original detection loop
+def Ear(eye):
+    A = np.linalg.norm(eye[1] - eye[5])
+    B = np.linalg.norm(eye[2] - eye[4])
+    C = np.linalg.norm(eye[0] - eye[3])
+    return (A + B) / (2.0 * C)
+
+
+def Eyecentre(eye):
+    return int(sum(p[0] for p in eye) / len(eye)), int(sum(p[1] for p in eye) / len(eye))
+
+
+# Face mesh of 478 landmarks on whole pixels, as pixels and normalized like Mediapipe returns them
+def _face(seed):
+    rng = np.random.default_rng(seed)
+    pixels = np.column_stack([rng.integers(0, WIDTH, 478), rng.integers(0, HEIGHT, 478)]).astype(float)
+    return pixels, pixels / [WIDTH, HEIGHT]
+
+
+def _landmarks(normalized):
+    return [SimpleNamespace(x=x, y=y) for x, y in normalized]
+
+
+def _baseline(pixels):
+    return [Ear(pixels[LEFT_EYE]), Ear(pixels[RIGHT_EYE])], [Eyecentre(pixels[LEFT_EYE]), Eyecentre(pixels[RIGHT_EYE])]
+
+
+def test_kernel_matches_original_formulas():
+    kernel = EyeKernel()
+    for seed in range(20):
+        pixels, normalized = _face(seed)
+        ears, centres = _baseline(pixels)
+        kernel.loadarray(normalized, WIDTH, HEIGHT)
+        ear, centre, _ = kernel.update(seed)
+        np.testing.assert_allclose(ear, ears, rtol=1e-9)
+        # The original truncated the centres to whole pixels
+        np.testing.assert_array_equal(np.floor(centre + 1e-9), centres)
+        np.testing.assert_allclose(centre, [pixels[LEFT_EYE].mean(axis=0), pixels[RIGHT_EYE].mean(axis=0)])
+
+
+def test_load_and_loadarray_agree():
+    pixels, normalized = _face(1)
+    a, b = EyeKernel(), EyeKernel()
+    a.load(_landmarks(normalized), WIDTH, HEIGHT, origin=(10, 20))
+    b.loadarray(np.column_stack([normalized, np.zeros(len(normalized))]), WIDTH, HEIGHT, origin=(10, 20))
+    np.testing.assert_allclose(a.flat, b.flat)
+    np.testing.assert_allclose(a.update(0)[0], b.update(0)[0])
+
+
+def test_speed_is_centre_distance_over_time():
+    kernel = EyeKernel()
+    first, _ = _face(2)
+    second = first + [30, 40]
+    kernel.loadpixels(first[kernel.indices])
+    assert kernel.update(1.0)[2].tolist() == [0, 0]
+    kernel.loadpixels(second[kernel.indices])
+    _, _, speed = kernel.update(1.5)
+    np.testing.assert_allclose(speed, [100, 100])
+    kernel.reset()
+    assert kernel.update(2.0)[2].tolist() == [0, 0]
+
+
+def test_multi_kernel_matches_one_kernel_per_face():
+    multi = MultiEyeKernel(3)
+    singles = [EyeKernel() for _ in range(3)]
+    active = np.array([True, True, False])
+    for step in range(5):
+        for slot in range(2):
+            _, normalized = _face(10 * step + slot)
+            multi.load(slot, _landmarks(normalized), WIDTH, HEIGHT)
+            singles[slot].loadarray(normalized, WIDTH, HEIGHT)
+        ear, centre, speed = multi.update(step * 0.1, active)
+        for slot in range(2):
+            expected = singles[slot].update(step * 0.1)
+            np.testing.assert_allclose(ear[slot], expected[0], rtol=1e-9)
+            np.testing.assert_allclose(centre[slot], expected[1])
+            np.testing.assert_allclose(speed[slot], expected[2])
+        assert speed[2].tolist() == [0, 0]
+
+
+# A slot without a face keeps its last position, its speed picks up from there
+def test_multi_kernel_inactive_slot_keeps_position():
+    multi = MultiEyeKernel(1)
+    pixels, _ = _face(3)
+    multi.loadpixels(0, pixels[multi.indices])
+    multi.update(0.0, np.array([True]))
+    multi.loadpixels(0, pixels[multi.indices] + [300, 400])
+    assert multi.update(1.0, np.array([False]))[2].tolist() == [[0, 0]]
+    np.testing.assert_allclose(multi.update(2.0, np.array([True]))[2], [[250, 250]])
+    multi.reset(0)
+    assert multi.update(3.0, np.array([True]))[2].tolist() == [[0, 0]]
+
+
+# Open, closed, open sequences as (left, right) EAR, with the blinks the original loop counted
+SEQUENCES = [
+    ([(0.30, 0.30)] * 5, 0),
+    ([(0.30, 0.30), (0.15, 0.15), (0.30, 0.30)], 1),
+    ([(0.30, 0.30), (0.15, 0.30), (0.30, 0.30), (0.30, 0.18), (0.30, 0.30)], 2),  # One eye is enough to start
+    ([(0.30, 0.30), (0.15, 0.15), (0.22, 0.22), (0.18, 0.18), (0.30, 0.30)], 1),  # Between the thresholds: still closed
+    ([(0.30, 0.30), (0.15, 0.15), (0.30, 0.22), (0.30, 0.30)], 1),  # Both eyes must open
+    ([(0.15, 0.15)] * 4, 0),  # Still closed at the end
+    ([(0.30, 0.30), (0.10, 0.10), (0.30, 0.30)] * 7, 7),
+]
+
+
+def _original(sequence):
+    blinkcounter, blinking = 0, False
+    for lear, rear in sequence:
+        if lear < 0.21 or rear < 0.21:
+            blinking = True
+        elif lear > 0.23 and rear > 0.23 and blinking:
+            blinkcounter += 1
+            blinking = False
+    return blinkcounter
+
+
+@pytest.mark.parametrize("sequence, blinks", SEQUENCES)
+def test_blink_count(sequence, blinks):
+    detector = BlinkDetector()
+    ended = [detector.update(ear) for ear in sequence]
+    assert detector.count == sum(ended) == blinks == _original(sequence)
+
+
+def test_multi_blink_detector_counts_each_slot():
+    length = max(len(sequence) for sequence, _ in SEQUENCES)
+    ears = np.full((length, len(SEQUENCES), 2), 0.30)
+    for slot, (sequence, _) in enumerate(SEQUENCES):
+        ears[:len(sequence), slot] = sequence
+        ears[len(sequence):, slot] = sequence[-1]
+    detector = MultiBlinkDetector(len(SEQUENCES))
+    active = np.ones(len(SEQUENCES), dtype=bool)
+    for ear in ears:
+        detector.update(ear, active)
+    assert detector.count.tolist() == [blinks for _, blinks in SEQUENCES]
+
+
+# Frames of a slot without a face neither start nor end its blinks
+def test_multi_blink_detector_ignores_inactive_slots():
+    detector = MultiBlinkDetector(2)
+    closed, opened = np.array([[0.15, 0.15], [0.15, 0.15]]), np.array([[0.30, 0.30], [0.30, 0.30]])
+    detector.update(closed, np.array([True, False]))
+    assert detector.update(opened, np.array([True, True])).tolist() == [True, False]
+    detector.update(closed, np.array([True, True]))
+    assert detector.update(opened, np.array([True, False])).tolist() == [True, False]
+    assert detector.count.tolist() == [2, 0]
+    assert detector.blinking.tolist() == [False, True]
+    detector.reset(1)
+    assert detector.blinking.tolist() == [False, False]
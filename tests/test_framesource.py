@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("cv2")
+
+from framesource import FramePool, SyntheticSource
+
+
+def test_ring_reuses_buffers_in_order():
+    pool = FramePool((2, 2, 3), count=3)
+    first = [pool.take() for _ in range(3)]
+    assert all(pool.take() is buffer for buffer in first)
+
+
+def test_held_buffer_is_skipped_until_released():
+    pool = FramePool((2, 2, 3), count=3)
+    held = pool.take()
+    pool.hold(held)
+    taken = [pool.take() for _ in range(10)]
+    assert all(buffer is not held for buffer in taken)
+    pool.release(held)
+    assert any(pool.take() is held for _ in range(3))
+
+
+def test_ring_grows_when_every_buffer_is_held():
+    pool = FramePool((2, 2, 3), count=2)
+    for _ in range(2):
+        pool.hold(pool.take())
+    extra = pool.take()
+    assert len(pool.buffers) == 3
+    assert all(extra is not buffer for buffer in pool.buffers[:2] if id(buffer) in pool.held)
+
+
+# Inference that takes many capture periods: the frame it holds is never overwritten
+def test_held_frame_survives_long_inference():
+    source = SyntheticSource(width=8, height=4, frames=100, realtime=False, buffers=3)
+    frame = source.read()
+    source.hold(frame)
+    snapshot = frame.copy()
+    for _ in range(20):
+        source.read()
+    assert (frame == snapshot).all()
+    source.release(frame)
@@ -0,0 +1,83 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from instrument import BINS, DECADES, MIN_NS, FrameInstrument, LatencyHistogram
+
+
+def _histogram(samples):
+    histogram = LatencyHistogram()
+    for ns in samples:
+        histogram.add(int(ns))
+    return histogram
+
+
+# Bins are ~12% wide, their geometric middle is within ~6% of every sample in them
+def test_quantiles_close_to_exact():
+    samples = np.random.default_rng(0).lognormal(math.log(5e6), 0.8, 20000).astype(np.int64)
+    histogram = _histogram(samples)
+    for q in (0.5, 0.95, 0.99):
+        assert histogram.quantile(q) == pytest.approx(np.quantile(samples, q), rel=0.07)
+    assert histogram.quantile(1.0) == histogram.max == samples.max()
+    assert histogram.total == samples.sum()
+
+
+def test_underflow_and_overflow():
+    histogram = _histogram([10, 500, 10**12])
+    assert histogram.counts[0] == 2 and histogram.counts[BINS - 1] == 1
+    assert histogram.quantile(0.5) == MIN_NS
+    assert histogram.quantile(1.0) == MIN_NS * 10 ** DECADES
+
+
+# A single sample is reported as itself, never above it
+def test_quantile_not_above_max():
+    histogram = _histogram([1_234_567])
+    assert histogram.quantile(0.5) <= 1_234_567
+    assert histogram.quantile(0.5) == pytest.approx(1_234_567, rel=0.06)
+    assert math.isnan(LatencyHistogram().quantile(0.5))
+
+
+def test_merge_equals_one_histogram():
+    rng = np.random.default_rng(1)
+    a, b = rng.integers(1_000, 10**8, 500), rng.integers(1_000, 10**9, 700)
+    merged = _histogram(a).merge(_histogram(b))
+    whole = _histogram(np.concatenate([a, b]))
+    assert merged.counts == whole.counts
+    assert (merged.count, merged.total, merged.max) == (whole.count, whole.total, whole.max)
+
+
+def test_summary_in_milliseconds():
+    summary = _histogram([2_000_000] * 10).summary()
+    assert summary["count"] == 10
+    assert summary["mean_ms"] == 2.0 and summary["max_ms"] == 2.0
+    assert summary["p50_ms"] == pytest.approx(2.0, rel=0.06)
+    assert set(summary) == {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+
+
+def test_frame_instrument(tmp_path):
+    instrument = FrameInstrument()
+    dropped = [0]
+    instrument.gauge("dropped", lambda: dropped[0])
+    for _ in range(5):
+        start = instrument.now()
+        start = instrument.record("convert", start)
+        instrument.record("mesh", start)
+        instrument.count("processed")
+    dropped[0] = 3
+    summary = instrument.summary()
+    assert summary["counters"] == {"processed": 5, "dropped": 3}
+    assert summary["stages"]["convert"]["count"] == summary["stages"]["mesh"]["count"] == 5
+    assert "processed" in instrument.format(instrument.rates())
+
+    # Rates only cover the counts since the previous call
+    instrument.count("processed", 4)
+    rates = instrument.rates()
+    assert rates["processed"] > 0 and rates["dropped"] == 0
+
+    instrument.save(str(tmp_path / "s.timing.json"))
+    with open(tmp_path / "s.timing.json") as file:
+        saved = json.load(file)
+    assert saved["counters"]["processed"] == 9
+    assert sum(count for _, count in saved["histograms"]["mesh"]) == 5
@@ -0,0 +1,24 @@
+import numpy as np
+
+from landmarktrace import TraceRecorder, readframetimes, readtrace
+
+
+def test_trace_roundtrip(tmp_path):
+    path = str(tmp_path / "session.trace")
+    points = np.arange(24, dtype=np.float32).reshape(12, 2)
+    with TraceRecorder(path) as trace:
+        for i in range(5):
+            trace.add(1700000000.0 + i / 60, points + i)
+    records = readtrace(path)
+    assert len(records) == 5
+    np.testing.assert_array_equal(records["points"][3], points + 3)
+    assert np.allclose(np.diff(records["t_ns"]) / 1e9, 1 / 60)
+
+
+# Without a video only the landmark records are written, frames given to add() are ignored
+def test_frames_without_video_are_ignored(tmp_path):
+    path = str(tmp_path / "session.trace")
+    with TraceRecorder(path) as trace:
+        trace.add(1.0, np.zeros((12, 2)), np.zeros((4, 4, 3), dtype=np.uint8))
+    assert trace.video is None
+    assert readframetimes(str(tmp_path / "session_trace.avi")) is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from Detect import FocusSession, MultiSubjectMetrics
+from landmarktrace import readtrace
+from pyramid import sessionpyramid
+from replay import CLOSED_EAR, OPEN_EAR, syntheticeye
+from sessionfile import readrecords
+
+FPS = 30
+CENTRES = np.array([[400.0, 400.0], [1500.0, 400.0]])
+
+
+# Two subjects side by side for `seconds`; the first one blinks every 2 s
+def _run(tmp_path, seconds=10, **options):
+    session = FocusSession(name=str(tmp_path / "s"), max_faces=2, instrument=False, **options)
+    metrics = MultiSubjectMetrics(session, 2)
+    frames = seconds * FPS
+    ear = np.full((frames, 2), OPEN_EAR)
+    ear[np.arange(frames) % (2 * FPS) < 4, 0] = CLOSED_EAR
+    start = 1700000000.0
+    for i in range(frames):
+        slots = metrics.assign(CENTRES)
+        for face, slot in enumerate(slots):
+            points = syntheticeye(ear[i, face:face + 1], CENTRES[face:face + 1])[0]
+            metrics.kernel.loadpixels(slot, points)
+        metrics.process(start + i / FPS)
+    session.close()
+    return session, frames
+
+
+def test_primary_subject_goes_to_frame_records_and_trace(tmp_path):
+    session, frames = _run(tmp_path, full_rate=True, trace=True)
+    records = readrecords(session.outrec)
+    assert len(records) == frames
+    assert len(readtrace(session.outtrace)) == frames
+    # The primary subject is the first one, on the left
+    assert records["left_x"].max() < 960
+    assert records["blinks"][-1] == 5
+    pyramid = sessionpyramid(session.outrec, rebuild=True)
+    assert pyramid.summary("Average EAR")["count"] == frames
+    assert pyramid.summary("Average EAR")["mean"] == pytest.approx(OPEN_EAR, abs=0.03)
+
+
+# The session blink log follows the primary subject, so the report counts its blinks
+def test_primary_subject_blinks_go_to_session_log(tmp_path):
+    from blinklog import readblinks
+    from report import blinksperminute
+
+    session, frames = _run(tmp_path, seconds=125)
+    events = readblinks(session.outblinks)
+    assert len(events) == 63
+    assert len(readblinks(f"{session.name}_subject1.blinks")) == 63
+    assert len(readblinks(f"{session.name}_subject2.blinks")) == 0
+    minutes, counts = blinksperminute(session.aggregates, events)
+    assert counts.sum() == 63
+
+
+# An empty blink log falls back to the Blink Count column
+def test_blinks_per_minute_without_logged_blinks(tmp_path):
+    from blinklog import BlinkEvents, BLINK_DTYPE
+    from report import blinksperminute
+
+    session, frames = _run(tmp_path, seconds=125)
+    minutes, counts = blinksperminute(session.aggregates, BlinkEvents(np.zeros(0, dtype=BLINK_DTYPE)))
+    assert counts.sum() == session.aggregates.values[session.aggregates.count - 1, 7]
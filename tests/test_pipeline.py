@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from pipeline import BACKPRESSURE, DROP_OLDEST, Pipeline, StageQueue
+
+
+def test_drop_oldest_discards_oldest():
+    queue = StageQueue(maxsize=2, policy=DROP_OLDEST)
+    for item in range(5):
+        assert queue.put(item)
+    assert queue.dropped == 3
+    assert [queue.get(), queue.get()] == [3, 4]
+
+
+def test_backpressure_blocks_until_taken():
+    queue = StageQueue(maxsize=1, policy=BACKPRESSURE)
+    queue.put(1)
+    done = threading.Event()
+    producer = threading.Thread(target=lambda: (queue.put(2), done.set()))
+    producer.start()
+    assert not done.wait(0.1)
+    assert queue.get() == 1
+    assert done.wait(1)
+    producer.join()
+    assert queue.get() == 2
+
+
+def test_close_wakes_blocked_put_and_get():
+    full = StageQueue(maxsize=1, policy=BACKPRESSURE)
+    full.put(1)
+    empty = StageQueue()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(full.put(2))),
+        threading.Thread(target=lambda: results.append(empty.get())),
+    ]
+    for thread in threads:
+        thread.start()
+    full.close()
+    empty.close()
+    for thread in threads:
+        thread.join(1)
+        assert not thread.is_alive()
+    assert sorted(results, key=str) == [False, None]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        StageQueue(policy="lifo")
+
+
+def test_run_processes_every_item_with_backpressure():
+    items = iter(range(100))
+    seen = []
+    pipeline = Pipeline(lambda: next(items, None), lambda item: item * 2, seen.append, policy=BACKPRESSURE)
+    rows = pipeline.run()
+    assert seen == [2 * item for item in range(100)]
+    assert [row["items"] for row in rows] == [100, 100, 100]
+
+
+def test_inference_none_skips_item():
+    items = iter(range(10))
+    seen = []
+    Pipeline(lambda: next(items, None), lambda item: item if item % 2 else None, seen.append, policy=BACKPRESSURE).run()
+    assert seen == [1, 3, 5, 7, 9]
+
+
+def _runwithtimeout(pipeline, seconds=5):
+    thread = threading.Thread(target=pipeline.run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    return not thread.is_alive()
+
+
+# An endless source with a failing metrics stage: the metrics stage only fails once the
+# results queue is full and the inference stage is about to block in put(), stop() then
+# has to wake it or run() never returns
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_metrics_error_stops_pipeline():
+    counter = itertools.count()
+    blocked = threading.Event()
+
+    def inference(item):
+        if item == 5:
+            blocked.set()
+        return item
+
+    def metrics(result):
+        if result == 3:
+            blocked.wait(1)
+            time.sleep(0.05)
+            raise RuntimeError("metrics failed")
+
+    pipeline = Pipeline(lambda: next(counter), inference, metrics, maxsize=1, policy=BACKPRESSURE)
+    assert _runwithtimeout(pipeline)
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_inference_error_stops_pipeline():
+    counter = itertools.count()
+
+    def inference(item):
+        if item == 3:
+            raise RuntimeError("inference failed")
+        return item
+
+    pipeline = Pipeline(lambda: next(counter), inference, lambda result: None, maxsize=1, policy=BACKPRESSURE)
+    assert _runwithtimeout(pipeline)
+
+
+def test_stop_ends_endless_source():
+    counter = itertools.count()
+    pipeline = Pipeline(lambda: next(counter), lambda item: item, lambda result: None).start()
+    pipeline.stop()
+    pipeline.join(5)
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+
+
+def test_deliver_after_stop_is_refused():
+    pipeline = Pipeline(lambda: None, lambda item: item, lambda result: None)
+    pipeline.stop()
+    assert not pipeline.deliver(1)
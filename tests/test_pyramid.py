@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyramid import LEVELS, Pyramid, sessionpyramid
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(1)
+    times = 1700000000 + np.cumsum(rng.uniform(0.005, 0.05, 200000))
+    values = rng.normal(size=(len(times), 2))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return times, values
+
+
+# Every level against a pandas resample of the raw samples
+@pytest.mark.parametrize("seconds", LEVELS)
+def test_levels_match_pandas_resample(series, seconds):
+    times, values = series
+    pyramid = Pyramid.build(times, values, columns=["a", "b"])
+    frame = pd.DataFrame(values, columns=["a", "b"], index=pd.to_datetime(np.floor(times), unit="s"))
+    resampled = frame["a"].resample(f"{seconds}s")
+    expected = pd.DataFrame({
+        "min": resampled.min(), "max": resampled.max(), "mean": resampled.mean(), "count": resampled.count(),
+    })
+    expected = expected[expected["count"] > 0]
+    buckets = pyramid.query("a", level=seconds, points=np.iinfo(np.int64).max)
+    np.testing.assert_array_equal(buckets.times, expected.index.to_numpy().astype("datetime64[s]").astype(np.int64))
+    np.testing.assert_array_equal(buckets.count, expected["count"])
+    np.testing.assert_allclose(buckets.min, expected["min"], rtol=1e-6)
+    np.testing.assert_allclose(buckets.max, expected["max"], rtol=1e-6)
+    np.testing.assert_allclose(buckets.mean, expected["mean"], rtol=1e-5, atol=1e-6)
+
+
+def test_query_picks_finest_level_within_budget(series):
+    times, values = series
+    pyramid = Pyramid.build(times, values, columns=["a", "b"])
+    assert pyramid.query("a", points=10**6).level == 1
+    assert pyramid.query("a", points=600).level == 10
+    start, end = pyramid.span
+    assert pyramid.query("a", start, start + 300, points=600).level == 1
+
+
+def test_summary_matches_raw_values(series):
+    times, values = series
+    pyramid = Pyramid.build(times, values, columns=["a", "b"])
+    summary = pyramid.summary("b", points=50)
+    column = values[:, 1]
+    assert summary["count"] == np.count_nonzero(~np.isnan(column))
+    assert summary["mean"] == pytest.approx(np.nanmean(column), rel=1e-5)
+    assert summary["min"] == pytest.approx(np.nanmin(column), rel=1e-6)
+    assert summary["max"] == pytest.approx(np.nanmax(column), rel=1e-6)
+
+
+def test_unsorted_input(series):
+    times, values = series
+    order = np.random.default_rng(2).permutation(len(times))
+    shuffled = Pyramid.build(times[order], values[order], columns=["a", "b"])
+    pyramid = Pyramid.build(times, values, columns=["a", "b"])
+    for seconds in LEVELS:
+        np.testing.assert_array_equal(shuffled.levels[seconds]["count"], pyramid.levels[seconds]["count"])
+
+
+def test_envelope_has_two_points_per_bucket(series):
+    times, values = series
+    x, y = Pyramid.build(times, values, columns=["a", "b"]).envelope("a", points=400)
+    assert len(x) == len(y) <= 400
+    assert np.all(np.diff(x) > 0)
+
+
+def test_save_and_load(tmp_path, series):
+    times, values = series
+    pyramid = Pyramid.build(times, values, columns=["a", "b"])
+    path = str(tmp_path / "s.pyramid.npz")
+    pyramid.save(path)
+    loaded = Pyramid.load(path)
+    assert loaded.columns == ["a", "b"]
+    for seconds in LEVELS:
+        for name, array in pyramid.levels[seconds].items():
+            np.testing.assert_array_equal(loaded.levels[seconds][name], array)
+
+
+def test_sessionpyramid_uses_given_frame(tmp_path):
+    path = tmp_path / "s.csv"
+    times = pd.date_range("2024-11-28 21:00:00", periods=120, freq="s")
+    data = pd.DataFrame({
+        "Timestamp": times, "Left Eye X": 1.0, "Left Eye Y": 1.0, "Right Eye X": 1.0, "Right Eye Y": 1.0,
+        "Left Speed": 10.0, "Right Speed": 20.0, "Average EAR": 0.28, "Blink Count": np.arange(120),
+    })
+    path.write_text("not read when the frame is given")
+    pyramid = sessionpyramid(str(path), data=data)
+    assert pyramid.summary("Right Speed")["mean"] == pytest.approx(20.0)
+    assert (tmp_path / "s.pyramid.npz").exists()
+    assert sessionpyramid(str(path)).summary("Left Speed")["count"] == 120
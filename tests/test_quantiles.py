@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from quantiles import BLINK_HYSTERESIS, BLINK_RATIO, DEFAULT_THRESHOLDS, P2Quantile, ThresholdCalibrator
+
+
+@pytest.mark.parametrize("q", [0.1, 0.25, 0.5, 0.9])
+@pytest.mark.parametrize("distribution", ["normal", "gamma", "uniform"])
+def test_p2_close_to_exact_quantile(q, distribution):
+    rng = np.random.default_rng(0)
+    values = {
+        "normal": lambda: rng.normal(0.28, 0.03, 20000),
+        "gamma": lambda: rng.gamma(2, 40, 20000),
+        "uniform": lambda: rng.uniform(0, 1, 20000),
+    }[distribution]()
+    estimator = P2Quantile(q)
+    for value in values:
+        estimator.add(value)
+    exact = np.quantile(values, q)
+    spread = np.quantile(values, 0.95) - np.quantile(values, 0.05)
+    assert abs(estimator.value - exact) < 0.02 * spread
+
+
+def test_p2_small_counts():
+    estimator = P2Quantile(0.5)
+    assert np.isnan(estimator.value)
+    for value in (3.0, 1.0, 2.0):
+        estimator.add(value)
+    assert estimator.value == 2.0
+
+
+def test_p2_markers_stay_sorted():
+    rng = np.random.default_rng(1)
+    estimator = P2Quantile(0.9)
+    for value in rng.standard_cauchy(5000):
+        estimator.add(value)
+        assert estimator.heights == sorted(estimator.heights)
+
+
+def test_calibrator_keeps_defaults_during_warmup():
+    calibrator = ThresholdCalibrator(warmup=100)
+    for _ in range(99):
+        assert not calibrator.update(0.3, 50.0)
+    assert calibrator.thresholds == DEFAULT_THRESHOLDS
+    assert not calibrator.ready
+    assert calibrator.update(0.3, 50.0)
+    assert calibrator.ready
+    assert not calibrator.update(0.3, 50.0)
+
+
+def test_calibrated_thresholds():
+    rng = np.random.default_rng(2)
+    ears = rng.normal(0.30, 0.02, 5000)
+    speeds = rng.gamma(2, 40, 5000)
+    calibrator = ThresholdCalibrator(warmup=1000)
+    for ear, speed in zip(ears, speeds):
+        calibrator.update(ear, speed)
+    thresholds = calibrator.thresholds
+    assert thresholds.ear_fatigue == pytest.approx(np.quantile(ears, 0.25), abs=0.003)
+    assert thresholds.speed_fatigue == pytest.approx(np.quantile(speeds, 0.90), rel=0.05)
+    assert thresholds.speed_scale == pytest.approx(2 * thresholds.speed_fatigue)
+    assert thresholds.blink_low <= BLINK_RATIO * thresholds.ear_fatigue + 1e-12
+    assert thresholds.blink_low <= np.quantile(ears, 0.10) + 0.003
+    assert thresholds.blink_high == pytest.approx(thresholds.blink_low + BLINK_HYSTERESIS)
+
+
+
+# With the default thresholds the blink threshold is the configured ratio of the fatigue one
+def test_blink_ratio_matches_defaults():
+    assert BLINK_RATIO == pytest.approx(DEFAULT_THRESHOLDS.blink_low / DEFAULT_THRESHOLDS.ear_fatigue)
+    assert BLINK_HYSTERESIS == pytest.approx(DEFAULT_THRESHOLDS.blink_high - DEFAULT_THRESHOLDS.blink_low)
+
+
+# Blinks counted with the calibrated thresholds on synthetic open-eye noise with about
+# 15 blinks per minute. A threshold at the EAR 10th percentile sits inside the noise
+# and counts a blink every few frames; capped, the count matches the real blinks.
+def test_calibrated_blink_threshold_ignores_open_eye_noise():
+    from eyemetrics import BlinkDetector, EyeKernel
+    from replay import syntheticsource
+
+    kernel = EyeKernel()
+    ears = []
+    for timestamp, points in syntheticsource(frames=7200, fps=60, seed=3, start=0.0):
+        kernel.loadpixels(points)
+        ears.append(kernel.update(timestamp)[0].copy())
+    calibrator = ThresholdCalibrator(warmup=1800)
+    for ear in ears:
+        calibrator.update((ear[0] + ear[1]) / 2, 0.0)
+    thresholds = calibrator.thresholds
+
+    def count(low, high):
+        detector = BlinkDetector(low, high)
+        for ear in ears:
+            detector.update(ear)
+        return detector.count
+
+    real = count(DEFAULT_THRESHOLDS.blink_low, DEFAULT_THRESHOLDS.blink_high)
+    assert 20 <= real <= 40
+    assert abs(count(thresholds.blink_low, thresholds.blink_high) - real) <= 2
+    uncapped = calibrator.ear10.value
+    assert count(uncapped, uncapped + BLINK_HYSTERESIS) > 3 * real
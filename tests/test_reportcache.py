@@ -0,0 +1,128 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import report
+from reportcache import CACHE_ENV, ReportCache, cachedir, cachekey
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(str(tmp_path / "cache"))
+
+
+# The cache lives in the user cache directory unless the environment points elsewhere
+def test_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv(CACHE_ENV, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert cachedir() == str(tmp_path / "xdg" / "siot" / "reports")
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    assert cachedir() == str(tmp_path / "home" / ".cache" / "siot" / "reports")
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path / "override"))
+    assert ReportCache().directory == str(tmp_path / "override")
+    assert os.path.isdir(tmp_path / "override")
+
+
+def test_key_is_canonical():
+    array = np.arange(6.0)
+    assert cachekey({"a": 1, "b": [array, "x"]}) == cachekey({"b": [array.copy(), "x"], "a": 1})
+    assert cachekey({"a": 1}) != cachekey({"a": 2})
+    assert cachekey(array) != cachekey(array.astype(np.float32))
+    assert cachekey(array) != cachekey(array.reshape(2, 3))
+    assert cachekey(np.float64(1.5)) == cachekey(1.5)
+
+
+def test_objects_and_arrays(cache):
+    assert cache.getobject("k" * 64) is None
+    cache.putobject("k" * 64, {"rows": 3})
+    assert cache.getobject("k" * 64) == {"rows": 3}
+    pixels = np.random.default_rng(0).integers(0, 255, (20, 30, 4), dtype=np.uint8)
+    cache.putarray("p" * 64, pixels)
+    np.testing.assert_array_equal(cache.getarray("p" * 64), pixels)
+
+
+def test_cached_computes_once(cache):
+    calls = []
+    compute = lambda: calls.append(1) or "value"
+    assert cache.cached("c" * 64, compute) == "value"
+    assert cache.cached("c" * 64, compute) == "value"
+    assert len(calls) == 1
+
+
+def test_file_key_follows_content(cache, tmp_path):
+    path = tmp_path / "s.csv"
+    path.write_text("a")
+    first = cache.filekey(str(path))
+    path.write_text("b")
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+    assert cache.filekey(str(path)) != first
+
+
+# Least recently used entries go first; a hit counts as a use
+def test_eviction_is_least_recently_used(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache"), max_bytes=2500)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.putfile(key * 64, ".bin", _blob(tmp_path, 1000))
+        os.utime(cache.path(key * 64, ".bin"), (1000 + i, 1000 + i))
+    assert cache.size() <= 2500
+    assert cache.get("a" * 64, ".bin") is None
+    os.utime(cache.path("b" * 64, ".bin"), (1000, 1000))
+    assert cache.get("b" * 64, ".bin") is not None  # Touched: now the most recent
+    cache.putfile("d" * 64, ".bin", _blob(tmp_path, 1000))
+    assert cache.get("b" * 64, ".bin") is not None
+    assert cache.get("c" * 64, ".bin") is None
+
+
+def _blob(tmp_path, size):
+    path = tmp_path / "blob"
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_clear(cache, tmp_path):
+    cache.putfile("a" * 64, ".bin", _blob(tmp_path, 10))
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_report_served_from_cache_and_invalidated(cache, tmp_path, monkeypatch, sessioncsv):
+    path = sessioncsv(tmp_path / "s.csv", rows=240)
+    report.createpdf(path, str(tmp_path / "a.pdf"), workers=1, cache=cache)
+
+    rendered = []
+    original = report.renderreport
+    monkeypatch.setattr(report, "renderreport", lambda *args, **kwargs: rendered.append(1) or original(*args, **kwargs))
+    report.createpdf(path, str(tmp_path / "b.pdf"), workers=1, cache=cache)
+    assert not rendered
+    assert (tmp_path / "a.pdf").read_bytes() == (tmp_path / "b.pdf").read_bytes()
+
+    # A changed session misses and is rendered again
+    sessioncsv(path, seed=1, rows=240)
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+    report.createpdf(path, str(tmp_path / "c.pdf"), workers=1, cache=cache)
+    assert rendered == [1]
+
+
+# A report that misses as a whole still reuses the pages whose description did not change
+def test_unchanged_pages_are_reused(cache, tmp_path, monkeypatch, sessioncsv):
+    import reportrender
+
+    path = sessioncsv(tmp_path / "s.csv", rows=240)
+    report.createpdf(path, str(tmp_path / "a.pdf"), workers=1, cache=cache)
+    drawn = []
+    original = reportrender.renderpage
+    monkeypatch.setattr(reportrender, "renderpage", lambda page, dpi: drawn.append(page["title"]) or original(page, dpi))
+    monkeypatch.setattr(report, "PAGE_POINTS", 200)  # Coarser envelopes, the other pages stay the same
+    report.createpdf(path, str(tmp_path / "b.pdf"), workers=1, cache=cache)
+    assert drawn
+    assert "Eye Movement Hotspot Map" not in drawn
+    assert "Time Spent in Each State" not in drawn
+
+
+def test_cache_off(tmp_path, sessioncsv):
+    path = sessioncsv(tmp_path / "s.csv", rows=240)
+    report.createpdf(path, str(tmp_path / "a.pdf"), workers=1, cache=False)
+    assert (tmp_path / "a.pdf").exists()
@@ -0,0 +1,82 @@
+import matplotlib
+import numpy as np
+import pytest
+
+import reportrender
+
+
+PAGE = {
+    "title": "Average EAR",
+    "lines": [{"x": np.arange(50.0), "y": np.sin(np.arange(50.0)), "kwargs": {"marker": "o", "label": "EAR"}}],
+    "hlines": [{"y": 0.2, "kwargs": {"color": "red", "linestyle": "--"}}],
+    "rotate": 45,
+    "grid": True,
+    "legend": True,
+}
+
+
+@pytest.fixture
+def backend():
+    previous = matplotlib.get_backend()
+    matplotlib.use("svg")
+    yield "svg"
+    matplotlib.use(previous)
+
+
+# Rendering a report must not switch the backend of the program that asked for it
+def test_render_keeps_caller_backend(backend, tmp_path):
+    pixels = reportrender.renderpage(PAGE)
+    assert pixels.shape == (reportrender.PAGE_SIZE[1] * reportrender.PAGE_DPI, reportrender.PAGE_SIZE[0] * reportrender.PAGE_DPI, 4)
+    reportrender.renderreport([PAGE, dict(PAGE, title="Again")], str(tmp_path / "r.pdf"), workers=1)
+    assert (tmp_path / "r.pdf").read_bytes().startswith(b"%PDF")
+    assert matplotlib.get_backend() == backend
+
+
+def _signal(n=10000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 300) + rng.normal(0, 0.05, n)
+    y[[n // 8, n // 2]] = [5, -5]  # Single-sample spikes
+    return x, y
+
+
+# Every bucket keeps its minimum and maximum, so no spike is lost
+def test_minmax_keeps_extremes():
+    x, y = _signal()
+    outx, outy = reportrender.minmax(x, y, 100)
+    assert len(outx) == len(outy) == 200
+    assert outy.max() == 5 and outy.min() == -5
+    assert np.all(np.diff(outx) >= 0)
+    starts = np.linspace(0, len(x), 101).astype(np.int64)
+    for i in range(100):
+        part = y[starts[i]:starts[i + 1]]
+        assert outy[2 * i] == part.min() and outy[2 * i + 1] == part.max()
+
+
+def test_lttb_keeps_shape():
+    x, y = _signal()
+    outx, outy = reportrender.lttb(x, y, 500)
+    assert len(outx) == len(outy) == 500
+    assert outx[0] == x[0] and outx[-1] == x[-1]
+    assert np.all(np.diff(outx) > 0)
+    np.testing.assert_array_equal(outy, y[outx.astype(int)])  # Only original points
+    assert 5 in outy and -5 in outy
+    # Away from the spikes the decimated line follows the signal within its noise
+    away = (np.abs(x - 1250) > 40) & (np.abs(x - 5000) > 40)
+    np.testing.assert_allclose(np.interp(x, outx, outy)[away], np.sin(x / 300)[away], atol=0.25)
+
+
+# Series that already fit the budget are returned unchanged
+def test_short_series_unchanged():
+    x, y = _signal(100)
+    for outx, outy in (reportrender.minmax(x, y, 50), reportrender.lttb(x, y, 100), reportrender.lttb(x, y, 2)):
+        np.testing.assert_array_equal(outx, x)
+        np.testing.assert_array_equal(outy, y)
+
+
+def test_decimate_to_page_budget():
+    x, y = _signal(50000)
+    budget = reportrender.PAGE_SIZE[0] * reportrender.PAGE_DPI
+    assert len(reportrender.decimate(x, y)[0]) == budget
+    assert len(reportrender.decimate(x, y, "lttb")[0]) == budget
+    assert len(reportrender.decimate(x, y, budget=300)[0]) == 300
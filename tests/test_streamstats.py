@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamstats
+
+
+def test_stats_do_not_depend_on_chunks(tmp_path, sessioncsv):
+    path = sessioncsv(tmp_path / "a.csv")
+    whole = streamstats.sessionstats(path, chunksize=10000)
+    chunked = streamstats.sessionstats(path, chunksize=7)
+    assert chunked.rows == whole.rows == 300
+    assert chunked.blinks == whole.blinks
+    pd.testing.assert_frame_equal(chunked.summary(), whole.summary())
+
+
+def test_summary_matches_pandas(tmp_path, sessioncsv):
+    path = sessioncsv(tmp_path / "a.csv")
+    data = pd.read_csv(path)
+    summary = streamstats.sessionstats(path, chunksize=50).summary()
+    expected = data["Average EAR"].describe()
+    assert summary.loc["Average EAR", "mean"] == pytest.approx(expected["mean"])
+    assert summary.loc["Average EAR", "std"] == pytest.approx(expected["std"])
+    assert summary.loc["Average EAR", "min"] == pytest.approx(expected["min"])
+    assert streamstats.sessionstats(path).blinks == data["Blink Count"].iloc[-1]
+
+
+def test_histogram_quantile_close_to_exact(tmp_path, sessioncsv):
+    path = sessioncsv(tmp_path / "a.csv", rows=2000)
+    stats = streamstats.sessionstats(path, chunksize=128)
+    exact = pd.read_csv(path)["Average EAR"].quantile(0.25)
+    assert stats.quantile("Average EAR", 0.25) == pytest.approx(exact, abs=2e-4)
+
+
+def test_merge_of_sessions(tmp_path, sessioncsv):
+    paths = [sessioncsv(tmp_path / f"{i}.csv", seed=i) for i in range(3)]
+    merged = streamstats.scan(paths, streamstats.sessionstats, 64, workers=1)
+    assert merged.sessions == 3
+    assert merged.rows == 900
+    assert merged.blinks == sum(int(pd.read_csv(path)["Blink Count"].iloc[-1]) for path in paths)
+
+
+# Sessions recorded before Blink Count existed are read with the column as NaN
+def test_legacy_session_without_blink_count(tmp_path, sessioncsv):
+    paths = [sessioncsv(tmp_path / "old.csv", blinks=False), sessioncsv(tmp_path / "new.csv", seed=1)]
+    result = streamstats.streamanalysis(paths, workers=1, chunksize=64)
+    assert result["sessions"] == 2
+    assert result["blinks"] == int(pd.read_csv(paths[1])["Blink Count"].iloc[-1])
+    assert result["distribution"].sum() == pytest.approx(1.0)
+    assert np.isfinite(result["states"]["Blink_Mean"]).all()
+
+
+def test_trailing_missing_blink_count_keeps_last_value(tmp_path, sessioncsv):
+    path = sessioncsv(tmp_path / "a.csv")
+    data = pd.read_csv(path)
+    last = int(data["Blink Count"].iloc[-11])
+    data.loc[data.index[-10:], "Blink Count"] = np.nan
+    data.to_csv(path, index=False)
+    assert streamstats.sessionstats(path, chunksize=5).blinks == last
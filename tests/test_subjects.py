@@ -0,0 +1,62 @@
+import numpy as np
+
+from subjects import FaceMatcher
+
+
+# Subject id of every detection of a frame
+def _ids(matcher, positions):
+    slots, _, _ = matcher.match(positions)
+    return [int(matcher.ids[slot]) if slot >= 0 else None for slot in slots]
+
+
+def test_identities_follow_positions():
+    matcher = FaceMatcher(3)
+    assert _ids(matcher, [[100, 100], [800, 100]]) == [1, 2]
+    # Detections come in any order, and move a little every frame
+    assert _ids(matcher, [[820, 110], [90, 105]]) == [2, 1]
+    assert _ids(matcher, [[110, 120], [840, 120]]) == [1, 2]
+
+
+# Two candidates for the same subject: the closest pair is matched first
+def test_closest_pairs_first():
+    matcher = FaceMatcher(2)
+    _ids(matcher, [[100, 100], [400, 100]])
+    assert _ids(matcher, [[250, 100], [150, 100]]) == [2, 1]
+
+
+def test_new_subject_beyond_max_distance():
+    matcher = FaceMatcher(3, max_distance=50)
+    _ids(matcher, [[100, 100]])
+    slots, started, ended = matcher.match([[300, 100]])
+    assert matcher.ids[slots[0]] == 2
+    assert started == [int(slots[0])] and ended == []
+
+
+def test_detections_beyond_slots_are_not_tracked():
+    matcher = FaceMatcher(2)
+    slots, started, _ = matcher.match([[100, 100], [500, 100], [900, 100]])
+    assert slots.tolist()[:2] == started and slots[2] == -1
+    assert matcher.ids.tolist() == [1, 2]
+
+
+# A subject out of view keeps its slot for max_missed frames, then the slot is freed;
+# ids are never reused
+def test_missed_subject_is_dropped():
+    matcher = FaceMatcher(2, max_missed=3)
+    _ids(matcher, [[100, 100], [800, 100]])
+    for _ in range(3):
+        slots, started, ended = matcher.match([[100, 100]])
+        assert ended == []
+    assert _ids(matcher, [[100, 100], [805, 100]]) == [1, 2]  # Back in time
+    for _ in range(3):
+        matcher.match([[100, 100]])
+    _, _, ended = matcher.match([[100, 100]])
+    assert ended == [(1, 2)]
+    assert matcher.ids.tolist() == [1, 0]
+    assert _ids(matcher, [[100, 100], [800, 100]]) == [1, 3]
+
+
+def test_no_faces():
+    matcher = FaceMatcher(2)
+    slots, started, ended = matcher.match(np.zeros((0, 2)))
+    assert len(slots) == 0 and started == [] and ended == []
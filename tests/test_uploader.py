@@ -0,0 +1,101 @@
+import gzip
+import os
+import threading
+
+from uploader import LocalBucket, UploadQueue
+
+
+def _file(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+# Bucket that fails the first `failures` uploads
+class FlakyBucket(LocalBucket):
+    def __init__(self, directory, failures):
+        super().__init__(directory)
+        self.failures = failures
+
+    def upload(self, local_path, remote_path, content_type=None, content_encoding=None):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("network down")
+        super().upload(local_path, remote_path, content_type, content_encoding)
+
+
+def test_uploads_and_compresses(tmp_path):
+    remote = tmp_path / "remote"
+    csv = _file(tmp_path / "s.csv", b"Timestamp,Average EAR\n" * 100)
+    pdf = _file(tmp_path / "s.pdf", b"%PDF-1.4")
+    uploads = UploadQueue(LocalBucket(str(remote)), spool=str(tmp_path / "spool")).start()
+    uploads.enqueue(csv, "csv")
+    uploads.enqueue(pdf, "pdf")
+    assert uploads.wait(10)
+    uploads.close(1)
+    with gzip.open(remote / "csv" / "s.csv") as file:
+        assert file.read() == b"Timestamp,Average EAR\n" * 100
+    assert (remote / "pdf" / "s.pdf").read_bytes() == b"%PDF-1.4"
+    assert os.listdir(tmp_path / "spool") == []
+
+
+def test_failed_upload_is_retried(tmp_path):
+    remote = tmp_path / "remote"
+    pdf = _file(tmp_path / "s.pdf", b"%PDF-1.4")
+    uploads = UploadQueue(FlakyBucket(str(remote), failures=2), spool=str(tmp_path / "spool"), backoff=0.01).start()
+    uploads.enqueue(pdf, "pdf")
+    assert uploads.wait(10)
+    uploads.close(1)
+    assert (remote / "pdf" / "s.pdf").exists()
+
+
+# Jobs left in the spool by a run that ended early are uploaded on the next start
+def test_pending_jobs_resume_after_restart(tmp_path):
+    spool = str(tmp_path / "spool")
+    pdf = _file(tmp_path / "s.pdf", b"%PDF-1.4")
+    first = UploadQueue(FlakyBucket(str(tmp_path / "remote"), failures=10**6), spool=spool, backoff=60)
+    first.start()
+    first.enqueue(pdf, "pdf")
+    assert not first.wait(0.2)
+    first.close(1)
+    assert len(os.listdir(spool)) == 1
+
+    second = UploadQueue(LocalBucket(str(tmp_path / "remote")), spool=spool).start()
+    assert second.wait(10)
+    second.close(1)
+    assert (tmp_path / "remote" / "pdf" / "s.pdf").exists()
+    assert os.listdir(spool) == []
+
+
+def test_missing_file_is_dropped(tmp_path):
+    uploads = UploadQueue(LocalBucket(str(tmp_path / "remote")), spool=str(tmp_path / "spool")).start()
+    uploads.enqueue(str(tmp_path / "gone.csv"), "csv")
+    assert uploads.wait(10)
+    uploads.close(1)
+    assert not (tmp_path / "remote").exists()
+
+
+# Bucket that holds every upload until `parties` uploads are running at once
+class MeetingBucket(LocalBucket):
+    def __init__(self, directory, parties):
+        super().__init__(directory)
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def upload(self, local_path, remote_path, content_type=None, content_encoding=None):
+        self.barrier.wait()
+        super().upload(local_path, remote_path, content_type, content_encoding)
+
+
+# Two programs sharing a spool may both upload a pending job; neither worker may die on it
+def test_shared_spool(tmp_path):
+    spool = str(tmp_path / "spool")
+    csv = _file(tmp_path / "s.csv", b"Timestamp,Average EAR\n" * 100)
+    UploadQueue(LocalBucket(str(tmp_path / "remote")), spool=spool).enqueue(csv, "csv")
+    bucket = MeetingBucket(str(tmp_path / "remote"), parties=2)
+    queues = [UploadQueue(bucket, spool=spool, workers=1).start() for _ in range(2)]
+    assert all(queue.wait(10) for queue in queues)
+    assert all(queue.threads[0].is_alive() for queue in queues)
+    for queue in queues:
+        queue.close(1)
+    assert os.listdir(spool) == []
+    with gzip.open(tmp_path / "remote" / "csv" / "s.csv") as file:
+        assert file.read() == b"Timestamp,Average EAR\n" * 100
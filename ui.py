@@ -3,6 +3,7 @@ from tkinter import simpledialog, messagebox
 from tkinter import ttk
 import re
 import subprocess
+from sessionworker import TkSessionWorker, runlater
 
 # JavaScript file path
 jsfile = "/Users/bocai/Desktop/SIOT/functions/index.js"  # Update this with the actual file path
@@ -17,15 +18,26 @@ def updateaddress(neweaddress):
         file.write(updateone)
     return True
 
+# Run a command line tool in the background, the UI stays responsive while it runs
+def runcommand(command, done):
+    def finished(result, error):
+        if error is not None:
+            print(f"{command[0]} failed: {error}")
+            done(False, str(error))
+        else:
+            done(result.returncode == 0, result.stderr)
+    runlater(ui, lambda: subprocess.run(command, check=False, capture_output=True, text=True), finished)
+
 # Deployment function
 def deploy():
-    result = subprocess.run(["firebase", "deploy", "--only", "functions", "--project", "siot-2bfb8"], capture_output=True, text=True)
-    if result.returncode == 0:
-        print("Great!","Deployment successful.")
-        messagebox.showinfo("Deployment Success", "Firebase Functions deployed successfully.")
-    else:
-        print(f"Deployment failed: {result.stderr}")
-        messagebox.showerror("Something wrong","Deployment Error")
+    def done(ok, stderr):
+        if ok:
+            print("Great!","Deployment successful.")
+            messagebox.showinfo("Deployment Success", "Firebase Functions deployed successfully.")
+        else:
+            print(f"Deployment failed: {stderr}")
+            messagebox.showerror("Something wrong","Deployment Error")
+    runcommand(["firebase", "deploy", "--only", "functions", "--project", "siot-2bfb8"], done)
 
 # Function to enable user change email address
 def updatemail():
@@ -69,12 +81,13 @@ def schedule(dialog, timeset):
         "--location", location
     ]
 
-    result = subprocess.run(gcloud_command, check=False, capture_output=True, text=True)
-    if result.returncode == 0:
-        messagebox.showinfo( "You have set the schedule successfully!",f"PDF will be sent at {timeset} everyday!")
-        dialog.destroy()
-    else:
-        messagebox.showerror("Error","Fail to set schedule")
+    def done(ok, stderr):
+        if ok:
+            messagebox.showinfo( "You have set the schedule successfully!",f"PDF will be sent at {timeset} everyday!")
+            dialog.destroy()
+        else:
+            messagebox.showerror("Error","Fail to set schedule")
+    runcommand(gcloud_command, done)
 
 # Function to open the schedule dialog
 def openschedule():
@@ -115,22 +128,53 @@ def requestreport():
         message
     ]
 
-    result = subprocess.run(publish_command, capture_output=True, text=True, check=False)
-    if result.returncode == 0:
-        messagebox.showinfo("Great!","Report has already sent to your Email")
-    else:
-        messagebox.showerror("Error", f"Failed to send report.\nDetails: {result.stderr}")
+    def done(ok, stderr):
+        if ok:
+            messagebox.showinfo("Great!","Report has already sent to your Email")
+        else:
+            messagebox.showerror("Error", f"Failed to send report.\nDetails: {stderr}")
+    runcommand(publish_command, done)
 
-# Function to run Detect.py
+# Function to start a focus session in a worker process, or stop the running one
 def Startdetect():
-    python3path = "/usr/local/bin/python3"
-    codepath = "/Users/bocai/Desktop/SIOT/Detect.py"
-    result = subprocess.run([python3path, codepath], check=False, capture_output=True, text=True)
-    if result.returncode == 0:
+    if worker.running:
+        worker.stop()
+        Startdetectbutton.config(text="Stopping...", state="disabled")
+        statuslabel.config(text="Stopping the session...")
+    elif worker.start():
+        Startdetectbutton.config(text="Stop Focus")
+        statuslabel.config(text="Starting the camera...")
+
+# Live values sent by the session about once a second
+def showstatus(status):
+    if status["state"] == "running" and "fps" in status:
+        statuslabel.config(text=(
+            f"FPS {status['fps']:.1f}   EAR {status['ear']:.2f}   "
+            f"Focus {status['focus_score']:.2f}   Blinks {status['blinks']}"
+        ))
+        # Slowest per-frame stage, p95 (see instrument.py)
+        stages = {name: ms for name, ms in status.get("stages_p95_ms", {}).items() if name not in ("latency", "csv")}
+        if stages:
+            slowest = max(stages, key=stages.get)
+            statuslabel.config(text=statuslabel.cget("text") + f"   Slowest {slowest} {stages[slowest]:.1f} ms")
+    elif status["state"] == "stopped":
+        Startdetectbutton.config(text="Building report...", state="disabled")
+        statuslabel.config(text="Session stopped, building and uploading the report...")
+
+# Session process has ended
+def sessionended(returncode):
+    Startdetectbutton.config(text="Start Focus", state="normal")
+    statuslabel.config(text="")
+    if returncode == 0:
         messagebox.showinfo("Good Job!","You finished a focus detection")
     else:
         messagebox.showerror("Error", "Error executing script.")
 
+# Stop a running session before closing the window
+def closeui():
+    worker.kill()
+    ui.destroy()
+
 # Main GUI
 ui = tk.Tk()
 ui.title("SIOT FREE TRIAL")
@@ -151,6 +195,10 @@ header.pack(pady=50)
 Startdetectbutton = ttk.Button(ui, text="Start Focus", command=Startdetect, style="Custom.TButton")
 Startdetectbutton.pack(pady=20)
 
+# Live session values
+statuslabel = ttk.Label(ui, text="", font=("Arial", 16))
+statuslabel.pack(pady=5)
+
 openschedulebutton = ttk.Button(ui, text="Set Schedule", command=openschedule, style="Custom.TButton")
 openschedulebutton.pack(pady=20)
 
@@ -160,4 +208,8 @@ requestreportbutton.pack(pady=20)
 updatemailbutton = ttk.Button(ui, text="Change Email Address", command=updatemail, style="Custom.TButton")
 updatemailbutton.pack(pady=20)
 
+# Detection session worker, its messages are handled on the Tk thread
+worker = TkSessionWorker(ui, on_status=showstatus, on_exit=sessionended)
+ui.protocol("WM_DELETE_WINDOW", closeui)
+
 ui.mainloop()
@@ -0,0 +1,232 @@
+import gzip
+import heapq
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+
+# Firebase project the sessions are uploaded to
+FIREBASE_CREDENTIALS = "/Users/bocai/Desktop/Sensing and Internet of Things/serviceaccountKey.json"
+FIREBASE_BUCKET = "siot-2bfb8.firebasestorage.app"
+
+# Pending upload jobs, one JSON file each. Next to the code, so every program retries
+# the same queue whatever directory it runs from.
+SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+COMPRESS_EXTENSIONS = (".csv", ".rec")  # Gzipped before sending; the PDF is already compressed
+CONTENT_TYPES = {
+    ".csv": "text/csv", ".pdf": "application/pdf",
+    ".rec": "application/octet-stream", ".blinks": "application/octet-stream", ".npz": "application/octet-stream",
+}
+
+
+# Firebase Storage bucket, the Admin SDK is imported and initialised on first upload
+class FirebaseBucket:
+    def __init__(self, credentials_path=FIREBASE_CREDENTIALS, bucket_name=FIREBASE_BUCKET):
+        self.credentials_path = credentials_path
+        self.bucket_name = bucket_name
+        self.bucket = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        with self.lock:
+            if self.bucket is None:
+                import firebase_admin
+                from firebase_admin import credentials, storage
+
+                if not firebase_admin._apps:
+                    cred = credentials.Certificate(self.credentials_path)
+                    firebase_admin.initialize_app(cred, {"storageBucket": self.bucket_name})
+                self.bucket = storage.bucket()
+        return self.bucket
+
+    # Objects sent gzipped keep their name and are marked with Content-Encoding: gzip,
+    # so downloads (and the email function) get the original file back
+    def upload(self, local_path, remote_path, content_type=None, content_encoding=None):
+        blob = self._connect().blob(remote_path)
+        if content_encoding:
+            blob.content_encoding = content_encoding
+        blob.upload_from_filename(local_path, content_type=content_type)
+
+
+# Stand-in for the storage bucket that copies the files into a local directory, for
+# testing and for running without network access
+class LocalBucket:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def upload(self, local_path, remote_path, content_type=None, content_encoding=None):
+        target = os.path.join(self.directory, remote_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target + ".part")
+        os.replace(target + ".part", target)
+
+
+# Background upload queue. Every upload is a JSON job in the spool directory until it
+# succeeds, so uploads that fail or are cut short by the end of the program are retried,
+# with exponential backoff from `backoff` seconds, here or after the next start. enqueue() never blocks on the
+# network; `workers` threads upload concurrently.
+class UploadQueue:
+    def __init__(self, bucket, spool=SPOOL_DIR, workers=3, backoff=2.0, max_backoff=300.0):
+        self.bucket = bucket
+        self.spool = spool
+        self.workers = workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jobs = {}     # id -> job, everything not uploaded yet
+        self.ready = []    # Heap of (next try time, id)
+        self.closed = False
+        self.condition = threading.Condition()
+        self.threads = []
+        os.makedirs(spool, exist_ok=True)
+
+    def _jobpath(self, job_id):
+        return os.path.join(self.spool, f"{job_id}.json")
+
+    def _save(self, job):
+        path = self._jobpath(job["id"])
+        with open(path + ".tmp", "w") as file:
+            json.dump(job, file)
+        os.replace(path + ".tmp", path)
+
+    def _schedule(self, job):
+        with self.condition:
+            self.jobs[job["id"]] = job
+            heapq.heappush(self.ready, (job["next_try"], job["id"]))
+            self.condition.notify()
+
+    # Pick up the jobs left in the spool by an earlier run and start the workers. Another
+    # program sharing the spool may finish a job while it is being read.
+    def start(self):
+        for f in sorted(os.listdir(self.spool)):
+            if f.endswith(".json"):
+                try:
+                    with open(os.path.join(self.spool, f)) as file:
+                        job = json.load(file)
+                except FileNotFoundError:
+                    continue
+                job["next_try"] = 0
+                self._schedule(job)
+        if self.jobs:
+            print(f"Resuming {len(self.jobs)} pending uploads")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"uploader-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    # Queue a file for upload to `folder`/<file name>, returns the job id
+    def enqueue(self, local_path, folder):
+        name = os.path.basename(local_path)
+        job = {
+            "id": uuid.uuid4().hex,
+            "path": os.path.abspath(local_path),
+            "remote": f"{folder}/{name}",
+            "compress": name.endswith(COMPRESS_EXTENSIONS),
+            "attempts": 0,
+            "next_try": 0,
+            "error": None,
+        }
+        self._save(job)
+        self._schedule(job)
+        return job["id"]
+
+    def _next(self):
+        with self.condition:
+            while not self.closed:
+                if self.ready:
+                    next_try, job_id = self.ready[0]
+                    delay = next_try - time.time()
+                    if delay <= 0:
+                        heapq.heappop(self.ready)
+                        return self.jobs[job_id]
+                    self.condition.wait(delay)
+                else:
+                    self.condition.wait()
+            return None
+
+    def _work(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            if not os.path.exists(job["path"]):
+                print(f"Upload of {job['path']} dropped, the file no longer exists")
+                self._finish(job)
+                continue
+            try:
+                self._upload(job)
+            except Exception as e:
+                job["attempts"] += 1
+                job["error"] = str(e)
+                delay = min(self.backoff * 2 ** (job["attempts"] - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+                job["next_try"] = time.time() + delay
+                if not os.path.exists(self._jobpath(job["id"])):
+                    # Uploaded meanwhile by another program sharing the spool
+                    self._finish(job)
+                    continue
+                self._save(job)
+                print(f"Upload of {job['path']} failed ({e}), retry {job['attempts']} in {delay:.0f} s")
+                self._schedule(job)
+            else:
+                print(f"Uploaded {job['path']} to {job['remote']}")
+                self._finish(job)
+
+    # Drop a finished job. Its file is already gone when another program sharing the
+    # spool finished the same job first.
+    def _finish(self, job):
+        try:
+            os.remove(self._jobpath(job["id"]))
+        except FileNotFoundError:
+            pass
+        with self.condition:
+            del self.jobs[job["id"]]
+            self.condition.notify_all()
+
+    def _upload(self, job):
+        path = job["path"]
+        extension = os.path.splitext(path)[1]
+        if not job["compress"]:
+            self.bucket.upload(path, job["remote"], CONTENT_TYPES.get(extension))
+            return
+        packed = os.path.join(self.spool, f"{job['id']}.{uuid.uuid4().hex}.gz")
+        with open(path, "rb") as source, gzip.open(packed, "wb", compresslevel=6) as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+        try:
+            self.bucket.upload(packed, job["remote"], CONTENT_TYPES.get(extension), content_encoding="gzip")
+        finally:
+            os.remove(packed)
+
+    # Jobs not uploaded yet
+    def pending(self):
+        with self.condition:
+            return list(self.jobs.values())
+
+    # Wait until every job is uploaded or `timeout` seconds passed, True if all are done.
+    # Whatever is left stays in the spool for the next start.
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.jobs:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    # Stop the workers; an upload still running is given `timeout` seconds to finish
+    def close(self, timeout=None):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+# Upload whatever an earlier session left in the spool
+if __name__ == "__main__":
+    uploads = UploadQueue(FirebaseBucket()).start()
+    uploads.wait()
+    uploads.close()